@@ -0,0 +1,400 @@
+"""
+Benchmarks for the py3status hot paths.
+
+Each benchmark times a reproducible workload.  Times are divided by the time
+of a fixed pure python calibration workload so that results from different
+machines can be compared with the stored baselines.  The calibration is timed
+alongside each repeat of a benchmark so that changes in CPU speed during a
+run affect both, and the median of the repeats is used.
+
+    # run the benchmarks and compare them with the baselines
+    python benchmarks/bench.py
+
+    # only run some benchmarks
+    python benchmarks/bench.py formatter output_line
+
+    # store the results as the new baselines
+    python benchmarks/bench.py --save
+
+Benchmarks slower than their baseline by more than the threshold are
+reported.  Timings vary between machines and runs so this is only a guide,
+with --fail the exit status is 1 if any benchmark is reported.
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import sys
+import time
+
+from glob import glob
+from itertools import cycle
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from py3status.core import OutputLine, Py3statusWrapper  # noqa e402
+from py3status.formatter import Formatter  # noqa e402
+from py3status.i3status import I3status  # noqa e402
+from py3status.module import Module  # noqa e402
+from py3status.module_test import MockPy3statusWrapper  # noqa e402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+I3STATUS_OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "i3status_output.txt")
+
+# a benchmark is reported if it is this many times slower than its baseline,
+# timings on shared machines vary too much for a tighter limit
+THRESHOLD = 2.0
+
+# each benchmark is timed this many times and the median score is used
+REPEAT = 9
+
+# format strings in module docstrings eg format = '{name} {value}'
+DOCSTRING_FORMAT = re.compile(r"^\s*format\w* = (\"[^\"]*\"|'[^']*')\s*$", re.M)
+
+BENCHMARKS = {}
+
+
+def benchmark(number):
+    """
+    Register a benchmark.  The decorated function does any setup and returns
+    the function to be timed, which is called number times per timing.
+    """
+
+    def register(setup):
+        BENCHMARKS[setup.__name__] = (setup, number)
+        return setup
+
+    return register
+
+
+def calibration():
+    """
+    A fixed pure python workload that the benchmark times are divided by.
+    """
+    data = {}
+    for i in range(20000):
+        data[str(i)] = i * i
+    return sum(value for key, value in data.items() if key.endswith("1"))
+
+
+def module_format_strings():
+    """
+    Return the format strings from the core modules, both the defaults of
+    their format parameters and those in their docstring examples.
+    """
+    formats = set()
+    for path in sorted(glob(os.path.join(ROOT, "py3status", "modules", "*.py"))):
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ClassDef) and node.name == "Py3status":
+                for item in node.body:
+                    if not isinstance(item, ast.Assign):
+                        continue
+                    name = getattr(item.targets[0], "id", "")
+                    value = item.value
+                    if (
+                        name.startswith("format")
+                        and isinstance(value, ast.Constant)
+                        and isinstance(value.value, str)
+                    ):
+                        formats.add(value.value)
+            docstring = None
+            if isinstance(node, (ast.Module, ast.ClassDef)):
+                docstring = ast.get_docstring(node)
+            if docstring:
+                for match in DOCSTRING_FORMAT.finditer(docstring):
+                    formats.add(match.group(1)[1:-1])
+    return sorted(x for x in formats if "{" in x)
+
+
+@benchmark(number=25)
+def formatter():
+    """
+    Format every module format string with placeholder values.
+    """
+    f = Formatter()
+    values = cycle([42, 12.5, "text", "", None])
+    work = []
+    for format_string in module_format_strings():
+        try:
+            placeholders = f.get_placeholders(format_string)
+            param_dict = {key: next(values) for key in sorted(placeholders)}
+            f.format(format_string, param_dict=param_dict)
+        except Exception:
+            # some docstring examples are not complete format strings
+            continue
+        work.append((format_string, param_dict))
+
+    def run():
+        for format_string, param_dict in work:
+            f.format(format_string, param_dict=param_dict)
+
+    return run
+
+
+# a simple format that can be compiled
+COMPILED_FORMAT = "CPU: {cpu:.2f}% MEM: {mem:.1f}/{total:.1f} GiB ({percent}%)"
+COMPILED_PARAMS = {"cpu": 12.345, "mem": 3.21, "total": 15.6, "percent": 20}
+
+
+@benchmark(number=10000)
+def format_compiled():
+    """
+    Format a simple format string using its compiled function.
+    """
+    f = Formatter()
+    f.format(COMPILED_FORMAT, param_dict=COMPILED_PARAMS)
+    if not f.block_cache[COMPILED_FORMAT].compiled:
+        raise Exception("format not compiled")
+
+    def run():
+        f.format(COMPILED_FORMAT, param_dict=COMPILED_PARAMS)
+
+    return run
+
+
+@benchmark(number=5000)
+def format_tree():
+    """
+    Format the same format string by rendering its block tree, this should
+    be slower than format_compiled.
+    """
+    f = Formatter()
+    f.format(COMPILED_FORMAT, param_dict=COMPILED_PARAMS)
+    block = f.block_cache[COMPILED_FORMAT]
+
+    def run():
+        f._render(block, None, COMPILED_PARAMS, None)
+
+    return run
+
+
+@benchmark(number=500)
+def module_composite():
+    """
+    Run a module returning a 100 item composite with one item changing.
+    """
+
+    class Py3status:
+        count = 0
+
+        def big_composite(self):
+            self.count += 1
+            composite = [
+                {"full_text": "item {}".format(i), "color": "#00FF00"}
+                for i in range(100)
+            ]
+            composite[self.count % 100]["full_text"] = "changed"
+            return {"composite": composite, "cached_until": 0}
+
+    py3_config = {
+        "general": {},
+        "py3status": {},
+        ".module_groups": {},
+        "big_composite": {},
+    }
+    py3_wrapper = MockPy3statusWrapper(py3_config)
+    py3_wrapper.config["testing"] = False
+    module = Module("big_composite", {}, py3_wrapper, Py3status())
+    if module.disabled:
+        raise Exception("module failed to load")
+    module.prepare_module()
+    method = module.methods["big_composite"]
+
+    def run():
+        method["cached_until"] = 0
+        module.run()
+
+    return run
+
+
+@benchmark(number=25)
+def timeout_queue():
+    """
+    Schedule 500 modules, half of them due now, and process the queue.
+    """
+
+    class Options:
+        pass
+
+    class RunnerPool:
+        def add(self, module, module_name):
+            py3_wrapper.timeout_finished.append(module_name)
+
+    class FakeModule:
+        def __init__(self, name):
+            self.module_full_name = name
+
+    options = Options()
+    options.log_file = None
+    py3_wrapper = Py3statusWrapper(options)
+    py3_wrapper.runner_pool = RunnerPool()
+    modules = [FakeModule("module {}".format(i)) for i in range(500)]
+
+    def run():
+        now = time.time()
+        for index, module in enumerate(modules):
+            if index % 2:
+                py3_wrapper.timeout_queue_add(module, now + index)
+            else:
+                py3_wrapper.timeout_queue_add(module, now - 1)
+        py3_wrapper.timeout_queue_process()
+        py3_wrapper.timeout_queue_process()
+
+    return run
+
+
+@benchmark(number=25)
+def i3status_responses():
+    """
+    Process recorded i3status output lines.
+    """
+    i3s_modules = [
+        "ipv6",
+        "wireless _first_",
+        "ethernet _first_",
+        "battery all",
+        "disk /",
+        "load",
+        "cpu_usage",
+        "tztime local",
+    ]
+    py3_config = {
+        "general": {"interval": 5},
+        "py3status": {},
+        ".module_groups": {},
+        "i3s_modules": i3s_modules,
+    }
+    for name in i3s_modules:
+        py3_config[name] = {}
+    py3_wrapper = MockPy3statusWrapper(py3_config)
+    py3_wrapper.config["i3status_path"] = "i3status"
+    py3_wrapper.config["standalone"] = False
+    with open(I3STATUS_OUTPUT_PATH) as f:
+        lines = f.read().splitlines()
+
+    def run():
+        i3status = I3status(py3_wrapper)
+        for line in lines:
+            i3status.process_line(line)
+
+    return run
+
+
+@benchmark(number=2000)
+def output_line():
+    """
+    Update three of forty positions in the bar and build the line.
+    """
+    line = OutputLine(40)
+    outputs = [
+        [{"full_text": "module {}".format(i), "name": "module", "instance": str(i)}]
+        for i in range(40)
+    ]
+    for index, output in enumerate(outputs):
+        line.update([index], output)
+    counter = cycle(range(1000))
+
+    def run():
+        count = next(counter)
+        for index in (count % 40, (count + 13) % 40, (count + 27) % 40):
+            outputs[index][0]["full_text"] = "value {}".format(count)
+            line.update([index], outputs[index])
+        line.build(3)
+
+    return run
+
+
+def timed(function, number):
+    """
+    Return the time in seconds of calling function number times.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        function()
+    return time.perf_counter() - start
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2
+
+
+def measure(function, number):
+    """
+    Return the median time in seconds of one call of function and the median
+    score, its time divided by the calibration time.  The calibration is
+    timed before and after each repeat and the faster time is used.
+    """
+    durations = []
+    scores = []
+    unit_after = timed(calibration, 10) / 10
+    for _ in range(REPEAT):
+        unit_before = unit_after
+        duration = timed(function, number) / number
+        unit_after = timed(calibration, 10) / 10
+        durations.append(duration)
+        scores.append(duration / min(unit_before, unit_after))
+    return median(durations), median(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="py3status benchmarks")
+    parser.add_argument("names", nargs="*", help="benchmarks to run")
+    parser.add_argument("--save", action="store_true", help="save the baselines")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=THRESHOLD,
+        help="allowed slowdown (default %(default)s)",
+    )
+    parser.add_argument(
+        "--fail", action="store_true", help="exit with status 1 on a regression"
+    )
+    options = parser.parse_args()
+
+    names = options.names or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+
+    try:
+        with open(BASELINE_PATH) as f:
+            baselines = json.load(f)
+    except OSError:
+        baselines = {}
+
+    failed = []
+    for name in names:
+        setup, number = BENCHMARKS[name]
+        duration, score = measure(setup(), number)
+        line = "{:<20} {:>10.3f}ms {:>8.4f}".format(name, duration * 1000, score)
+        baseline = baselines.get(name)
+        if baseline:
+            ratio = score / baseline
+            line += " {:>6.2f}x baseline".format(ratio)
+            if ratio > options.threshold:
+                line += " REGRESSION"
+                failed.append(name)
+        print(line)
+        baselines[name] = score
+
+    if options.save:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print("baselines saved")
+    elif failed:
+        print("slower than baseline: {}".format(", ".join(failed)))
+        if options.fail:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+Replay recorded i3status output and i3bar click events through py3status
+without i3bar or i3status, for measuring throughput and latency end to end.
+
+py3status is run in standalone mode so i3status is mocked, the recorded
+i3status lines are fed to the mocked i3status and the click events are fed
+through stdin as i3bar would send them.  The lines output are captured and
+timestamped.  The clock can be sped up so that modules update and the
+recordings are replayed faster than real time.
+
+    # replay the sample recordings for 60 seconds at 10 times real time
+    python benchmarks/replay.py --duration 60 --speed 10
+
+    # use other recordings, arguments after -- are passed to py3status
+    python benchmarks/replay.py --i3status-stream i3status.txt \\
+        --clicks clicks.txt -- -c ~/.config/py3status/config
+
+Recordings have one i3status line or click event per line, as written by
+i3status and i3bar.  A line can start with the time in seconds since the
+start of the recording followed by a tab, otherwise i3status lines are
+replayed every general interval and click events every --click-interval
+seconds.  Recordings are repeated until the duration has passed.
+
+The report gives the latency from each input to the next line output, the
+lines output per second, the CPU time used and the resident memory.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+from bisect import bisect_left
+from signal import SIGTERM
+from threading import Event, Thread
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCHMARKS_PATH = os.path.dirname(os.path.abspath(__file__))
+CLICKS_PATH = os.path.join(BENCHMARKS_PATH, "clicks.txt")
+CONFIG_PATH = os.path.join(BENCHMARKS_PATH, "replay.conf")
+I3STATUS_OUTPUT_PATH = os.path.join(BENCHMARKS_PATH, "i3status_output.txt")
+
+# seconds between click events without a recorded time
+CLICK_INTERVAL = 1
+
+# seconds between resident memory samples
+RSS_INTERVAL = 1
+
+
+class Clock:
+    """
+    Makes time pass speed times faster for py3status.  time.time(),
+    time.sleep() and Event.wait() are replaced so this must be installed
+    before py3status is imported.  The harness itself measures using
+    time.perf_counter() which is not changed.
+    """
+
+    def __init__(self, speed):
+        self.real_sleep = time.sleep
+        self.real_time = time.time
+        self.real_wait = Event.wait
+        self.speed = speed
+        self.start = self.real_time()
+
+    def time(self):
+        return self.start + (self.real_time() - self.start) * self.speed
+
+    def sleep(self, seconds):
+        self.real_sleep(seconds / self.speed)
+
+    def wait(self, event, timeout=None):
+        if timeout is not None:
+            timeout /= self.speed
+        return self.real_wait(event, timeout)
+
+    def install(self):
+        if self.speed == 1:
+            return
+        clock = self
+        time.time = self.time
+        time.sleep = self.sleep
+        Event.wait = lambda event, timeout=None: clock.wait(event, timeout)
+
+
+class OutputRecorder:
+    """
+    Used in place of sys.__stdout__ to capture the lines py3status outputs
+    and the time they were written.
+    """
+
+    def __init__(self):
+        self.buffer = self
+        self.lines = []
+        self.recording = False
+
+    def write(self, data):
+        # only lines are recorded and not the protocol header or placeholder
+        if self.recording and data.startswith(b",["):
+            self.lines.append((time.perf_counter(), bytes(data)))
+
+    def flush(self):
+        pass
+
+
+def read_recording(path, interval):
+    """
+    Return a list of (seconds, line) from a recording and the length in
+    seconds of the recording.
+    """
+    recording = []
+    offset = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if "\t" in line:
+                offset, line = line.split("\t", 1)
+                offset = float(offset)
+            # remove leading comma if present
+            if line.startswith(","):
+                line = line[1:]
+            if not line.startswith(("[{", "{")):
+                # protocol header
+                continue
+            recording.append((offset, line))
+            offset += interval
+    return recording, offset
+
+
+class Replay(Thread):
+    """
+    Feed the recordings to py3status until the duration has passed.
+    """
+
+    def __init__(self, py3_wrapper, options, clock, events_pipe):
+        Thread.__init__(self)
+        self.daemon = True
+        self.clock = clock
+        self.events_pipe = events_pipe
+        self.inputs = []
+        self.options = options
+        self.py3_wrapper = py3_wrapper
+        self.rss = []
+
+        interval = py3_wrapper.get_config_attribute("general", "interval")
+        self.recordings = []
+        if options.i3status_stream:
+            self.recordings.append(
+                ("i3status",) + read_recording(options.i3status_stream, interval)
+            )
+        if options.clicks:
+            self.recordings.append(
+                ("click",) + read_recording(options.clicks, options.click_interval)
+            )
+
+    def schedule(self):
+        """
+        Return the inputs to be replayed sorted by time.
+        """
+        duration = self.options.duration
+        schedule = []
+        for kind, recording, length in self.recordings:
+            if not recording or not length:
+                continue
+            start = 0
+            while start < duration:
+                for offset, line in recording:
+                    if start + offset < duration:
+                        schedule.append((start + offset, kind, line))
+                start += length
+        schedule.sort(key=lambda x: x[0])
+        return schedule
+
+    def feed(self, kind, line):
+        if kind == "i3status":
+            self.py3_wrapper.i3status_thread.process_line(line)
+        else:
+            os.write(self.events_pipe, ",{}\n".format(line).encode())
+
+    def run(self):
+        try:
+            self.replay()
+        except Exception:
+            self.py3_wrapper.report_exception("Replay failed")
+        # stop py3status the same way as when it is killed
+        os.kill(os.getpid(), SIGTERM)
+
+    def replay(self):
+        os.write(self.events_pipe, b"[\n")
+        start = time.perf_counter()
+        next_rss = 0
+        # the end of the replay is added so that memory is still sampled
+        end = (self.options.duration, None, None)
+        for offset, kind, line in self.schedule() + [end]:
+            # record the resident memory while waiting
+            while True:
+                now = time.perf_counter() - start
+                if now >= next_rss:
+                    self.rss.append(rss())
+                    next_rss = now + RSS_INTERVAL
+                wait = offset / self.clock.speed - now
+                if wait <= 0:
+                    break
+                self.clock.real_sleep(min(wait, next_rss - now))
+            if kind:
+                self.inputs.append((time.perf_counter(), kind))
+                self.feed(kind, line)
+        self.rss.append(rss())
+
+
+def rss():
+    """
+    Return the resident memory of the process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # the peak resident memory in kilobytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def latencies(inputs, output_times):
+    """
+    Return a dict of input kind to the sorted latencies of those inputs and
+    the number of inputs that did not cause a line to be output before the
+    next input.
+    """
+    results = {}
+    for index, (input_time, kind) in enumerate(inputs):
+        values, unchanged = results.setdefault(kind, ([], [0]))
+        position = bisect_left(output_times, input_time)
+        next_input = inputs[index + 1][0] if index + 1 < len(inputs) else None
+        if position == len(output_times) or (
+            next_input is not None and output_times[position] >= next_input
+        ):
+            unchanged[0] += 1
+        else:
+            values.append(output_times[position] - input_time)
+    return {kind: (sorted(x[0]), x[1][0]) for kind, x in results.items()}
+
+
+def report(replay, recorder, real_duration, cpu):
+    """
+    Return the results of a replay.  The latency of an input is the time
+    until the next line is output, inputs that do not cause a line to be
+    output before the next input are counted as unchanged.
+    """
+    output_times = [x[0] for x in recorder.lines]
+    mb = 1024 * 1024
+    results = {
+        "cpu_percent": 100 * sum(cpu) / real_duration,
+        "cpu_system": cpu[1],
+        "cpu_user": cpu[0],
+        "duration": real_duration,
+        "lines": len(recorder.lines),
+        "lines_per_second": len(recorder.lines) / real_duration,
+        "rss_max_mb": max(replay.rss) / mb if replay.rss else 0,
+        "rss_start_mb": replay.rss[0] / mb if replay.rss else 0,
+        "rss_end_mb": replay.rss[-1] / mb if replay.rss else 0,
+        "speed": replay.clock.speed,
+        "virtual_duration": real_duration * replay.clock.speed,
+    }
+    ms = 1000
+    for kind, (values, unchanged) in latencies(replay.inputs, output_times).items():
+        results[kind + "_inputs"] = len(values) + unchanged
+        results[kind + "_unchanged"] = unchanged
+        if values:
+            results[kind + "_latency_avg_ms"] = ms * sum(values) / len(values)
+            results[kind + "_latency_max_ms"] = ms * values[-1]
+            results[kind + "_latency_p50_ms"] = ms * percentile(values, 50)
+            results[kind + "_latency_p95_ms"] = ms * percentile(values, 95)
+            results[kind + "_latency_p99_ms"] = ms * percentile(values, 99)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="replay recordings through py3status",
+        usage="%(prog)s [options] [-- py3status arguments]",
+    )
+    parser.add_argument(
+        "--clicks",
+        default=CLICKS_PATH,
+        help="recorded click events, empty for none (default %(default)s)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--click-interval",
+        default=CLICK_INTERVAL,
+        help="seconds between click events (default %(default)s)",
+        metavar="SECONDS",
+        type=float,
+    )
+    parser.add_argument(
+        "--duration",
+        default=30,
+        help="seconds of recordings to replay (default %(default)s)",
+        metavar="SECONDS",
+        type=float,
+    )
+    parser.add_argument(
+        "--i3status-stream",
+        default=I3STATUS_OUTPUT_PATH,
+        help="recorded i3status output, empty for none (default %(default)s)",
+        metavar="FILE",
+    )
+    parser.add_argument("--json", action="store_true", help="output json")
+    parser.add_argument(
+        "--output", help="write the timestamped lines output to FILE", metavar="FILE",
+    )
+    parser.add_argument(
+        "--speed",
+        default=1,
+        help="how many times faster than real time (default %(default)s)",
+        type=float,
+    )
+    options, py3status_args = parser.parse_known_args()
+    if py3status_args[:1] == ["--"]:
+        py3status_args = py3status_args[1:]
+    if options.speed <= 0:
+        parser.error("--speed must be more than 0")
+    if "-c" not in py3status_args and "--config" not in py3status_args:
+        py3status_args = ["-c", CONFIG_PATH] + py3status_args
+
+    clock = Clock(options.speed)
+    clock.install()
+
+    # imported after the clock is installed for modules that use
+    # from time import time
+    from py3status.argparsers import parse_cli_args
+    from py3status.core import Py3statusWrapper
+
+    sys.argv = ["py3status", "--standalone"] + py3status_args
+    py3status_options = parse_cli_args()
+
+    # click events are read from stdin
+    events_read, events_write = os.pipe()
+    sys.stdin = os.fdopen(events_read)
+
+    stdout = sys.__stdout__
+    recorder = OutputRecorder()
+    sys.__stdout__ = recorder
+
+    py3_wrapper = Py3statusWrapper(py3status_options)
+    py3_wrapper.setup()
+
+    replay = Replay(py3_wrapper, options, clock, events_write)
+    recorder.recording = True
+    start = time.perf_counter()
+    cpu_start = os.times()
+    replay.start()
+    try:
+        py3_wrapper.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        py3_wrapper.stop()
+    cpu_end = os.times()
+    real_duration = time.perf_counter() - start
+    cpu = [cpu_end[0] - cpu_start[0], cpu_end[1] - cpu_start[1]]
+    sys.__stdout__ = stdout
+
+    if options.output:
+        with open(options.output, "wb") as f:
+            for line_time, line in recorder.lines:
+                f.write("{:.6f}\t".format(line_time - start).encode())
+                f.write(line)
+
+    results = report(replay, recorder, real_duration, cpu)
+    if options.json:
+        stdout.write(json.dumps(results, indent=4, sort_keys=True) + "\n")
+    else:
+        for key, value in sorted(results.items()):
+            if isinstance(value, float):
+                value = "{:.3f}".format(value)
+            stdout.write("{:<24} {}\n".format(key, value))
+    stdout.flush()
+    # py3status threads may still be running
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
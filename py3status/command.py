@@ -7,6 +7,7 @@ import threading
 
 SERVER_ADDRESS = "/tmp/py3status_uds"
 MAX_SIZE = 1024
+REPLY_TIMEOUT = 5
 
 CLICK_EPILOG = """
 examples:
@@ -71,6 +72,31 @@ examples:
         # show full (i.e. docstrings)
         py3-cmd list vnstat uname -f
 """
+STATS_EPILOG = """
+examples:
+    stats:
+        # show all statistics as json
+        py3-cmd stats
+
+        # show the runtime statistics of modules
+        py3-cmd stats weather_yahoo "disk /home"
+"""
+PROFILE_EPILOG = """
+examples:
+    profile:
+        # profile all of py3status
+        py3-cmd profile start
+        py3-cmd profile stop
+
+        # profile only some modules
+        py3-cmd profile start --module weather_yahoo --module "disk /home"
+"""
+RELOAD_EPILOG = """
+examples:
+    reload:
+        # apply changes made to the config file
+        py3-cmd reload
+"""
 REFRESH_EPILOG = """
 examples:
     refresh:
@@ -87,10 +113,13 @@ examples:
         py3-cmd refresh --all
 """
 EPILOGS = {
+    "profile": PROFILE_EPILOG,
     "refresh": REFRESH_EPILOG,
+    "reload": RELOAD_EPILOG,
     "list": LIST_EPILOG,
     "docstring": DOCSTRING_EPILOG,
     "click": CLICK_EPILOG,
+    "stats": STATS_EPILOG,
 }
 INFORMATION = [
     ("V", "version", "show version number and exit"),
@@ -100,7 +129,10 @@ SUBPARSERS = [
     ("click", "click modules", "+"),
     ("docstring", "docstring utility", "*"),
     ("list", "list modules", "*"),
+    ("profile", "profile py3status", None),
     ("refresh", "refresh modules", "*"),
+    ("reload", "reload the config", None),
+    ("stats", "show statistics", "*"),
     # ('exec', 'execute methods', '+'),
 ]
 CLICK_OPTIONS = [
@@ -126,6 +158,8 @@ DOCSTRING_OPTIONS = [
     ("update", "update docstrings"),
 ]
 REFRESH_OPTIONS = [("all", "refresh all modules")]
+# commands that send a reply
+REPLY_COMMANDS = ["profile", "stats"]
 
 
 class CommandRunner:
@@ -204,7 +238,8 @@ class CommandRunner:
 
     def run_command(self, data):
         """
-        check the given command and send to the correct dispatcher
+        check the given command and send to the correct dispatcher.
+        Returns any reply to be sent back.
         """
         command = data.get("command")
         if self.debug:
@@ -215,6 +250,15 @@ class CommandRunner:
             self.py3_wrapper.refresh_modules()
         elif command == "click":
             self.click(data)
+        elif command == "profile":
+            return self.py3_wrapper.run_profiler(data.get("action"), data.get("module"))
+        elif command == "reload":
+            self.py3_wrapper.request_reload()
+        elif command == "stats":
+            modules = data.get("module")
+            if modules:
+                return self.py3_wrapper.stats(self.find_modules(modules))
+            return self.py3_wrapper.stats()
 
 
 class CommandServer(threading.Thread):
@@ -283,7 +327,10 @@ class CommandServer(threading.Thread):
                         data = json.loads(data.decode("utf-8"))
                         if self.debug:
                             self.py3_wrapper.log("received %s" % data)
-                        self.command_runner.run_command(data)
+                        reply = self.command_runner.run_command(data)
+                        if reply is not None:
+                            reply = json.dumps(reply).encode("utf-8")
+                            connection.sendall(reply)
                 finally:
                     # Clean up the connection
                     connection.close()
@@ -323,11 +370,11 @@ def command_parser():
         parser.add_argument(short, arg, action="store_true", help=msg)
 
     # make subparsers // ALIAS_DEPRECATION: remove metavar later
-    metavar = "{click,list,refresh}"
+    metavar = "{click,list,profile,refresh,reload,stats}"
     subparsers = parser.add_subparsers(dest="command", metavar=metavar)
     sps = {}
 
-    # subparsers: add click, list, refresh... hide docstring
+    # subparsers: add click, list, profile, refresh, reload, stats... hide docstring
     data = {"formatter_class": argparse.RawTextHelpFormatter}
     for name, msg, nargs in SUBPARSERS:
         data.update({"epilog": EPILOGS[name], "help": msg})
@@ -335,7 +382,8 @@ def command_parser():
         if name in ["docstring"]:
             del data["help"]
         sps[name] = subparsers.add_parser(name, **data)
-        sps[name].add_argument(nargs=nargs, dest="module", help="module name")
+        if nargs:
+            sps[name].add_argument(nargs=nargs, dest="module", help="module name")
 
     # ALIAS_DEPRECATION: subparsers: add click (aliases)
     buttons = {
@@ -368,6 +416,16 @@ def command_parser():
         arg = "--{}".format(name)
         sp.add_argument(arg, action="store_true", help=msg)
 
+    # profile subparser: add action, module
+    sp = sps["profile"]
+    sp.add_argument(dest="action", choices=["start", "stop"], help="action")
+    sp.add_argument(
+        "--module",
+        action="append",
+        metavar="MODULE",
+        help="only profile this module, can be given more than once",
+    )
+
     # refresh subparser: add all
     sp = sps["refresh"]
     for name, msg in REFRESH_OPTIONS:
@@ -416,6 +474,11 @@ def command_parser():
             valid = True
         if not options.module and not valid:
             sps["refresh"].error("missing positional or optional arguments")
+    elif options.command == "profile":
+        if options.module is None:
+            options.module = []
+    elif options.command == "reload":
+        options.module = []
     elif options.command in ["list", "docstring"]:
         parse_list_or_docstring(options, sps)
         parser.exit()
@@ -553,6 +616,22 @@ def send_command():
             # Send data
             verbose("sending")
             sock.sendall(msg)
+            if options.command in REPLY_COMMANDS:
+                verbose("waiting for reply")
+                sock.settimeout(REPLY_TIMEOUT)
+                reply = b""
+                while True:
+                    data = sock.recv(MAX_SIZE)
+                    if not data:
+                        break
+                    reply += data
+                if reply:
+                    reply = json.loads(reply.decode("utf-8"))
+                    if len(uds_list) > 1:
+                        print(uds)
+                    print(json.dumps(reply, indent=4, sort_keys=True))
+        except socket.timeout:
+            verbose("no reply")
         finally:
             verbose("closing socket")
             sock.close()
@@ -0,0 +1,119 @@
+import os
+
+from threading import Event, Lock
+from time import time
+
+
+class CommandCache:
+    """
+    Runs commands for modules and keeps timing stats for them.
+
+    When a key is given the result is cached for the cache timeout and
+    identical commands that are run at the same time share one process.
+    """
+
+    def __init__(self):
+        self.cache = {}
+        self.lock = Lock()
+        self.running = {}
+        self.timings = {}
+
+    def _record(self, name, duration, error=False, cached=False):
+        with self.lock:
+            stats = self.timings.get(name)
+            if stats is None:
+                stats = self.timings[name] = {
+                    "cached": 0,
+                    "errors": 0,
+                    "runs": 0,
+                    "time_max": 0,
+                    "time_total": 0,
+                }
+            if cached:
+                stats["cached"] += 1
+                return
+            stats["runs"] += 1
+            stats["time_total"] += duration
+            if duration > stats["time_max"]:
+                stats["time_max"] = duration
+            if error:
+                stats["errors"] += 1
+
+    def _call(self, name, function):
+        """
+        Call the function recording how long it took.  Returns a tuple of
+        the result and any exception raised.
+        """
+        start = time()
+        try:
+            result = function(), None
+        except Exception as e:
+            result = None, e
+        self._record(name, time() - start, error=result[1] is not None)
+        return result
+
+    def run(self, command, function, key=None, cache_timeout=0):
+        """
+        Run function() which runs the command and return its result.
+        Exceptions raised by function are reraised to all callers.
+        """
+        if isinstance(command, str):
+            name = command.split(" ", 1)[0]
+        else:
+            name = command[0] if command else ""
+        name = os.path.basename(name)
+
+        if key is None:
+            result, exception = self._call(name, function)
+        else:
+            with self.lock:
+                cached = self.cache.get(key)
+                if cached and cached[0] > time():
+                    running = None
+                else:
+                    cached = None
+                    running = self.running.get(key)
+                    if running is None:
+                        # we run the command others wait for us
+                        self.running[key] = [Event(), None]
+            if cached:
+                self._record(name, 0, cached=True)
+                result, exception = cached[1]
+            elif running:
+                running[0].wait()
+                self._record(name, 0, cached=True)
+                result, exception = running[1]
+            else:
+                outcome = self._call(name, function)
+                with self.lock:
+                    running = self.running.pop(key)
+                    if cache_timeout:
+                        self.cache[key] = (time() + cache_timeout, outcome)
+                        self._expire()
+                running[1] = outcome
+                running[0].set()
+                result, exception = outcome
+        if exception:
+            raise exception
+        return result
+
+    def _expire(self):
+        """
+        Remove expired results, the lock must be held.
+        """
+        now = time()
+        for key in [k for k, v in self.cache.items() if v[0] <= now]:
+            del self.cache[key]
+
+    def stats(self):
+        """
+        Return the timing stats for each command.
+        """
+        with self.lock:
+            stats = {}
+            for name, timing in self.timings.items():
+                timing = dict(timing)
+                runs = timing["runs"]
+                timing["time_avg"] = timing["time_total"] / runs if runs else 0
+                stats[name] = timing
+            return stats
@@ -1,25 +1,32 @@
 import os
-import pkg_resources
 import sys
+import tempfile
 import time
 
-from collections import deque
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heapify, heappop, heappush
+from itertools import count
+from math import ceil
 from json import dumps
-from pprint import pformat
+from queue import Queue
 from signal import signal, SIGTERM, SIGUSR1, SIGTSTP, SIGCONT
 from subprocess import Popen
-from threading import Event, Thread
+from threading import Event, Lock, Thread, main_thread
 from syslog import syslog, LOG_ERR, LOG_INFO, LOG_WARNING
 from traceback import extract_tb, format_tb, format_stack
 
 from py3status.command import CommandServer
 from py3status.events import Events
-from py3status.formatter import expand_color
+from py3status.formatter import FORMAT_CACHE_SIZE, Formatter, expand_color
 from py3status.helpers import print_stderr
 from py3status.i3status import I3status
+from py3status.log_writer import LogWriter
 from py3status.parse_config import process_config
 from py3status.module import Module
-from py3status.profiling import profile
+from py3status.module_index import ModuleIndex, load_entry_point
+from py3status.profiling import SamplingProfiler, profile
+from py3status.py3 import Py3
 from py3status.udev_monitor import UdevMonitor
 
 LOG_LEVELS = {"error": LOG_ERR, "warning": LOG_WARNING, "info": LOG_INFO}
@@ -40,28 +47,224 @@ CONFIG_SPECIAL_SECTIONS = [
 ENTRY_POINT_NAME = "py3status"
 ENTRY_POINT_KEY = "entry_point"
 
+# maximum number of lines output to i3bar per second
+MAX_FPS = 20
+
+# scheduled module updates are grouped into periods of this many seconds
+TIMEOUT_SLACK = 0.05
+
+# py3status section options that are applied by a config reload without
+# restarting the modules
+RELOAD_OPTIONS = [
+    "format_cache_size",
+    "max_fps",
+    "native_i3status_modules",
+    "timer_slack",
+]
+
+# py3status section options that need py3status to be restarted to change,
+# a config reload does not restart the modules for them
+RESTART_OPTIONS = ["worker_threads"]
+
+# worker threads available for tasks in addition to one per module
+WORKER_THREADS_EXTRA = 4
+
+# seconds to wait for the worker threads to finish when stopping
+RUNNER_STOP_TIMEOUT = 5
+
+# threads used to import modules at startup
+MODULE_LOAD_THREADS = 8
+
+# shown in the bar until the modules have output
+STARTUP_PLACEHOLDER = {"full_text": "py3status starting", "name": "py3status"}
+
 
 class Runner(Thread):
     """
-    A Simple helper to run a module in a Thread so it is non-locking.
+    A worker thread belonging to a RunnerPool.  It runs modules and tasks
+    taken from the pool queue so that they are non-locking.
     """
 
-    def __init__(self, module, py3_wrapper, module_name):
+    def __init__(self, pool):
         Thread.__init__(self)
         self.daemon = True
-        self.module = module
-        self.module_name = module_name
-        self.py3_wrapper = py3_wrapper
+        self.pool = pool
+        self.py3_wrapper = pool.py3_wrapper
+        # the name of the module being run, "task" for tasks
+        self.running = None
         self.start()
 
     def run(self):
-        try:
-            self.module.run()
-        except:  # noqa e722
-            self.py3_wrapper.report_exception("Runner")
-        # the module is no longer running so notify the timeout logic
-        if self.module_name:
-            self.py3_wrapper.timeout_finished.append(self.module_name)
+        pool = self.pool
+        while True:
+            with pool.lock:
+                pool.idle += 1
+            item = pool.queue.get()
+            if item is None:
+                # the pool is stopping
+                break
+            module, module_name, queued = item
+            pool.runner_busy(time.time() - queued)
+            self.running = module_name or "task"
+            try:
+                module.run()
+            except:  # noqa e722
+                self.py3_wrapper.report_exception("Runner")
+            self.running = None
+            # the module is no longer running so notify the timeout logic
+            if module_name:
+                self.py3_wrapper.timeout_finished.append(module_name)
+
+
+class RunnerPool:
+    """
+    A fixed size pool of Runner threads.  Items queued are run by the first
+    free Runner.  Runners are only created when needed and are then kept so
+    that we do not create a new thread each time something is run.
+    """
+
+    def __init__(self, py3_wrapper, size):
+        self.idle = 0
+        self.lock = Lock()
+        self.py3_wrapper = py3_wrapper
+        self.queue = Queue()
+        self.runners = []
+        self.size = max(size, 1)
+
+        # stats
+        self.max_queue_depth = 0
+        self.max_wait_time = 0
+        self.runs = 0
+        self.wait_time = 0
+
+    def add(self, module, module_name):
+        """
+        Queue the module or task to be run.
+        """
+        self.queue.put((module, module_name, time.time()))
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        # start a new runner if all are busy and we are allowed one
+        if depth > self.idle and len(self.runners) < self.size:
+            with self.lock:
+                if len(self.runners) < self.size:
+                    self.runners.append(Runner(self))
+
+    def stop(self, timeout=RUNNER_STOP_TIMEOUT):
+        """
+        Stop the runners once they have run what is already queued, waiting
+        at most timeout seconds for them to finish.
+        """
+        with self.lock:
+            runners = list(self.runners)
+        for _ in runners:
+            self.queue.put(None)
+        end = time.time() + timeout
+        for runner in runners:
+            runner.join(max(end - time.time(), 0))
+
+    def runner_busy(self, wait):
+        """
+        A runner has taken an item from the queue.  Record how long the item
+        waited before being run.
+        """
+        with self.lock:
+            self.idle -= 1
+            self.runs += 1
+            self.wait_time += wait
+            if wait > self.max_wait_time:
+                self.max_wait_time = wait
+
+    def stats(self):
+        """
+        Return information about the pool.
+        """
+        with self.lock:
+            return {
+                "size": self.size,
+                "threads": len(self.runners),
+                "idle": self.idle,
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "runs": self.runs,
+                "wait_time_avg": self.wait_time / self.runs if self.runs else 0,
+                "wait_time_max": self.max_wait_time,
+            }
+
+
+class OutputLine:
+    """
+    The line of output sent to i3bar.  We keep the json encoded output for
+    each position in the bar so that only modules that have updated need to
+    be encoded, the line is then built in a reused buffer.
+    """
+
+    def __init__(self, size):
+        self.buffer = bytearray()
+        self.fragments = [b""] * size
+
+        # stats
+        self.bytes_written = 0
+        self.encode_time = 0
+        self.encodes = 0
+        self.lines = 0
+        self.max_updates = 0
+        self.updates = 0
+
+    def update(self, positions, outputs):
+        """
+        Set the outputs for the given positions in the bar.
+        Returns True if the line has changed.
+        """
+        start = time.perf_counter()
+        fragment = ",".join([dumps(x) for x in outputs]).encode()
+        self.encode_time += time.perf_counter() - start
+        self.encodes += 1
+
+        changed = False
+        for index in positions:
+            if self.fragments[index] != fragment:
+                self.fragments[index] = fragment
+                changed = True
+        return changed
+
+    def build(self, updates=1):
+        """
+        Build and return the line to be output.
+        updates is the number of module updates included in the line.
+        """
+        line = self.buffer
+        del line[:]
+        line += b",["
+        first = True
+        for fragment in self.fragments:
+            if fragment:
+                if not first:
+                    line += b","
+                line += fragment
+                first = False
+        line += b"]\n"
+        self.bytes_written += len(line)
+        self.lines += 1
+        self.updates += updates
+        if updates > self.max_updates:
+            self.max_updates = updates
+        return line
+
+    def stats(self):
+        """
+        Return information about the output.
+        """
+        return {
+            "bytes_written": self.bytes_written,
+            "encode_time": self.encode_time,
+            "encodes": self.encodes,
+            "lines": self.lines,
+            "updates": self.updates,
+            "updates_per_line_avg": self.updates / self.lines if self.lines else 0,
+            "updates_per_line_max": self.max_updates,
+        }
 
 
 class NoneSetting:
@@ -101,6 +304,9 @@ class CheckI3StatusThread(Task):
         self.notify_user = py3_wrapper.notify_user
 
     def run(self):
+        # i3status was stopped by a config reload
+        if self.i3status_thread.stopped:
+            return
         # check i3status thread
         if not self.i3status_thread.is_alive():
             err = self.i3status_thread.error
@@ -253,14 +459,28 @@ class Py3statusWrapper:
         self.i3bar_running = True
         self.last_refresh_ts = time.time()
         self.lock = Event()
+        self.log_writer = None
+        self.module_index = ModuleIndex()
         self.modules = {}
         self.notified_messages = set()
         self.options = options
+        self.output_line = None
         self.output_modules = {}
+        self.profiler = None
         self.py3_modules = []
+        self.reload_requested = False
+        self.runner_pool = None
         self.running = True
         self.update_queue = deque()
         self.update_request = Event()
+        self.update_urgent = Event()
+
+        if self.config.get("log_file"):
+            self.log_writer = LogWriter(self.config["log_file"])
+            self.log_writer.start()
+
+        # minimum time between lines being output to i3bar
+        self.frame_interval = 0
 
         # shared code
         self.common = Common(self)
@@ -269,19 +489,22 @@ class Py3statusWrapper:
 
         # these are used to schedule module updates
         self.timeout_add_queue = deque()
+        self.timeout_cancelled = 0
+        self.timeout_counter = count()
         self.timeout_due = None
         self.timeout_finished = deque()
-        self.timeout_keys = []
+        self.timeout_kill = {}
         self.timeout_missed = {}
-        self.timeout_queue = {}
+        self.timeout_queue = []
         self.timeout_queue_lookup = {}
         self.timeout_running = set()
+        self.timeout_slack = TIMEOUT_SLACK
         self.timeout_update_due = deque()
 
     def timeout_queue_add(self, item, cache_time=0):
         """
         Add a item to be run at a future time.
-        This must be a Module, I3statusModule or a Task
+        This must be a Module, I3statusModule, Storage or a Task
         """
         # add the info to the add queue.  We do this so that actually adding
         # the module is done in the core thread.
@@ -296,46 +519,81 @@ class Py3statusWrapper:
         Add a module to the timeout_queue if it is scheduled in the future or
         if it is due for an update immediately just trigger that.
 
-        the timeout_queue is a dict with the scheduled time as the key and the
-        value is a list of module instance names due to be updated at that
-        point. An ordered list of keys is kept to allow easy checking of when
-        updates are due.  A list is also kept of which modules are in the
-        update_queue to save having to search for modules in it unless needed.
+        the timeout_queue is a heap of [scheduled time, counter, module]
+        entries so the next update due is always the first item.  The
+        timeout_queue_lookup dict maps modules to their entry in the heap.
+        Removing a module from the queue just marks its entry as cancelled
+        and the entry is discarded when it reaches the top of the heap.
+
+        Scheduled times are rounded up to the timeout_slack so that modules
+        due at nearly the same time are updated together.
         """
         # If already set to update do nothing
         if module in self.timeout_update_due:
             return
 
-        # remove if already in the queue
-        key = self.timeout_queue_lookup.get(module)
-        if key:
-            queue_item = self.timeout_queue[key]
-            queue_item.remove(module)
-            if not queue_item:
-                del self.timeout_queue[key]
-                self.timeout_keys.remove(key)
+        # a module removed by a config reload may still add itself
+        if getattr(module, "terminated", False):
+            return
+
+        # cancel if already in the queue
+        entry = self.timeout_queue_lookup.pop(module, None)
+        if entry:
+            entry[2] = None
+            self.timeout_cancelled += 1
 
         if cache_time == 0:
             # if cache_time is 0 we can just trigger the module update
             self.timeout_update_due.append(module)
-            self.timeout_queue_lookup[module] = None
         else:
             # add the module to the timeout queue
-            if cache_time not in self.timeout_keys:
-                self.timeout_queue[cache_time] = {module}
-                self.timeout_keys.append(cache_time)
-                # sort keys so earliest is first
-                self.timeout_keys.sort()
-
-                # when is next timeout due?
-                try:
-                    self.timeout_due = self.timeout_keys[0]
-                except IndexError:
-                    self.timeout_due = None
-            else:
-                self.timeout_queue[cache_time].add(module)
+            if self.timeout_slack:
+                cache_time = ceil(cache_time / self.timeout_slack) * self.timeout_slack
+            entry = [cache_time, next(self.timeout_counter), module]
+            heappush(self.timeout_queue, entry)
             # note that the module is in the timeout_queue
-            self.timeout_queue_lookup[module] = cache_time
+            self.timeout_queue_lookup[module] = entry
+
+            # if there are many cancelled entries then rebuild the heap
+            if self.timeout_cancelled > len(self.timeout_queue) // 2:
+                self.timeout_queue = [x for x in self.timeout_queue if x[2]]
+                heapify(self.timeout_queue)
+                self.timeout_cancelled = 0
+
+        self.timeout_set_due()
+
+    def timeout_queue_remove(self, module):
+        """
+        Remove a module from the timeout_queue.  This must only be called
+        from the core thread.
+        """
+        entry = self.timeout_queue_lookup.pop(module, None)
+        if entry:
+            entry[2] = None
+            self.timeout_cancelled += 1
+        try:
+            self.timeout_update_due.remove(module)
+        except ValueError:
+            pass
+        # an update waiting for the module to finish running
+        module_name = getattr(module, "module_full_name", None)
+        if self.timeout_missed.get(module_name) is module:
+            del self.timeout_missed[module_name]
+
+    def timeout_set_due(self):
+        """
+        Remove any cancelled entries from the top of the timeout_queue and
+        note when the next timeout is due.
+        """
+        queue = self.timeout_queue
+        while queue and queue[0][2] is None:
+            heappop(queue)
+            self.timeout_cancelled -= 1
+        # when is next timeout due?
+        if queue:
+            self.timeout_due = queue[0][0]
+        else:
+            self.timeout_due = None
 
     def timeout_queue_process(self):
         """
@@ -345,32 +603,21 @@ class Py3statusWrapper:
         while self.timeout_add_queue:
             self.timeout_process_add_queue(*self.timeout_add_queue.popleft())
         now = time.time()
-        due_timeouts = []
+        queue = self.timeout_queue
         # find any due timeouts
-        for timeout in self.timeout_keys:
-            if timeout > now:
-                break
-            due_timeouts.append(timeout)
-
-        if due_timeouts:
-            # process them
-            for timeout in due_timeouts:
-                modules = self.timeout_queue[timeout]
-                # remove from the queue
-                del self.timeout_queue[timeout]
-                self.timeout_keys.remove(timeout)
-
-                for module in modules:
-                    # module no longer in queue
-                    del self.timeout_queue_lookup[module]
-                    # tell module to update
-                    self.timeout_update_due.append(module)
-
-            # when is next timeout due?
-            try:
-                self.timeout_due = self.timeout_keys[0]
-            except IndexError:
-                self.timeout_due = None
+        if queue and queue[0][0] <= now:
+            while queue and queue[0][0] <= now:
+                module = heappop(queue)[2]
+                if module is None:
+                    # cancelled entry
+                    self.timeout_cancelled -= 1
+                    continue
+                # module no longer in queue
+                del self.timeout_queue_lookup[module]
+                # tell module to update
+                self.timeout_update_due.append(module)
+
+            self.timeout_set_due()
 
         # process any finished modules.
         # Now that the module has finished running it may have been marked to
@@ -384,6 +631,10 @@ class Py3statusWrapper:
         while self.timeout_finished:
             module_name = self.timeout_finished.popleft()
             self.timeout_running.discard(module_name)
+            # a module removed by a config reload is killed once it has
+            # finished running and before any replacement is run
+            for module in self.timeout_kill.pop(module_name, []):
+                module.kill()
             if module_name in self.timeout_missed:
                 module = self.timeout_missed.pop(module_name)
                 self.timeout_update_due.append(module)
@@ -398,7 +649,7 @@ class Py3statusWrapper:
                 self.timeout_missed[module_name] = module
             else:
                 self.timeout_running.add(module_name)
-                Runner(module, self, module_name)
+                self.runner_pool.add(module, module_name)
 
         # we return how long till we next need to process the timeout_queue
         if self.timeout_due is not None:
@@ -429,9 +680,12 @@ class Py3statusWrapper:
         `entry_point` (from installed package): "entry_point", <Py3Status class>
 
         Modules of the same name from entry points shadow all other modules.
+        Only entry point modules in the config are imported.
         """
+        module_names = {module.split(" ")[0] for module in self.py3_modules}
         user_modules = self._get_path_based_modules()
-        user_modules.update(self._get_entry_point_based_modules())
+        user_modules.update(self._get_entry_point_based_modules(module_names))
+        self.module_index.save()
         return user_modules
 
     def _get_path_based_modules(self):
@@ -444,9 +698,7 @@ class Py3statusWrapper:
         """
         user_modules = {}
         for include_path in self.config["include_paths"]:
-            for f_name in sorted(os.listdir(include_path)):
-                if not f_name.endswith(".py"):
-                    continue
+            for f_name in self.module_index.path_modules(include_path):
                 module_name = f_name[:-3]
                 # do not overwrite modules if already found
                 if module_name in user_modules:
@@ -457,17 +709,23 @@ class Py3statusWrapper:
                 )
         return user_modules
 
-    def _get_entry_point_based_modules(self):
+    def _get_entry_point_based_modules(self, module_names=None):
+        """
+        Import the modules provided by entry points, if module_names is given
+        only those modules are imported.
+        """
         classes_from_entry_points = {}
-        for entry_point in pkg_resources.iter_entry_points(ENTRY_POINT_NAME):
+        entry_points = self.module_index.entry_point_modules(ENTRY_POINT_NAME)
+        for module_name, entry_point in sorted(entry_points.items()):
+            if module_names is not None and module_name not in module_names:
+                continue
             try:
-                module = entry_point.load()
+                module = load_entry_point(entry_point)
             except Exception as err:
                 self.log("entry_point '{}' error: {}".format(entry_point, err))
                 continue
             klass = getattr(module, Module.EXPECTED_CLASS, None)
             if klass:
-                module_name = entry_point.module_name.split(".")[-1]
                 classes_from_entry_points[module_name] = (ENTRY_POINT_KEY, klass)
                 self.log(
                     "available module from {}: {}".format(ENTRY_POINT_KEY, module_name)
@@ -503,27 +761,64 @@ class Py3statusWrapper:
             'pewpew': ('entry_point', <Py3Status class>),
         }
         """
+        start = time.time()
+        # modules are loaded in parallel, instances of the same module are
+        # loaded together so that the module is only imported once.
+        groups = OrderedDict()
         for module in modules_list:
             # ignore already provided modules (prevents double inclusion)
             if module in self.modules:
                 continue
-            try:
-                instance = None
-                payload = user_modules.get(module)
-                if payload:
-                    kind, Klass = payload
-                    if kind == ENTRY_POINT_KEY:
-                        instance = Klass()
-                my_m = Module(module, user_modules, self, instance=instance)
-                # only handle modules with available methods
-                if my_m.methods:
-                    self.modules[module] = my_m
-                elif self.config["debug"]:
-                    self.log('ignoring module "{}" (no methods found)'.format(module))
-            except Exception:
-                err = sys.exc_info()[1]
-                msg = 'Loading module "{}" failed ({}).'.format(module, err)
-                self.report_exception(msg, level="warning")
+            instances = groups.setdefault(module.split(" ")[0], [])
+            if module not in instances:
+                instances.append(module)
+
+        def load_group(modules):
+            return [
+                (module, self.load_module(module, user_modules)) for module in modules
+            ]
+
+        loaded = {}
+        with ThreadPoolExecutor(MODULE_LOAD_THREADS) as executor:
+            for results in executor.map(load_group, groups.values()):
+                loaded.update(results)
+
+        # keep the modules in the configured order
+        for module in modules_list:
+            my_m = loaded.pop(module, None)
+            if my_m is None:
+                continue
+            # only handle modules with available methods
+            if my_m.methods:
+                self.modules[module] = my_m
+            elif self.config["debug"]:
+                self.log('ignoring module "{}" (no methods found)'.format(module))
+        self.log(
+            "loaded {} modules in {:.3f}s".format(
+                len(self.modules), time.time() - start
+            )
+        )
+
+    def load_module(self, module, user_modules):
+        """
+        Create the Module for a module name, returns None if it fails.
+        """
+        start = time.time()
+        try:
+            instance = None
+            payload = user_modules.get(module)
+            if payload:
+                kind, Klass = payload
+                if kind == ENTRY_POINT_KEY:
+                    instance = Klass()
+            my_m = Module(module, user_modules, self, instance=instance)
+        except Exception:
+            err = sys.exc_info()[1]
+            msg = 'Loading module "{}" failed ({}).'.format(module, err)
+            self.report_exception(msg, level="warning")
+            return None
+        self.log('loaded module "{}" in {:.3f}s'.format(module, time.time() - start))
+        return my_m
 
     def setup(self):
         """
@@ -586,41 +881,11 @@ class Py3statusWrapper:
                 k: v.strip() for k, v in (x.split(":", 1) for x in resources)
             }
 
-        # setup i3status thread
-        self.i3status_thread = I3status(self)
-
-        # If standalone or no i3status modules then use the mock i3status
-        # else start i3status thread.
-        i3s_modules = self.config["py3_config"]["i3s_modules"]
-        if self.config["standalone"] or not i3s_modules:
-            self.i3status_thread.mock()
-            i3s_mode = "mocked"
-        else:
-            for module in i3s_modules:
-                self.log("adding module {}".format(module))
-            i3s_mode = "started"
-            self.i3status_thread.start()
-            while not self.i3status_thread.ready:
-                if not self.i3status_thread.is_alive():
-                    # i3status is having a bad day, so tell the user what went
-                    # wrong and do the best we can with just py3status modules.
-                    err = self.i3status_thread.error
-                    self.notify_user(err)
-                    self.i3status_thread.mock()
-                    i3s_mode = "mocked"
-                    break
-                time.sleep(0.1)
-        if self.config["debug"]:
-            self.log(
-                "i3status thread {} with config {}".format(
-                    i3s_mode, self.config["py3_config"]
-                )
-            )
+        # let i3bar know we are running while we start up
+        self.start_output()
 
-        # add i3status thread monitoring task
-        if i3s_mode == "started":
-            task = CheckI3StatusThread(self.i3status_thread, self)
-            self.timeout_queue_add(task)
+        # setup i3status thread
+        i3s_mode = self.start_i3status()
 
         # setup input events thread
         self.events_thread = Events(self)
@@ -644,6 +909,9 @@ class Py3statusWrapper:
             sys.stdout = open("/dev/null", "w")
             sys.stderr = open("/dev/null", "w")
 
+        # apply the options that can be changed by a reload
+        self.set_options()
+
         # get the list of py3status configured modules
         self.py3_modules = self.config["py3_config"]["py3_modules"]
 
@@ -654,9 +922,85 @@ class Py3statusWrapper:
             self.log("user_modules={}".format(user_modules))
 
         if self.py3_modules:
-            # load and spawn i3status.conf configured modules threads
+            # load and spawn i3status.conf configured modules threads while
+            # i3status starts
             self.load_modules(self.py3_modules, user_modules)
 
+        self.wait_i3status(i3s_mode)
+
+        # create the pool of threads that modules and tasks are run in.
+        # By default we allow a thread per module plus a few for tasks.
+        worker_threads = self.config["py3_config"]["py3status"].get(
+            "worker_threads", len(self.modules) + WORKER_THREADS_EXTRA
+        )
+        self.runner_pool = RunnerPool(self, worker_threads)
+        self.log("worker threads: {}".format(self.runner_pool.size))
+
+    def set_options(self):
+        """
+        Apply the py3status section options that do not need a restart.
+        """
+        options = self.config["py3_config"]["py3status"]
+
+        # limit the number of format strings kept in the parsing caches
+        format_cache_size = options.get("format_cache_size", FORMAT_CACHE_SIZE)
+        for cache in self.format_caches().values():
+            cache.resize(format_cache_size)
+
+        # limit the number of lines output to i3bar per second
+        max_fps = options.get("max_fps", MAX_FPS)
+        self.frame_interval = 1.0 / max_fps if max_fps else 0
+
+        # modules due to update within this many seconds are run together
+        self.timeout_slack = options.get("timer_slack", TIMEOUT_SLACK)
+
+    def start_i3status(self):
+        """
+        Create the i3status thread.  If standalone or there are no i3status
+        modules then i3status is mocked rather than started.
+        Returns "started" or "mocked".
+        """
+        self.i3status_thread = I3status(self)
+        i3s_modules = self.i3status_thread.i3s_modules
+        if self.config["standalone"] or not i3s_modules:
+            self.i3status_thread.mock()
+            return "mocked"
+        for module in i3s_modules:
+            self.log("adding module {}".format(module))
+        self.i3status_thread.start()
+        return "started"
+
+    def wait_i3status(self, i3s_mode):
+        """
+        Wait for a started i3status to be ready then start the i3status
+        modules that py3status runs itself.
+        """
+        if i3s_mode == "started":
+            while not self.i3status_thread.ready:
+                if not self.i3status_thread.is_alive():
+                    # i3status is having a bad day, so tell the user what went
+                    # wrong and do the best we can with just py3status modules.
+                    err = self.i3status_thread.error
+                    self.notify_user(err)
+                    self.i3status_thread.mock()
+                    i3s_mode = "mocked"
+                    break
+                time.sleep(0.1)
+        if self.config["debug"]:
+            self.log(
+                "i3status thread {} with config {}".format(
+                    i3s_mode, self.config["py3_config"]
+                )
+            )
+
+        # start any i3status modules that are run by py3status
+        self.i3status_thread.start_native_modules()
+
+        # add i3status thread monitoring task
+        if i3s_mode == "started":
+            task = CheckI3StatusThread(self.i3status_thread, self)
+            self.timeout_queue_add(task)
+
     def notify_user(
         self,
         msg,
@@ -747,12 +1091,115 @@ class Py3statusWrapper:
             self.lock.set()
             if self.config["debug"]:
                 self.log("lock set, exiting")
-            # run kill() method on all py3status modules
-            for module in self.modules.values():
+            # modules are not killed while they are running
+            if self.runner_pool:
+                self.runner_pool.stop()
+            # run kill() method on all py3status modules including those
+            # removed by a config reload that have not yet finished running
+            modules = list(self.modules.values())
+            for killed in self.timeout_kill.values():
+                modules.extend(killed)
+            for module in modules:
                 module.kill()
         except:  # noqa e722
             pass
 
+        # write any storage changes that are waiting to be flushed
+        try:
+            Py3._http_client.save_cache()
+            Py3._storage.flush()
+        except:  # noqa e722
+            self.log("storage flush failed", "error")
+
+    def format_caches(self):
+        """
+        Return the caches used when parsing format strings.
+        """
+        return {
+            "blocks": Formatter.block_cache,
+            "color_names": Py3._format_color_names,
+            "placeholders": Py3._format_placeholders,
+            "placeholders_match": Py3._format_placeholders_cache,
+            "render_names": Py3._format_render_names,
+            "tokens": Formatter.format_string_cache,
+        }
+
+    def stats(self, module_names=None):
+        """
+        Return statistics about this py3status instance for py3-cmd.  If
+        module_names is given only the runtime statistics of those modules
+        are returned.
+        """
+        modules = {
+            name: module.metrics.stats()
+            for name, module in list(self.modules.items())
+            if module_names is None or name in module_names
+        }
+        if module_names is not None:
+            return {"modules": modules}
+        stats = {
+            "commands": Py3._command_cache.stats(),
+            "format_caches": {
+                name: cache.stats() for name, cache in self.format_caches().items()
+            },
+            "modules": modules,
+        }
+        # these are created once py3status is running
+        if self.output_line:
+            stats["output"] = self.output_line.stats()
+        if self.runner_pool:
+            stats["runner_pool"] = self.runner_pool.stats()
+        return stats
+
+    def thread_labels(self):
+        """
+        Return a dict of thread ident to what the thread is doing for the
+        profiler.  Idle worker threads are labeled None.
+        """
+        labels = {main_thread().ident: "core"}
+        threads = [
+            (self.commands_thread, "commands"),
+            (self.events_thread, "events"),
+            (self.i3status_thread, "i3status"),
+        ]
+        for thread, label in threads:
+            if thread.ident:
+                labels[thread.ident] = label
+        if self.runner_pool:
+            for runner in list(self.runner_pool.runners):
+                labels[runner.ident] = runner.running
+        return labels
+
+    def run_profiler(self, action, modules=None):
+        """
+        Start or stop the sampling profiler for py3-cmd.  When stopped the
+        collapsed stacks are written to a new file in $XDG_RUNTIME_DIR or the
+        temp directory.
+        """
+        if action == "start":
+            if self.profiler:
+                return {"error": "profiler already running"}
+            self.profiler = SamplingProfiler(self.thread_labels, modules)
+            self.profiler.start()
+            self.log("profiler started")
+            return {"profiler": "started"}
+        if not self.profiler:
+            return {"error": "profiler not running"}
+        # the file is created securely as the temp directory is shared
+        try:
+            fd, path = tempfile.mkstemp(
+                prefix="py3status_{}_".format(os.getpid()),
+                suffix=".folded",
+                dir=os.environ.get("XDG_RUNTIME_DIR") or None,
+            )
+        except OSError as e:
+            return {"error": "cannot create profile file: {}".format(e)}
+        profiler, self.profiler = self.profiler, None
+        with os.fdopen(fd, "w") as f:
+            samples = profiler.stop(f)
+        self.log("profiler stopped, {} samples written to {}".format(samples, path))
+        return {"file": path, "samples": samples}
+
     def refresh_modules(self, module_string=None, exact=True):
         """
         Update modules.
@@ -787,6 +1234,117 @@ class Py3statusWrapper:
         if update_i3status:
             self.i3status_thread.refresh_i3status()
 
+    def request_reload(self):
+        """
+        Ask the core thread to reload the config.
+        """
+        self.reload_requested = True
+        self.update_request.set()
+
+    def reload_config(self):
+        """
+        Read the config file again and apply any changes.  Only the modules
+        whose config has changed are restarted and i3status is only restarted
+        if its config has changed.
+        """
+        self.log("reloading config")
+        py3_config = self.config["py3_config"]
+        try:
+            new_config = process_config(self.config["i3status_config_path"], self)
+        except Exception:
+            self.report_exception("Reloading config failed")
+            return
+        old_config = dict(py3_config)
+
+        def changed(name):
+            return old_config.get(name) != new_config.get(name)
+
+        # the general and py3status sections give defaults for all modules
+        general_changed = changed("general")
+        skip = RELOAD_OPTIONS + RESTART_OPTIONS
+        old_options = {
+            k: v for k, v in old_config["py3status"].items() if k not in skip
+        }
+        new_options = {
+            k: v for k, v in new_config["py3status"].items() if k not in skip
+        }
+        defaults_changed = general_changed or old_options != new_options
+        for name in RESTART_OPTIONS:
+            if old_config["py3status"].get(name) != new_config["py3status"].get(name):
+                self.log("{} needs a restart to be changed".format(name))
+        old_i3s = old_config["i3s_modules"]
+        new_i3s = new_config["i3s_modules"]
+        restart_i3status = (
+            general_changed
+            or old_i3s != new_i3s
+            or any(changed(name) for name in new_i3s)
+            or old_config["py3status"].get("native_i3status_modules")
+            != new_config["py3status"].get("native_i3status_modules")
+        )
+        stop_modules = [
+            name
+            for name in old_config["py3_modules"]
+            if defaults_changed
+            or changed(name)
+            or name not in new_config["py3_modules"]
+        ]
+        start_modules = [
+            name
+            for name in new_config["py3_modules"]
+            if name in stop_modules or name not in old_config["py3_modules"]
+        ]
+
+        # the config dict is shared so it is updated in place
+        py3_config.clear()
+        py3_config.update(new_config)
+        self.py3_modules = py3_config["py3_modules"]
+        self.events_thread.on_click = py3_config["on_click"]
+        self.set_options()
+
+        for name in stop_modules:
+            self.output_modules.pop(name, None)
+            module = self.modules.pop(name, None)
+            if module:
+                module.terminated = True
+                self.timeout_queue_remove(module)
+                # a running module is killed when it has finished
+                if name in self.timeout_running:
+                    self.timeout_kill.setdefault(name, []).append(module)
+                else:
+                    module.kill()
+
+        if restart_i3status:
+            self.i3status_thread.stop()
+            for name, output_module in list(self.output_modules.items()):
+                if output_module["type"] == "i3status":
+                    self.timeout_queue_remove(output_module["module"])
+                    del self.output_modules[name]
+            self.wait_i3status(self.start_i3status())
+            for module in self.modules.values():
+                module.i3status_thread = self.i3status_thread
+
+        # new modules add their output when they have run
+        unchanged = list(self.output_modules)
+
+        if start_modules:
+            self.load_modules(start_modules, self.get_user_configured_modules())
+
+        self.create_mappings(py3_config)
+        self.create_output_modules()
+        for name in start_modules:
+            if name in self.modules:
+                self.timeout_queue_add(ModuleRunner(self.modules[name]))
+
+        # the bar is rebuilt as the order of the modules may have changed
+        self.output_line = OutputLine(len(py3_config["order"]))
+        if unchanged:
+            self.notify_update(unchanged)
+        self.log(
+            "config reloaded: {} modules restarted, i3status {}".format(
+                len(start_modules), "restarted" if restart_i3status else "unchanged"
+            )
+        )
+
     def sig_handler(self, signum, frame):
         """
         SIGUSR1 was received, the user asks for an immediate refresh of the bar
@@ -851,6 +1409,9 @@ class Py3statusWrapper:
 
         # we need to update the output
         if self.update_queue:
+            # urgent updates do not wait for the next frame
+            if urgent:
+                self.update_urgent.set()
             self.update_request.set()
 
     def log(self, msg, level="info"):
@@ -862,23 +1423,8 @@ class Py3statusWrapper:
             level = LOG_LEVELS.get(level, level)
             syslog(level, "{}".format(msg))
         else:
-            # Binary mode so fs encoding setting is not an issue
-            with open(self.config["log_file"], "ab") as f:
-                log_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                # nice formatting of data structures using pretty print
-                if isinstance(msg, (dict, list, set, tuple)):
-                    msg = pformat(msg)
-                    # if multiline then start the data output on a fresh line
-                    # to aid readability.
-                    if "\n" in msg:
-                        msg = "\n" + msg
-                out = "{} {} {}\n".format(log_time, level.upper(), msg)
-                try:
-                    # Encode unicode strings to bytes
-                    f.write(out.encode("utf-8"))
-                except (AttributeError, UnicodeDecodeError):
-                    # Write any byte strings straight to log
-                    f.write(out)
+            # the message is formatted and written by the log writer thread
+            self.log_writer.log(msg, level)
 
     def create_output_modules(self):
         """
@@ -899,18 +1445,18 @@ class Py3statusWrapper:
         for name in self.modules:
             if name not in output_modules:
                 output_modules[name] = {}
-                output_modules[name]["position"] = positions.get(name, [])
                 output_modules[name]["module"] = self.modules[name]
                 output_modules[name]["type"] = "py3status"
-                output_modules[name]["color"] = self.mappings_color.get(name)
         # i3status modules
         for name in i3modules:
             if name not in output_modules:
                 output_modules[name] = {}
-                output_modules[name]["position"] = positions.get(name, [])
                 output_modules[name]["module"] = i3modules[name]
                 output_modules[name]["type"] = "i3status"
-                output_modules[name]["color"] = self.mappings_color.get(name)
+        # the order and colors can change when the config is reloaded
+        for name, output_module in output_modules.items():
+            output_module["position"] = positions.get(name, [])
+            output_module["color"] = self.mappings_color.get(name)
 
         self.output_modules = output_modules
 
@@ -932,7 +1478,7 @@ class Py3statusWrapper:
 
     def process_module_output(self, module):
         """
-        Process the output for a module and return a json string representing it.
+        Process the output for a module and return the list of outputs.
         Color processing occurs here.
         """
         outputs = module["module"].get_latest()
@@ -942,8 +1488,7 @@ class Py3statusWrapper:
                 # Color: substitute the config defined color
                 if "color" not in output:
                     output["color"] = color
-        # Create the json string output.
-        return ",".join([dumps(x) for x in outputs])
+        return outputs
 
     def i3bar_stop(self, signum, frame):
         self.log("received SIGTSTP")
@@ -969,6 +1514,61 @@ class Py3statusWrapper:
             if module["type"] == "py3status":
                 module["module"].wake()
 
+    def start_output(self):
+        """
+        Send the i3bar protocol header and a placeholder line so that the bar
+        shows we are running while the modules load.
+        """
+        header = {
+            "version": 1,
+            "click_events": self.config["click_events"],
+            "stop_signal": SIGTSTP,
+        }
+        write = sys.__stdout__.buffer.write
+        write(dumps(header).encode())
+        write(b"\n[[]\n")
+        write(",[{}]\n".format(dumps(STARTUP_PLACEHOLDER)).encode())
+        sys.__stdout__.buffer.flush()
+
+    def output_updates(self, last_frame):
+        """
+        Apply the queued module updates to the output line once the next
+        frame is due.  last_frame is when the last line was output.
+        Returns the line to output or None if it has not changed.
+        """
+        # if the last frame was recent then wait until the next one is due so
+        # that any other updates arriving can be output in the same line.
+        # Urgent updates are output immediately.
+        if self.frame_interval:
+            wait = last_frame + self.frame_interval - time.time()
+            if wait > 0:
+                self.update_urgent.wait(timeout=wait)
+            self.update_urgent.clear()
+
+        changed = False
+        output_line = self.output_line
+        updates = 0
+        updated = set()
+        while len(self.update_queue):
+            module_name = self.update_queue.popleft()
+            updates += 1
+            # a module may have updated more than once
+            if module_name in updated:
+                continue
+            updated.add(module_name)
+            module = self.output_modules.get(module_name)
+            # the module may have been removed by a config reload
+            if module is None:
+                continue
+            outputs = self.process_module_output(module)
+            if output_line.update(module["position"], outputs):
+                changed = True
+
+        # the first line is always output to replace the startup placeholder
+        if changed or not last_frame:
+            return output_line.build(updates)
+        return None
+
     @profile
     def run(self):
         """
@@ -998,20 +1598,12 @@ class Py3statusWrapper:
 
         # this will be our output set to the correct length for the number of
         # items in the bar
-        output = [None] * len(py3_config["order"])
+        self.output_line = OutputLine(len(py3_config["order"]))
 
-        write = sys.__stdout__.write
-        flush = sys.__stdout__.flush
-
-        # start our output
-        header = {
-            "version": 1,
-            "click_events": self.config["click_events"],
-            "stop_signal": SIGTSTP,
-        }
-        write(dumps(header))
-        write("\n[[]\n")
+        write = sys.__stdout__.buffer.write
+        flush = sys.__stdout__.buffer.flush
 
+        last_frame = 0
         update_due = None
         # main loop
         while True:
@@ -1026,19 +1618,18 @@ class Py3statusWrapper:
             while not self.i3bar_running:
                 time.sleep(0.1)
 
+            # config reloads are done here so that the modules and output
+            # are only changed by this thread
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload_config()
+                last_frame = 0
+
             # check if an update is needed
             if self.update_queue:
-                while len(self.update_queue):
-                    module_name = self.update_queue.popleft()
-                    module = self.output_modules[module_name]
-                    out = self.process_module_output(module)
-
-                    for index in module["position"]:
-                        # store the output as json
-                        output[index] = out
-
-                # build output string
-                out = ",".join([x for x in output if x])
-                # dump the line to stdout
-                write(",[{}]\n".format(out))
-                flush()
+                line = self.output_updates(last_frame)
+                if line is not None:
+                    # dump the line to stdout
+                    write(line)
+                    flush()
+                    last_frame = time.time()
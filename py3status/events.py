@@ -174,7 +174,8 @@ class Events(Thread):
         # if module is a py3status one call it.
         if module_info["type"] == "py3status":
             module = module_info["module"]
-            module.click_event(event)
+            with module.metrics.timed("on_click"):
+                module.click_event(event)
             if self.config["debug"]:
                 self.py3_wrapper.log("dispatching event {}".format(event))
 
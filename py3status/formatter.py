@@ -5,9 +5,15 @@ from numbers import Number
 
 from py3status.composite import Composite
 from py3status.constants import COLOR_NAMES, COLOR_NAMES_EXCLUDED
+from py3status.util import LRUCache
 
 from urllib.parse import parse_qsl
 
+# default number of format strings kept in each of the parsing caches
+FORMAT_CACHE_SIZE = 500
+
+SIMPLE_KEY = re.compile(r"[a-z_][a-z0-9_\-]*\Z", re.I)
+
 
 def expand_color(color, default=None, passthrough=False, block=None):
     """
@@ -49,8 +55,8 @@ class Formatter:
 
     reg_ex = re.compile(TOKENS[0], re.M | re.I)
 
-    block_cache = {}
-    format_string_cache = {}
+    block_cache = LRUCache(FORMAT_CACHE_SIZE)
+    format_string_cache = LRUCache(FORMAT_CACHE_SIZE)
 
     def __init__(self, py3_wrapper=None):
         self.py3_wrapper = py3_wrapper
@@ -60,10 +66,11 @@ class Formatter:
         Get the tokenized format_string.
         Tokenizing is resource intensive so we only do it once and cache it
         """
-        if format_string not in self.format_string_cache:
+        tokens = self.format_string_cache.get(format_string)
+        if tokens is None:
             tokens = list(re.finditer(self.reg_ex, format_string))
             self.format_string_cache[format_string] = tokens
-        return self.format_string_cache[format_string]
+        return tokens
 
     def get_color_names(self, format_string):
         """
@@ -84,6 +91,19 @@ class Formatter:
                 names.add(name)
         return names
 
+    def get_color_commands(self, format_string):
+        """
+        Parses the format_string and returns a set of the color names used in
+        color commands, not including hex colors.
+        """
+        names = set()
+        for token in self.tokens(format_string):
+            if token.group("command"):
+                name = dict(parse_qsl(token.group("command"))).get("color")
+                if name and name[0] != "#":
+                    names.add(name)
+        return names
+
     def get_placeholders(self, format_string):
         """
         Parses the format_string and returns a set of placeholders.
@@ -232,8 +252,10 @@ class Formatter:
 
         if block.parent:
             raise Exception("Block not closed")
+        first_block.compiled = compile_block(first_block)
         # add to the cache
         self.block_cache[format_string] = first_block
+        return first_block
 
     def format(
         self,
@@ -252,10 +274,31 @@ class Formatter:
             param_dict = {}
 
         # if the processed format string is not in the cache then create it.
-        if format_string not in self.block_cache:
-            self.build_block(format_string)
+        first_block = self.block_cache.get(format_string)
+        if first_block is None:
+            first_block = self.build_block(format_string)
+
+        output = None
+        if first_block.compiled:
+            output = first_block.compiled(param_dict)
+        if output is None:
+            output = self._render(first_block, module, param_dict, attr_getter)
+
+        # clean things up a little
+        if isinstance(output, list):
+            output = Composite(output)
+        if not output:
+            if force_composite:
+                output = Composite()
+            else:
+                output = ""
 
-        first_block = self.block_cache[format_string]
+        return output
+
+    def _render(self, first_block, module, param_dict, attr_getter):
+        """
+        Render the format string block tree.
+        """
 
         def get_parameter(key):
             """
@@ -286,17 +329,104 @@ class Formatter:
 
         # render our processed format
         valid, output = first_block.render(get_parameter, module)
+        return output
 
-        # clean things up a little
-        if isinstance(output, list):
-            output = Composite(output)
-        if not output:
-            if force_composite:
-                output = Composite()
-            else:
-                output = ""
 
-        return output
+def compile_block(block):
+    """
+    Compile a block with no sub blocks or commands into a function that
+    takes the param_dict and returns the same output that the block renders.
+    This is much faster than rendering the block as there is no tree to walk
+    or output to merge.
+
+    The function returns None if it cannot render the output, eg if a
+    placeholder is not in param_dict or has a value that is not a string or
+    number, and the block must be rendered instead.  None is returned if the
+    block cannot be compiled.
+    """
+    commands = block.commands
+    if (
+        block.next_block
+        or commands._if
+        or commands.color
+        or commands.max_length is not None
+        or commands.min_length
+        or commands.not_zero
+        or commands.show
+        or commands.soft
+    ):
+        return None
+
+    lines = ["def render(param_dict):"]
+    parts = []
+    valids = []
+    for index, item in enumerate(block.content):
+        if isinstance(item, Literal):
+            parts.append(repr(item.text))
+            continue
+        if not isinstance(item, Placeholder):
+            return None
+        format = item.format
+        # only numeric formats of normal placeholders are simple enough
+        if format and (
+            not format.startswith(":")
+            or "ceil" in format
+            or not SIMPLE_KEY.match(item.key)
+        ):
+            return None
+        name = "v{}".format(index)
+        lines += [
+            "    try:",
+            "        {} = param_dict[{!r}]".format(name, item.key),
+            "    except KeyError:",
+            "        return None",
+            "    t = type({})".format(name),
+        ]
+        if format:
+            if "d" in format:
+                value = "int(float({}))".format(name)
+            elif "f" in format or "g" in format:
+                value = "float({})".format(name)
+            else:
+                value = name
+            lines += [
+                "    if t is not int and t is not float:",
+                "        return None",
+                "    try:",
+                "        {} = format({}, {!r})".format(name, value, format[1:]),
+                "    except Exception:",
+                "        return None",
+            ]
+        else:
+            # '', None, and False are ignored numbers like 0 are not
+            lines += [
+                "    if t is str:",
+                "        {}_valid = {} != ''".format(name, name),
+                "    elif t is int or t is float:",
+                "        {}_valid = True".format(name),
+                "        {} = str({})".format(name, name),
+                "    else:",
+                "        return None",
+            ]
+            valids.append(name + "_valid")
+        parts.append(name)
+
+    if not parts:
+        return None
+    if not isinstance(block.content[-1], Literal) and valids:
+        # nothing valid means no output unless we end in a literal
+        if len(valids) == len([x for x in block.content if isinstance(x, Placeholder)]):
+            lines += [
+                "    if not ({}):".format(" or ".join(valids)),
+                "        return []",
+            ]
+    lines += [
+        "    text = {}".format(" + ".join(parts)),
+        "    return [{'full_text': text}] if text else []",
+    ]
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["render"]
 
 
 class Placeholder:
@@ -527,6 +657,7 @@ class Block:
 
         self.base_block = base_block
         self.commands = BlockConfig(parent)
+        self.compiled = None
         self.content = []
         self.next_block = None
         self.parent = parent
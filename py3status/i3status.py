@@ -1,7 +1,7 @@
+import re
 import sys
 
-from copy import deepcopy
-from json import loads
+from json import dumps, loads
 from datetime import datetime, timedelta, tzinfo
 from subprocess import Popen
 from subprocess import PIPE
@@ -13,6 +13,7 @@ from time import time
 from py3status.profiling import profile
 from py3status.py3 import Py3
 from py3status.events import IOPoller
+from py3status.i3status_native import NATIVE_MODULES, local_now, time_zone
 from py3status.constants import (
     I3S_ALLOWED_COLORS,
     I3S_COLOR_MODULES,
@@ -21,6 +22,10 @@ from py3status.constants import (
     TZTIME_FORMAT,
 )
 
+# i3status outputs a json list of flat objects.  This matches each object in
+# the list so that we can compare them before decoding.
+I3S_ITEM_REGEX = re.compile(r'\{(?:[^{}"]|"(?:[^"\\]|\\.)*")*\}')
+
 
 class Tz(tzinfo):
     """
@@ -55,7 +60,7 @@ class I3statusModule:
     `time` and `tztime`.
     """
 
-    def __init__(self, module_name, i3status):
+    def __init__(self, module_name, i3status, native=False):
         self.module_name = module_name
         self.module_full_name = module_name
 
@@ -74,6 +79,8 @@ class I3statusModule:
 
         # setup our output
         self.item = {"full_text": "", "name": name, "instance": instance}
+        # the raw json last received from i3status
+        self.raw = None
 
         self.i3status = i3status
         py3_wrapper = i3status.py3_wrapper
@@ -86,9 +93,19 @@ class I3statusModule:
                 color_map[py3_config["general"][key]] = value
         self.color_map = color_map
 
+        # native modules have their output created by py3status not i3status
+        self.native = None
         self.is_time_module = name in TIME_MODULES
         if self.is_time_module:
             self.setup_time_module()
+            if native:
+                self.native = True
+                self.tz = time_zone(py3_config[module_name].get("timezone"))
+        elif native:
+            self.py3 = Py3()
+            self.native = NATIVE_MODULES[name](
+                instance, py3_config[module_name], py3_config["general"]
+            )
 
     def setup_time_module(self):
         self.py3 = Py3()
@@ -131,11 +148,20 @@ class I3statusModule:
     def run(self):
         """
         updates the modules output.
-        Currently only time and tztime need to do this
+        Only time, tztime and native modules need to do this
         """
-        if self.update_time_value():
+        if self.i3status.stopped:
+            return
+        if self.is_time_module:
+            updated = self.update_time_value()
+            due_time = self.py3.time_in(sync_to=self.time_delta)
+        else:
+            updated = self.update_from_item(self.native.update())
+            due_time = self.py3.time_in(sync_to=self.i3status.update_interval)
+        if updated:
+            if self.native:
+                self.i3status._json_list = None
             self.i3status.py3_wrapper.notify_update(self.module_name)
-        due_time = self.py3.time_in(sync_to=self.time_delta)
 
         self.i3status.py3_wrapper.timeout_queue_add(self, due_time)
 
@@ -192,7 +218,10 @@ class I3statusModule:
         self.time_format = time_format
 
     def update_time_value(self):
-        date = datetime.now(self.tz)
+        if self.native and self.tz is None:
+            date = local_now()
+        else:
+            date = datetime.now(self.tz)
         # set the full_text with the correctly formatted date
         try:
             new_value = date.strftime(self.time_format)
@@ -253,20 +282,22 @@ class I3status(Thread):
         Our output will be read asynchronously from 'last_output'.
         """
         Thread.__init__(self)
+        self._json_list = None
         self.error = None
         self.i3modules = {}
+        self.i3s_modules = []
         self.i3status_pipe = None
         self.i3status_path = py3_wrapper.config["i3status_path"]
-        self.json_list = None
-        self.json_list_ts = None
         self.last_output = None
         self.last_refresh_ts = time()
         self.lock = py3_wrapper.lock
+        self.native_modules = []
         self.new_update = False
         self.py3_config = py3_wrapper.config["py3_config"]
         self.py3_wrapper = py3_wrapper
         self.ready = False
         self.standalone = py3_wrapper.config["standalone"]
+        self.stopped = False
         self.time_modules = []
         self.tmpfile_path = None
         self.update_due = 0
@@ -282,35 +313,87 @@ class I3status(Thread):
         """
         Do any setup work needed to run i3status modules
         """
+        native = self.py3_config["py3status"].get("native_i3status_modules", False)
+        if native is True:
+            native = list(NATIVE_MODULES) + list(TIME_MODULES)
+        elif not isinstance(native, list):
+            native = [native] if native else []
+
         for conf_name in self.py3_config["i3s_modules"]:
-            module = I3statusModule(conf_name, self)
+            name = conf_name.split()[0]
+            is_native = name in native and (
+                name in NATIVE_MODULES or name in TIME_MODULES
+            )
+            timezone = self.py3_config[conf_name].get("timezone")
+            if is_native and timezone and not time_zone(timezone):
+                # we cannot get this time zone so let i3status do it
+                is_native = False
+            module = I3statusModule(conf_name, self, native=is_native)
             self.i3modules[conf_name] = module
-            if module.is_time_module:
-                self.time_modules.append(module)
+            if is_native:
+                self.native_modules.append(module)
+            else:
+                # only these modules are run by i3status
+                self.i3s_modules.append(conf_name)
+                if module.is_time_module:
+                    self.time_modules.append(module)
+
+    def start_native_modules(self):
+        """
+        Start the modules that py3status creates the output of.
+        """
+        for module in self.native_modules:
+            self.py3_wrapper.timeout_queue_add(module)
 
-    def set_responses(self, json_list):
+    def set_responses(self, items):
         """
         Set the given i3status responses on their respective configuration.
+        items is a list of the raw json for each i3status module, items that
+        have not changed since the last response are skipped.
         """
-        self.update_json_list()
+        self._json_list = None
         updates = []
-        for index, item in enumerate(self.json_list):
-            conf_name = self.py3_config["i3s_modules"][index]
+        for index, raw in enumerate(items):
+            conf_name = self.i3s_modules[index]
 
             module = self.i3modules[conf_name]
-            if module.update_from_item(item):
+            if raw == module.raw:
+                continue
+            module.raw = raw
+            if module.update_from_item(loads(raw)):
                 updates.append(conf_name)
         if updates:
             self.py3_wrapper.notify_update(updates)
 
-    def update_json_list(self):
+    def process_line(self, line):
         """
-        Copy the last json list output from i3status so that any module
-        can modify it without altering the original output.
-        This is done so that any module's alteration of a i3status output json
-        will not be overwritten when the next i3status output gets polled.
+        Process a line of i3status output.
         """
-        self.json_list = deepcopy(self.last_output)
+        items = I3S_ITEM_REGEX.findall(line)
+        if len(items) != len(self.i3s_modules):
+            # the output was not as expected so decode it fully
+            items = [dumps(x) for x in loads(line)]
+        self.last_output = line
+        self.set_responses(items)
+
+    @property
+    def json_list(self):
+        """
+        The last i3status output as a list of dicts.  This is only used by
+        legacy modules so it is only created when needed.  Modules can modify
+        it without altering the output of the i3status modules.
+        """
+        json_list = self._json_list
+        if json_list is None and (self.last_output is not None or self.native_modules):
+            json_list = []
+            for conf_name in self.py3_config["i3s_modules"]:
+                module = self.i3modules[conf_name]
+                if module.is_time_module and module.raw:
+                    json_list.append(loads(module.raw))
+                else:
+                    json_list.append(module.item.copy())
+            self._json_list = json_list
+        return json_list
 
     @staticmethod
     def write_in_tmpfile(text, tmpfile):
@@ -330,11 +413,11 @@ class I3status(Thread):
         based on the parsed one from 'i3status_config_path'.
         """
         # order += ...
-        for module in self.py3_config["i3s_modules"]:
+        for module in self.i3s_modules:
             self.write_in_tmpfile('order += "%s"\n' % module, tmpfile)
         self.write_in_tmpfile("\n", tmpfile)
         # config params for general section and each module
-        for section_name in ["general"] + self.py3_config["i3s_modules"]:
+        for section_name in ["general"] + self.i3s_modules:
             section = self.py3_config[section_name]
             self.write_in_tmpfile("%s {\n" % section_name, tmpfile)
             for key, value in section.items():
@@ -370,14 +453,24 @@ class I3status(Thread):
                 self.py3_wrapper.log("refreshing i3status")
             if self.i3status_pipe:
                 self.i3status_pipe.send_signal(SIGUSR1)
+            for module in self.native_modules:
+                self.py3_wrapper.timeout_queue_add(module)
             self.last_refresh_ts = time()
 
+    def stop(self):
+        """
+        Stop i3status and our modules, used when the config is reloaded.
+        """
+        self.stopped = True
+        if self.i3status_pipe:
+            self.i3status_pipe.kill()
+
     @profile
     def run(self):
         # if the i3status process dies we want to restart it.
         # We give up restarting if we have died too often
         for x in range(10):
-            if not self.py3_wrapper.running:
+            if not self.py3_wrapper.running or self.stopped:
                 break
             self.spawn_i3status()
             # check if we never worked properly and if so quit now
@@ -415,16 +508,14 @@ class I3status(Thread):
 
                 try:
                     # loop on i3status output
-                    while self.py3_wrapper.running:
+                    while self.py3_wrapper.running and not self.stopped:
                         line = self.poller_inp.readline()
                         if line:
                             # remove leading comma if present
                             if line[0] == ",":
                                 line = line[1:]
                             if line.startswith("[{"):
-                                json_list = loads(line)
-                                self.last_output = json_list
-                                self.set_responses(json_list)
+                                self.process_line(line)
                                 self.ready = True
                         else:
                             err = self.poller_err.readline()
@@ -437,9 +528,10 @@ class I3status(Thread):
                                     msg += " with code {}".format(code)
                                 raise OSError(msg)
                 except OSError:
-                    err = sys.exc_info()[1]
-                    self.error = err
-                    self.py3_wrapper.log(err, "error")
+                    if not self.stopped:
+                        err = sys.exc_info()[1]
+                        self.error = err
+                        self.py3_wrapper.log(err, "error")
         except OSError:
             self.error = "Problem starting i3status maybe it is not installed"
         except Exception:
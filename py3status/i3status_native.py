@@ -0,0 +1,593 @@
+"""
+Native implementations of i3status modules.
+
+These create the same output as i3status would but are run inside py3status
+so that an i3status process is not needed for them.  Each module class is
+created with its config and the general config and has an update() method
+that returns an item in the format i3status would output.
+"""
+
+import array
+import os
+import re
+import socket
+import struct
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from fcntl import ioctl
+from glob import glob
+from time import time
+
+# files read by the modules
+PROC_NET_WIRELESS = "/proc/net/wireless"
+PROC_STAT = "/proc/stat"
+SYS_CLASS_NET = "/sys/class/net"
+
+# ioctl requests
+SIOCGIFFLAGS = 0x8913
+SIOCGIFADDR = 0x8915
+SIOCGIWFREQ = 0x8B05
+SIOCGIWRANGE = 0x8B0B
+SIOCGIWESSID = 0x8B1B
+SIOCGIWRATE = 0x8B21
+
+IFF_RUNNING = 0x40
+IW_ESSID_MAX_SIZE = 32
+# struct iw_range is less than this and max_qual.qual is at this offset
+IW_RANGE_SIZE = 2048
+IW_RANGE_MAX_QUAL = 44
+# the max quality of many drivers used if the driver does not give one
+DEFAULT_MAX_QUALITY = 70
+
+PLACEHOLDER_REGEX = re.compile(r"%([a-z0-9_]+)")
+
+BYTE_PREFIXES = {
+    "binary": (1024, ["B", "KiB", "MiB", "GiB", "TiB"]),
+    "decimal": (1000, ["B", "kB", "MB", "GB", "TB"]),
+    "custom": (1024, ["", "K", "M", "G", "T"]),
+}
+
+
+def i3s_format(format_string, values):
+    """
+    Substitute i3status style %placeholders in the format string.  Unknown
+    placeholders are left as they are.
+    """
+
+    def replace(match):
+        key = match.group(1)
+        # use the longest known placeholder eg %usage in %usage_x
+        for end in range(len(key), 0, -1):
+            if key[:end] in values:
+                return "{}{}".format(values[key[:end]], key[end:])
+        return match.group(0)
+
+    return PLACEHOLDER_REGEX.sub(replace, format_string)
+
+
+def format_bytes(value, prefix_type="binary"):
+    """
+    Human readable bytes as i3status shows them.
+    """
+    base, symbols = BYTE_PREFIXES.get(prefix_type, BYTE_PREFIXES["binary"])
+    exponent = 0
+    value = float(value)
+    while value >= base and exponent < len(symbols) - 1:
+        value /= base
+        exponent += 1
+    return "{:.1f} {}".format(value, symbols[exponent])
+
+
+def read_file(path, default=None):
+    """
+    Return the stripped contents of a file or default if it cannot be read.
+    """
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return default
+
+
+def time_zone(name=None):
+    """
+    Return a tzinfo for the named time zone.  None is returned if no name is
+    given or the time zone is not available meaning the local time is used.
+    """
+    if name:
+        try:
+            from zoneinfo import ZoneInfo
+
+            return ZoneInfo(name)
+        except (ImportError, KeyError, ValueError):
+            pass
+        try:
+            import pytz
+
+            return pytz.timezone(name)
+        except (ImportError, KeyError):
+            pass
+    return None
+
+
+def local_now():
+    """
+    The current local time including time zone information.
+    """
+    return datetime.now(timezone.utc).astimezone()
+
+
+class NativeModule(ABC):
+    """
+    Base class for native i3status modules.
+    """
+
+    defaults = {}
+
+    def __init__(self, instance, config, general):
+        self.config = dict(self.defaults)
+        self.config.update(config)
+        self.general = general
+        self.instance = instance
+
+    def output(self, full_text, color=None):
+        """
+        Create the item for the output.  Colors are only given if they are
+        enabled in the general config like i3status does.
+        """
+        item = {"full_text": full_text}
+        if color and self.general.get("colors"):
+            item["color"] = self.general.get(color)
+        return item
+
+    @abstractmethod
+    def update(self):
+        """
+        Return the item for the current state of the module.
+        """
+
+
+class Load(NativeModule):
+    defaults = {
+        "format": "%1min %5min %15min",
+        "format_above_threshold": None,
+        "max_threshold": 5,
+    }
+
+    def update(self):
+        loads = os.getloadavg()
+        values = {
+            "1min": "{:1.2f}".format(loads[0]),
+            "5min": "{:1.2f}".format(loads[1]),
+            "15min": "{:1.2f}".format(loads[2]),
+        }
+        format_string = self.config["format"]
+        color = None
+        if loads[0] >= float(self.config["max_threshold"]):
+            color = "color_bad"
+            format_string = self.config["format_above_threshold"] or format_string
+        return self.output(i3s_format(format_string, values), color)
+
+
+class CpuUsage(NativeModule):
+    defaults = {
+        "degraded_threshold": 90,
+        "format": "%usage",
+        "format_above_degraded_threshold": None,
+        "format_above_threshold": None,
+        "max_threshold": 95,
+    }
+
+    def __init__(self, *args):
+        NativeModule.__init__(self, *args)
+        self.previous = {}
+
+    def update(self):
+        values = {}
+        usage = 0
+        contents = read_file(PROC_STAT)
+        if contents is None:
+            return self.output("cpu: ?")
+        for line in contents.splitlines():
+            if not line.startswith("cpu"):
+                break
+            parts = line.split()
+            name = parts[0]
+            user, nice, system, idle = [int(x) for x in parts[1:5]]
+            total = user + nice + system + idle
+            prev_total, prev_idle = self.previous.get(name, (0, 0))
+            self.previous[name] = (total, idle)
+            diff_total = total - prev_total
+            diff_idle = idle - prev_idle
+            if diff_total:
+                percent = (1000 * (diff_total - diff_idle) // diff_total + 5) // 10
+            else:
+                percent = 0
+            if name == "cpu":
+                name = "usage"
+                usage = percent
+            values[name] = "{:02d}%".format(percent)
+
+        format_string = self.config["format"]
+        color = None
+        if usage > int(self.config["max_threshold"]):
+            color = "color_bad"
+            format_string = self.config["format_above_threshold"] or format_string
+        elif usage > int(self.config["degraded_threshold"]):
+            color = "color_degraded"
+            format_string = (
+                self.config["format_above_degraded_threshold"] or format_string
+            )
+        return self.output(i3s_format(format_string, values), color)
+
+
+class Disk(NativeModule):
+    defaults = {
+        "format": "%free",
+        "format_below_threshold": None,
+        "format_not_mounted": None,
+        "low_threshold": 0,
+        "prefix_type": "binary",
+        "threshold_type": "percentage_avail",
+    }
+
+    def below_threshold(self, stat):
+        threshold = float(self.config["low_threshold"])
+        threshold_type = self.config["threshold_type"]
+        if not threshold:
+            return False
+        if threshold_type.startswith("percentage"):
+            if not stat.f_blocks:
+                return False
+            if threshold_type == "percentage_free":
+                blocks = stat.f_bfree
+            else:
+                blocks = stat.f_bavail
+            return 100.0 * blocks / stat.f_blocks < threshold
+        # bytes_avail, kbytes_free etc
+        base = 1000 if self.config["prefix_type"] == "decimal" else 1024
+        factor = {"k": 1, "m": 2, "g": 3, "t": 4}.get(threshold_type[0], 0)
+        if threshold_type.endswith("free"):
+            blocks = stat.f_bfree
+        else:
+            blocks = stat.f_bavail
+        return stat.f_bsize * blocks < threshold * pow(base, factor)
+
+    def update(self):
+        path = self.instance
+        if self.config["format_not_mounted"] and not os.path.ismount(path):
+            return self.output(self.config["format_not_mounted"])
+        try:
+            stat = os.statvfs(path)
+        except OSError:
+            return self.output(self.config["format_not_mounted"] or "")
+
+        prefix_type = self.config["prefix_type"]
+        blocks = stat.f_blocks or 1
+        values = {
+            "avail": format_bytes(stat.f_bsize * stat.f_bavail, prefix_type),
+            "free": format_bytes(stat.f_bsize * stat.f_bfree, prefix_type),
+            "total": format_bytes(stat.f_bsize * stat.f_blocks, prefix_type),
+            "used": format_bytes(
+                stat.f_bsize * (stat.f_blocks - stat.f_bfree), prefix_type
+            ),
+            "percentage_avail": "{:.1f}%".format(100.0 * stat.f_bavail / blocks),
+            "percentage_free": "{:.1f}%".format(100.0 * stat.f_bfree / blocks),
+            "percentage_used": "{:.1f}%".format(
+                100.0 * (stat.f_blocks - stat.f_bfree) / blocks
+            ),
+            "percentage_used_of_avail": "{:.1f}%".format(
+                100.0 * (stat.f_blocks - stat.f_bavail) / blocks
+            ),
+        }
+        format_string = self.config["format"]
+        color = None
+        if self.below_threshold(stat):
+            color = "color_bad"
+            format_string = self.config["format_below_threshold"] or format_string
+        return self.output(i3s_format(format_string, values), color)
+
+
+class Battery(NativeModule):
+    defaults = {
+        "format": "%status %percentage %remaining",
+        "format_down": "No battery",
+        "hide_seconds": False,
+        "integer_battery_capacity": False,
+        "last_full_capacity": False,
+        "low_threshold": 30,
+        "path": "/sys/class/power_supply/BAT%d/uevent",
+        "status_bat": "BAT",
+        "status_chr": "CHR",
+        "status_full": "FULL",
+        "status_unk": "UNK",
+        "threshold_type": "time",
+    }
+
+    STATUS = {"Charging": "chr", "Discharging": "bat", "Full": "full"}
+
+    def battery_paths(self):
+        path = self.config["path"]
+        if self.instance in ("", "all"):
+            return sorted(glob(path.replace("%d", "*")))
+        try:
+            return [path.replace("%d", str(int(self.instance)))]
+        except ValueError:
+            return [path]
+
+    def read_uevent(self, path):
+        data = {}
+        contents = read_file(path)
+        if contents is None:
+            return None
+        for line in contents.splitlines():
+            key, _, value = line.partition("=")
+            data[key.replace("POWER_SUPPLY_", "")] = value
+        return data
+
+    def update(self):
+        remaining = full = rate = 0
+        capacity = []
+        status = None
+        voltage = None
+        found = False
+        uses_energy = False
+        for path in self.battery_paths():
+            data = self.read_uevent(path)
+            if not data:
+                continue
+            found = True
+            if "ENERGY_NOW" in data:
+                prefix = "ENERGY"
+                rate_key = "POWER_NOW"
+                uses_energy = True
+            else:
+                prefix = "CHARGE"
+                rate_key = "CURRENT_NOW"
+            if self.config["last_full_capacity"]:
+                full_key = prefix + "_FULL"
+            else:
+                full_key = prefix + "_FULL_DESIGN"
+            remaining += abs(int(data.get(prefix + "_NOW", 0)))
+            full += int(data.get(full_key, data.get(prefix + "_FULL", 0)))
+            rate += abs(int(data.get(rate_key, 0)))
+            if "CAPACITY" in data:
+                capacity.append(int(data["CAPACITY"]))
+            if "VOLTAGE_NOW" in data:
+                voltage = int(data["VOLTAGE_NOW"])
+            if status != "Charging" and status != "Discharging":
+                status = data.get("STATUS")
+
+        if not found:
+            return self.output(self.config["format_down"], "color_bad")
+
+        if full:
+            percentage = 100.0 * remaining / full
+        elif capacity:
+            percentage = float(sum(capacity)) / len(capacity)
+        else:
+            percentage = 0
+        if self.config["integer_battery_capacity"]:
+            percentage_str = "{:.0f}%".format(percentage)
+        else:
+            percentage_str = "{:.2f}%".format(percentage)
+
+        # remaining time in seconds
+        seconds = None
+        if rate:
+            if status == "Discharging":
+                seconds = 3600.0 * remaining / rate
+            elif status == "Charging":
+                seconds = 3600.0 * max(full - remaining, 0) / rate
+
+        values = {
+            "status": self.config["status_" + self.STATUS.get(status, "unk")],
+            "percentage": percentage_str,
+            "remaining": "",
+            "emptytime": "",
+            "consumption": "",
+        }
+        if seconds is not None:
+            hours, minutes = divmod(int(seconds) // 60, 60)
+            if self.config["hide_seconds"]:
+                values["remaining"] = "{:02d}:{:02d}".format(hours, minutes)
+            else:
+                values["remaining"] = "{:02d}:{:02d}:{:02d}".format(
+                    hours, minutes, int(seconds) % 60
+                )
+            if status == "Discharging":
+                empty = datetime.fromtimestamp(time() + seconds)
+                values["emptytime"] = empty.strftime("%H:%M:%S")
+        if rate:
+            if uses_energy or voltage is None:
+                watts = rate / 1e6
+            else:
+                watts = rate * voltage / 1e12
+            values["consumption"] = "{:1.2f}W".format(watts)
+
+        color = None
+        threshold = float(self.config["low_threshold"])
+        if status == "Discharging" and threshold:
+            if self.config["threshold_type"] == "percentage":
+                if percentage < threshold:
+                    color = "color_bad"
+            elif seconds is not None and seconds / 60 < threshold:
+                color = "color_bad"
+
+        full_text = i3s_format(self.config["format"], values)
+        return self.output(" ".join(full_text.split()), color)
+
+
+class Network(NativeModule):
+    """
+    Base class for network modules.
+    """
+
+    def __init__(self, *args):
+        NativeModule.__init__(self, *args)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def interface(self):
+        if self.instance != "_first_":
+            return self.instance
+        for name in sorted(os.listdir(SYS_CLASS_NET)):
+            if name != "lo" and self.is_type(name):
+                return name
+
+    def is_wireless(self, name):
+        return os.path.exists(os.path.join(SYS_CLASS_NET, name, "wireless"))
+
+    def ioctl(self, request, interface, data=b""):
+        """
+        Make an ioctl call for the interface and return the result without
+        the interface name.
+        """
+        request_data = struct.pack("16s", interface.encode()[:15]) + data
+        request_data = request_data.ljust(40, b"\0")
+        return ioctl(self.sock.fileno(), request, request_data)[16:]
+
+    def ip_address(self, interface):
+        """
+        Returns the ipv4 address, "no IP" if there is not one or None if the
+        interface is down.
+        """
+        try:
+            flags = struct.unpack("H", self.ioctl(SIOCGIFFLAGS, interface)[:2])[0]
+        except (IOError, OSError):
+            return None
+        if not flags & IFF_RUNNING:
+            return None
+        try:
+            address = self.ioctl(SIOCGIFADDR, interface)[4:8]
+        except (IOError, OSError):
+            return "no IP"
+        return socket.inet_ntoa(address)
+
+    def update(self):
+        interface = self.interface()
+        ip = self.ip_address(interface) if interface else None
+        if ip is None:
+            return self.output(self.config["format_down"], "color_bad")
+        values = self.get_values(interface)
+        values["ip"] = ip
+        if ip == "no IP":
+            color = "color_degraded"
+        else:
+            color = "color_good"
+        return self.output(i3s_format(self.config["format_up"], values), color)
+
+
+class Ethernet(Network):
+    defaults = {"format_down": "E: down", "format_up": "E: %ip (%speed)"}
+
+    def is_type(self, name):
+        return not self.is_wireless(name)
+
+    def get_values(self, interface):
+        speed = read_file(os.path.join(SYS_CLASS_NET, interface, "speed"))
+        try:
+            speed = int(speed)
+        except (TypeError, ValueError):
+            speed = -1
+        if speed < 0:
+            speed = "?"
+        else:
+            speed = "{} Mbit/s".format(speed)
+        return {"speed": speed}
+
+
+class Wireless(Network):
+    defaults = {
+        "format_down": "W: down",
+        "format_quality": "%03d%s",
+        "format_up": "W: (%quality at %essid, %bitrate) %ip",
+    }
+
+    is_type = Network.is_wireless
+
+    def __init__(self, *args):
+        Network.__init__(self, *args)
+        self.max_qualities = {}
+
+    def link_info(self, interface):
+        """
+        Get the link quality, signal and noise from /proc/net/wireless
+        """
+        contents = read_file(PROC_NET_WIRELESS, "")
+        for line in contents.splitlines()[2:]:
+            name, _, data = line.partition(":")
+            if name.strip() == interface:
+                parts = data.split()
+                return [float(x.rstrip(".")) for x in parts[1:4]]
+        return None
+
+    def essid(self, interface):
+        buf = array.array("b", b"\0" * (IW_ESSID_MAX_SIZE + 1))
+        address = buf.buffer_info()[0]
+        data = struct.pack("PHH", address, len(buf), 0)
+        try:
+            self.ioctl(SIOCGIWESSID, interface, data)
+        except (IOError, OSError):
+            return "?"
+        return buf.tobytes().rstrip(b"\0").decode("utf-8", "replace")
+
+    def max_quality(self, interface):
+        """
+        The max link quality reported by the driver, it does not change so
+        it is only read once for the interface.
+        """
+        if interface not in self.max_qualities:
+            buf = array.array("b", b"\0" * IW_RANGE_SIZE)
+            address = buf.buffer_info()[0]
+            data = struct.pack("PHH", address, len(buf), 0)
+            try:
+                self.ioctl(SIOCGIWRANGE, interface, data)
+                max_quality = buf.tobytes()[IW_RANGE_MAX_QUAL]
+            except (IOError, OSError):
+                max_quality = 0
+            self.max_qualities[interface] = max_quality or DEFAULT_MAX_QUALITY
+        return self.max_qualities[interface]
+
+    def bitrate(self, interface):
+        try:
+            value = struct.unpack("i", self.ioctl(SIOCGIWRATE, interface)[:4])[0]
+        except (IOError, OSError):
+            return "?"
+        return "{:g} Mb/s".format(value / 1e6)
+
+    def frequency(self, interface):
+        try:
+            m, e = struct.unpack("ih", self.ioctl(SIOCGIWFREQ, interface)[:6])
+        except (IOError, OSError):
+            return "?"
+        return "{:1.1f} GHz".format(m * pow(10, e) / 1e9)
+
+    def get_values(self, interface):
+        values = {
+            "bitrate": self.bitrate(interface),
+            "essid": self.essid(interface),
+            "frequency": self.frequency(interface),
+            "noise": "?",
+            "quality": "?",
+            "signal": "?",
+        }
+        info = self.link_info(interface)
+        if info:
+            quality, signal, noise = info
+            format_quality = self.config["format_quality"]
+            percent = int(quality * 100 / self.max_quality(interface))
+            values["quality"] = format_quality % (percent, "%")
+            values["signal"] = "{:d} dBm".format(int(signal))
+            values["noise"] = "{:d} dBm".format(int(noise))
+        return values
+
+
+NATIVE_MODULES = {
+    "battery": Battery,
+    "cpu_usage": CpuUsage,
+    "disk": Disk,
+    "ethernet": Ethernet,
+    "load": Load,
+    "wireless": Wireless,
+}
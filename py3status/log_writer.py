@@ -0,0 +1,184 @@
+import atexit
+import os
+import sys
+import time
+
+from pprint import pformat
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+
+# the most messages waiting to be written, more are dropped
+LOG_QUEUE_SIZE = 10000
+
+# the log file is rotated when it grows larger than this many bytes
+LOG_MAX_SIZE = 10 * 1024 * 1024
+
+# the log file is rotated when it is older than this many seconds
+LOG_MAX_AGE = 24 * 60 * 60
+
+# number of rotated log files kept eg log_file.1, log_file.2
+LOG_BACKUPS = 2
+
+
+class LogWriter(Thread):
+    """
+    Writes log messages to the log file in a background thread so that
+    logging does not block.  Messages are queued and formatted when written,
+    messages waiting together are written in one go and the file is kept open.
+    If the queue is full messages are dropped and the number dropped is
+    logged once the writer has caught up.  The file is rotated when it is
+    too large or too old.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_size=LOG_MAX_SIZE,
+        max_age=LOG_MAX_AGE,
+        backups=LOG_BACKUPS,
+        size=LOG_QUEUE_SIZE,
+    ):
+        Thread.__init__(self)
+        self.daemon = True
+        self.backups = backups
+        self.dropped = 0
+        self.failed = False
+        self.file = None
+        self.lock = Lock()
+        self.max_age = max_age
+        self.max_size = max_size
+        self.path = path
+        self.queue = Queue(size)
+        self.rotate_at = None
+
+    def start(self):
+        Thread.start(self)
+        # write any waiting messages when py3status exits
+        atexit.register(self.stop)
+
+    def log(self, msg, level):
+        """
+        Queue the message to be written.
+        """
+        try:
+            self.queue.put_nowait((time.time(), level, msg))
+        except Full:
+            with self.lock:
+                self.dropped += 1
+
+    def stop(self):
+        """
+        Write any waiting messages and stop the thread.
+        """
+        if self.is_alive():
+            self.queue.put(None)
+            self.join(5)
+
+    def format(self, log_time, level, msg):
+        log_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(log_time))
+        # nice formatting of data structures using pretty print
+        if isinstance(msg, (dict, list, set, tuple)):
+            try:
+                msg = pformat(msg)
+            except Exception:
+                # the data may have changed while we were formatting it
+                msg = repr(msg)
+            # if multiline then start the data output on a fresh line
+            # to aid readability.
+            if "\n" in msg:
+                msg = "\n" + msg
+        elif isinstance(msg, bytes):
+            msg = msg.decode("utf-8", "replace")
+        out = "{} {} {}\n".format(log_time, level.upper(), msg)
+        # Binary mode so fs encoding setting is not an issue
+        return out.encode("utf-8", "replace")
+
+    def open(self):
+        """
+        Open the log file and note when it is due to be rotated.
+        """
+        self.file = open(self.path, "ab")
+        self.rotate_at = None
+        if self.max_age:
+            stat = os.fstat(self.file.fileno())
+            # an existing log file is aged from when it was last written as
+            # we cannot tell when it was started
+            start = stat.st_mtime if stat.st_size else time.time()
+            self.rotate_at = start + self.max_age
+
+    def close(self):
+        if self.file:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+        self.file = None
+
+    def report(self, error):
+        """
+        Report that the log file cannot be written on stderr, this is only
+        done once until it can be written again.
+        """
+        if not self.failed:
+            self.failed = True
+            msg = "py3status: cannot write log file {}: {}\n"
+            sys.stderr.write(msg.format(self.path, error))
+            sys.stderr.flush()
+
+    def rotate(self):
+        """
+        Move the log file to log_file.1 and so on and start a new one.
+        """
+        self.file.close()
+        self.file = None
+        for index in range(self.backups - 1, 0, -1):
+            path = "{}.{}".format(self.path, index)
+            if os.path.exists(path):
+                os.rename(path, "{}.{}".format(self.path, index + 1))
+        if self.backups:
+            os.rename(self.path, self.path + ".1")
+        else:
+            os.remove(self.path)
+
+    def write(self, records):
+        with self.lock:
+            dropped = self.dropped
+            self.dropped = 0
+        lines = [self.format(*record) for record in records]
+        if dropped:
+            msg = "{} log messages dropped".format(dropped)
+            lines.append(self.format(time.time(), "warning", msg))
+        if not lines:
+            return
+        if self.file is None:
+            self.open()
+        if self.rotate_at and time.time() >= self.rotate_at:
+            self.rotate()
+            self.open()
+        self.file.write(b"".join(lines))
+        self.file.flush()
+        if self.max_size and self.file.tell() > self.max_size:
+            self.rotate()
+
+    def run(self):
+        running = True
+        while running:
+            records = [self.queue.get()]
+            # write all the messages that are waiting together
+            while True:
+                try:
+                    records.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            if None in records:
+                running = False
+                records = [x for x in records if x is not None]
+            try:
+                self.write(records)
+            except OSError as e:
+                # try opening the log file again next time
+                self.close()
+                self.report(e)
+            else:
+                self.failed = False
+        self.close()
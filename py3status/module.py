@@ -3,7 +3,7 @@ import imp
 import inspect
 
 from collections import OrderedDict
-from time import time
+from time import perf_counter, time
 from random import randint
 
 from py3status.composite import Composite
@@ -11,6 +11,7 @@ from py3status.constants import MARKUP_LANGUAGES, POSITIONS
 from py3status.py3 import Py3, ModuleErrorException
 from py3status.profiling import profile
 from py3status.formatter import Formatter
+from py3status.util import Metrics
 
 
 class Module:
@@ -41,7 +42,9 @@ class Module:
         self.has_kill = False
         self.i3status_thread = py3_wrapper.i3status_thread
         self.last_output = []
+        self.last_versions = None
         self.methods = OrderedDict()
+        self.metrics = Metrics()
         self.module_class = instance
         self.module_full_name = module
         self.module_inst = "".join(module.split(" ")[1:])
@@ -71,7 +74,7 @@ class Module:
         except Exception as e:
             # Import failed notify user in module error output
             self.disabled = True
-            self.methods["error"] = {}
+            self.methods["error"] = {"version": 0}
             self.error_index = 0
             self.error_messages = [
                 self.module_nice_name,
@@ -198,6 +201,7 @@ class Module:
                 continue
 
             method["last_output"] = [error]
+            method["version"] += 1
 
         self.allow_config_clicks = False
         self.set_updated()
@@ -208,6 +212,7 @@ class Module:
         """
         for method in self.methods.values():
             method["last_output"] = {}
+            method["version"] += 1
 
         self.allow_config_clicks = False
         self.error_hide = True
@@ -217,10 +222,15 @@ class Module:
         """
         Start the module running.
         """
+        start = time()
         self.prepare_module()
         if not (self.disabled or self.terminated):
             # Start the module and call its output method(s)
-            self._py3_wrapper.log("starting module %s" % self.module_full_name)
+            self._py3_wrapper.log(
+                "starting module {} (prepared in {:.3f}s)".format(
+                    self.module_full_name, time() - start
+                )
+            )
             self._py3_wrapper.timeout_queue_add(self)
 
     def force_update(self):
@@ -261,12 +271,54 @@ class Module:
         # restart
         self._py3_wrapper.timeout_queue_add(self, self.cache_time)
 
+    def _render_unchanged(self, method, response, py3):
+        """
+        Check if a response built from cached safe_format() output is the
+        same as the last one.  Returns True if it is, otherwise the details
+        needed to check the next response against.
+        """
+        calls = py3._render_calls
+        if None in calls:
+            return None
+        render = (
+            [call[:2] for call in calls],
+            {
+                key: value
+                for key, value in response.items()
+                if key not in ("cached_until", "composite", "full_text")
+            },
+        )
+        if (
+            method.get("last_render") != render
+            or self.error_messages
+            or self.testing
+            or None in [call[2] for call in calls]
+        ):
+            return render
+        # the output must be the cached one
+        output = response.get("composite", response.get("full_text"))
+        if isinstance(output, str):
+            last_output = method["last_output"]
+            if isinstance(last_output, dict) and output == last_output.get("full_text"):
+                return True
+        else:
+            for call in calls:
+                if output is call[2]:
+                    return True
+        return render
+
     def set_updated(self):
         """
         Mark the module as updated.
         We check if the actual content has changed and if so we trigger an
         update in py3status.
         """
+        # nothing to do unless the output of a method has changed
+        versions = [method["version"] for method in self.methods.values()]
+        if versions == self.last_versions:
+            return
+        self.last_versions = versions
+
         # get latest output
         output = []
         for method in self.methods.values():
@@ -567,8 +619,8 @@ class Module:
         # on_click method has extra events parameter
         if method_name == "on_click":
             arg_count = 2
-        args, vargs, kw, defaults = inspect.getargspec(method)
-        if len(args) == arg_count and not vargs and not kw:
+        spec = inspect.getfullargspec(method)
+        if len(spec.args) == arg_count and not spec.varargs and not spec.varkw:
             return self.PARAMS_NEW
         else:
             return self.PARAMS_LEGACY
@@ -855,6 +907,7 @@ class Module:
                                 "last_output": {"name": method, "full_text": ""},
                                 "method": method,
                                 "name": None,
+                                "version": 0,
                             }
                             self.methods[method] = method_obj
 
@@ -916,7 +969,8 @@ class Module:
         didn't already do so.
         We will execute the 'kill' method of the module when we terminate.
         """
-        if self._py3_wrapper.running:
+        # a module removed by a config reload may still be scheduled
+        if self._py3_wrapper.running and not self.terminated:
             cache_time = None
             # execute each method of this module
             for meth, obj in self.methods.items():
@@ -932,9 +986,15 @@ class Module:
                         cache_time = obj["cached_until"]
                     continue
 
+                start = perf_counter()
+                error = False
+                version = my_method["version"]
                 try:
                     # execute method and get its output
                     method = getattr(self.module_class, meth)
+                    py3 = getattr(self.module_class, "py3", None)
+                    if py3:
+                        py3._render_calls = []
                     if my_method["call_type"] == self.PARAMS_NEW:
                         # new style modules
                         response = method()
@@ -956,6 +1016,20 @@ class Module:
                     else:
                         raise TypeError("response should be a dict")
 
+                    if py3 and py3._render_calls:
+                        render = self._render_unchanged(my_method, result, py3)
+                        if render is True:
+                            # output is unchanged so no processing needed
+                            cached_until = result.get("cached_until")
+                            if cached_until is None:
+                                cached_until = py3.time_in()
+                            my_method["cached_until"] = cached_until
+                            if not cache_time or cached_until < cache_time:
+                                cache_time = cached_until
+                            continue
+                    else:
+                        render = None
+
                     if isinstance(response.get("full_text"), (list, Composite)):
                         response["composite"] = response["full_text"]
                         del response["full_text"]
@@ -998,11 +1072,17 @@ class Module:
                     if not cache_time or cached_until < cache_time:
                         cache_time = cached_until
 
-                    # update method object output
+                    my_method["last_render"] = render
+
+                    # update method object output, the version is changed so
+                    # that set_updated() knows the method output has changed
                     if "composite" in response:
-                        my_method["last_output"] = result["composite"]
+                        output = result["composite"]
                     else:
-                        my_method["last_output"] = result
+                        output = result
+                    if self.testing or output != my_method["last_output"]:
+                        my_method["last_output"] = output
+                        my_method["version"] += 1
 
                     # debug info
                     if self.config["debug"]:
@@ -1020,6 +1100,7 @@ class Module:
 
                 except ModuleErrorException as e:
                     # module has indicated that it has an error
+                    error = True
                     self.runtime_error(e.msg, meth)
                     if e.timeout:
                         if e.timeout is Py3.CACHE_FOREVER:
@@ -1043,6 +1124,15 @@ class Module:
                     cache_time = time() + getattr(
                         self.module_class, "cache_timeout", self.config["cache_timeout"]
                     )
+                    error = True
+
+                finally:
+                    self.metrics.record(
+                        meth,
+                        perf_counter() - start,
+                        error=error,
+                        changed=my_method["version"] != version,
+                    )
 
             if cache_time is None:
                 cache_time = time() + self.config["cache_timeout"]
@@ -0,0 +1,146 @@
+import json
+import os
+import sys
+
+from importlib import import_module
+from tempfile import NamedTemporaryFile
+
+try:
+    from importlib.metadata import entry_points
+except ImportError:
+    try:
+        from importlib_metadata import entry_points
+    except ImportError:
+        entry_points = None
+
+INDEX_FILE = "py3status_modules.json"
+INDEX_VERSION = 1
+
+
+def iter_entry_points(group):
+    """
+    Yield the (name, value) of the installed entry points in group.
+    """
+    if entry_points is None:
+        # fallback for older pythons, importing pkg_resources is slow
+        import pkg_resources
+
+        for entry_point in pkg_resources.iter_entry_points(group):
+            value = entry_point.module_name
+            if entry_point.attrs:
+                value += ":" + ".".join(entry_point.attrs)
+            yield entry_point.name, value
+        return
+
+    found = entry_points()
+    if hasattr(found, "select"):
+        found = found.select(group=group)
+    else:
+        found = found.get(group, [])
+    for entry_point in found:
+        # remove any extras
+        yield entry_point.name, entry_point.value.split("[")[0].strip()
+
+
+def load_entry_point(value):
+    """
+    Import and return the object referenced by an entry point value
+    eg ``package.module:attribute``.
+    """
+    module_name, _, attrs = value.partition(":")
+    obj = import_module(module_name.strip())
+    if attrs.strip():
+        for attr in attrs.strip().split("."):
+            obj = getattr(obj, attr)
+    return obj
+
+
+def site_signature():
+    """
+    The modification times of the directories python imports from.  Installing
+    or removing a package changes them.
+    """
+    signature = []
+    for path in sys.path:
+        try:
+            signature.append([path, os.stat(path or ".").st_mtime])
+        except OSError:
+            pass
+    return signature
+
+
+class ModuleIndex:
+    """
+    Keeps an index of the user modules available from include paths and
+    entry points on disk, so that at startup we only need to check that it is
+    still valid rather than scan for modules.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+                "~/.cache"
+            )
+            path = os.path.join(cache_dir, INDEX_FILE)
+        self.changed = False
+        self.path = path
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+            if self.data.get("version") != INDEX_VERSION:
+                raise ValueError("old index version")
+        except (OSError, ValueError, AttributeError):
+            self.data = {"version": INDEX_VERSION}
+
+    def path_modules(self, include_path):
+        """
+        Return the sorted module file names found in include_path.
+        """
+        try:
+            mtime = os.stat(include_path).st_mtime
+        except OSError:
+            return []
+        paths = self.data.setdefault("paths", {})
+        cached = paths.get(include_path)
+        if cached and cached["mtime"] == mtime:
+            return cached["modules"]
+        modules = sorted(x for x in os.listdir(include_path) if x.endswith(".py"))
+        paths[include_path] = {"mtime": mtime, "modules": modules}
+        self.changed = True
+        return modules
+
+    def entry_point_modules(self, group):
+        """
+        Return a dict of module name to entry point value for the entry
+        points in group.
+        """
+        signature = site_signature()
+        cached = self.data.setdefault("entry_points", {}).get(group)
+        if cached and cached["signature"] == signature:
+            return cached["modules"]
+        modules = {}
+        for name, value in iter_entry_points(group):
+            module_name = value.split(":")[0].strip().split(".")[-1]
+            modules[module_name] = value
+        self.data["entry_points"][group] = {
+            "modules": modules,
+            "signature": signature,
+        }
+        self.changed = True
+        return modules
+
+    def save(self):
+        """
+        Write the index to disk if it has changed.
+        """
+        if not self.changed:
+            return
+        try:
+            with NamedTemporaryFile(
+                "w", dir=os.path.dirname(self.path), delete=False
+            ) as f:
+                json.dump(self.data, f)
+            os.rename(f.name, self.path)
+        except OSError:
+            return
+        self.changed = False
@@ -55,8 +55,6 @@ SAMPLE OUTPUT
 {'full_text': 'all:  34.4% ( 82.0 KiB/s)'}
 """
 
-from time import time
-
 
 class Py3status:
     """
@@ -90,13 +88,13 @@ class Py3status:
                 self.init[name] = {"placeholders": placeholders, "keys": match}
 
         if self.init["diskstats"]:
-            self.last_diskstats = self._get_diskstats(self.disk)
-            self.last_time = time()
+            self.last_diskstats = (0, 0, 0)
+            self.py3.proc_delta("diskstats")
 
         self.thresholds_init = self.py3.get_color_names_list(self.format)
 
     def _get_df_usages(self, disk):
-        df_usages = self.py3.command_output(["df", "-k"])
+        df_usages = self.py3.command_output(["df", "-k"], cache_timeout=1)
         total, used, free, devs = 0, 0, 0, []
 
         if disk and not disk.startswith("/dev/"):
@@ -121,36 +119,38 @@ class Py3status:
 
         return free, used, 100 * used / total, total
 
-    def _get_diskstats(self, disk):
+    def _get_diskstats(self, disk, changes):
         read, write = 0, 0
 
         if disk and disk.startswith("/dev/"):
             disk = disk[5:]
 
-        with open("/proc/diskstats") as fd:
-            for line in fd:
-                data = line.split()
-                if disk:
-                    if data[2] == disk:
-                        read += int(data[5]) * self.sector_size
-                        write += int(data[9]) * self.sector_size
-                else:
-                    if data[1] == "0":
-                        read += int(data[5]) * self.sector_size
-                        write += int(data[9]) * self.sector_size
+        # counters follow the major and minor device numbers
+        devices = self.py3.proc_sample("diskstats")
+        for name, data in changes.items():
+            if disk:
+                if name == disk:
+                    read += data[4] * self.sector_size
+                    write += data[8] * self.sector_size
+            else:
+                if name in devices and devices[name][1] == 0:
+                    read += data[4] * self.sector_size
+                    write += data[8] * self.sector_size
 
         return read, write
 
-    def _calc_diskstats(self, diskstats):
-        current_time = time()
-        timedelta = current_time - self.last_time
-        read = (diskstats[0] - self.last_diskstats[0]) / timedelta
-        write = (diskstats[1] - self.last_diskstats[1]) / timedelta
-        total = read + write
-        self.last_diskstats = diskstats
-        self.last_time = current_time
+    def _calc_diskstats(self):
+        # the shared sample may be older than now so the time between the
+        # samples is used rather than the time between calls
+        changes, timedelta = self.py3.proc_delta("diskstats")
+        if changes is None or timedelta <= 0:
+            return self.last_diskstats
+        read, write = self._get_diskstats(self.disk, changes)
+        read /= timedelta
+        write /= timedelta
+        self.last_diskstats = (read, write, read + write)
 
-        return read, write, total
+        return self.last_diskstats
 
     def diskdata(self):
         disk_data = {"disk": self.disk_name}
@@ -167,7 +167,7 @@ class Py3status:
                 )
 
         if self.init["diskstats"]:
-            diskstats = self._calc_diskstats(self._get_diskstats(self.disk))
+            diskstats = self._calc_diskstats()
             data = dict(zip(self.init["diskstats"]["keys"], diskstats))
             threshold_data.update(data)
 
@@ -232,7 +232,7 @@ class Py3status:
             self.thresholds_man.remove("auto.input")
 
     def _get_lm_sensors_data(self):
-        return self.py3.command_output(self.lm_sensors_command)
+        return self.py3.command_output(self.lm_sensors_command, cache_timeout=1)
 
     def lm_sensors(self):
         lm_sensors_data = self._get_lm_sensors_data()
@@ -101,30 +101,19 @@ class Py3status:
         values = ["{%s}" % x[1] for x in placeholders if x[0] == "value"]
         self._value_formats = values
         # last
+        self.last_deltas = None
         self.last_interface = None
-        self.last_stat = self._get_stat()
-        self.last_time = time()
+        if self.devfile == "/proc/net/dev":
+            self.py3.proc_delta("net_dev")
+        else:
+            self.last_stat = self._get_stat()
+            self.last_time = time()
 
         self.thresholds_init = self.py3.get_color_names_list(self.format)
 
     def net_rate(self):
-        network_stat = self._get_stat()
-        deltas = {}
         try:
-            # time from previous check
-            current_time = time()
-            timedelta = current_time - self.last_time
-
-            # calculate deltas for all interfaces
-            for old, new in zip(self.last_stat, network_stat):
-                down = (int(new[1]) - int(old[1])) / timedelta
-                up = (int(new[9]) - int(old[9])) / timedelta
-
-                deltas[new[0]] = {"total": up + down, "up": up, "down": down}
-
-            # update last_ info
-            self.last_stat = network_stat
-            self.last_time = current_time
+            deltas = self._get_deltas()
 
             # get the interface with max rate
             if self.sum_values:
@@ -186,28 +175,69 @@ class Py3status:
 
         return response
 
-    def _get_stat(self):
+    def _get_deltas(self):
         """
-        Get statistics from devfile in list of lists of words
+        Return a dict of the rates of the interfaces since the last call.
         """
+        if self.devfile == "/proc/net/dev":
+            # the shared sample may be older than now so the time between
+            # the samples is used rather than the time between calls
+            stat, timedelta = self.py3.proc_delta("net_dev")
+            if stat is None:
+                # there is no earlier sample so there are no rates yet
+                stat = self.py3.proc_sample("net_dev")
+                stat = {name: [0] * len(x) for name, x in stat.items()}
+            network_stat = [
+                [name + ":"] + counters
+                for name, counters in stat.items()
+                if self._dev_filter(name + ":")
+            ]
+        else:
+            current_time = time()
+            timedelta = current_time - self.last_time
+            new_stat = self._get_stat()
+            network_stat = [
+                [new[0]] + [int(a) - int(b) for a, b in zip(new[1:], old[1:])]
+                for old, new in zip(self.last_stat, new_stat)
+            ]
+            self.last_stat = new_stat
+            self.last_time = current_time
 
-        def dev_filter(x):
-            # get first word and remove trailing interface number
-            x = x.strip().split(" ")[0][:-1]
+        if timedelta <= 0 and self.last_deltas is not None:
+            # the sample has not changed since the last call
+            return self.last_deltas
 
-            if x in self.interfaces_blacklist:
-                return False
+        # calculate deltas for all interfaces, the rates are zero when run
+        # again before there is a new sample
+        deltas = {}
+        for row in network_stat:
+            down = row[1] / timedelta if timedelta > 0 else 0
+            up = row[9] / timedelta if timedelta > 0 else 0
+            deltas[row[0]] = {"total": up + down, "up": up, "down": down}
+        self.last_deltas = deltas
+        return deltas
+
+    def _dev_filter(self, x):
+        # get first word and remove trailing interface number
+        x = x.strip().split(" ")[0][:-1]
+
+        if x in self.interfaces_blacklist:
+            return False
 
-            if self.all_interfaces:
-                return True
+        if self.all_interfaces:
+            return True
 
-            if x in self.interfaces:
-                return True
+        if x in self.interfaces:
+            return True
 
-            return False
+        return False
 
+    def _get_stat(self):
+        """
+        Get statistics from devfile in list of lists of words
+        """
         # read devfile, skip two header files
-        x = filter(dev_filter, open(self.devfile).readlines()[2:])
+        x = filter(self._dev_filter, open(self.devfile).readlines()[2:])
 
         try:
             # split info into words, filter empty ones
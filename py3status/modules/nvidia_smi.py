@@ -122,7 +122,7 @@ class Py3status:
         self.thresholds_init = self.py3.get_color_names_list(self.format_gpu)
 
     def _get_nvidia_data(self):
-        return self.py3.command_output(self.nvidia_command)
+        return self.py3.command_output(self.nvidia_command, cache_timeout=1)
 
     def nvidia_smi(self):
         nvidia_data = self._get_nvidia_data()
@@ -277,25 +277,18 @@ class Py3status:
 
     def _get_stat(self):
         # kernel/system statistics. man -P 'less +//proc/stat' procfs
-        stat = []
-        with open("/proc/stat") as f:
-            for line in f:
-                if "cpu" in line:
-                    stat.append(line)
-                else:
-                    return stat
+        stat = self.py3.proc_sample("stat")
+        return [(name, fields) for name, fields in stat.items() if "cpu" in name]
 
     def _filter_stat(self, stat, avg=False):
         # if avg, return (name, idle, total)
         if avg:
-            fields = stat[0].split()
-            return "avg", int(fields[4]), sum(map(int, fields[1:]))
+            fields = dict(stat)["cpu"]
+            return "avg", fields[3], sum(fields)
 
         # return a list of (name, idle, total)
         new_stat = []
-        for line in stat:
-            fields = line.split()
-            cpu_name = fields[0]
+        for cpu_name, fields in stat:
             if self.cpus["cpus"]:
                 if self.first_run:
                     for _filter in self.cpus["cpus"]:
@@ -304,7 +297,7 @@ class Py3status:
                 if cpu_name not in self.cpus["list"]:
                     continue
 
-            new_stat.append((cpu_name, int(fields[4]), sum(map(int, fields[1:]))))
+            new_stat.append((cpu_name, fields[3], sum(fields)))
         return new_stat
 
     def _calc_mem_info(self, unit, meminfo, memory):
@@ -314,19 +307,19 @@ class Py3status:
         of used memory, and units of mem (KiB, MiB, GiB).
         """
         if memory:
-            total_mem_kib = meminfo["MemTotal:"]
+            total_mem_kib = meminfo["MemTotal"]
             used_mem_kib = (
                 total_mem_kib
-                - meminfo["MemFree:"]
+                - meminfo["MemFree"]
                 - (
-                    meminfo["Buffers:"]
-                    + meminfo["Cached:"]
-                    + (meminfo["SReclaimable:"] - meminfo["Shmem:"])
+                    meminfo["Buffers"]
+                    + meminfo["Cached"]
+                    + (meminfo["SReclaimable"] - meminfo["Shmem"])
                 )
             )
         else:
-            total_mem_kib = meminfo["SwapTotal:"]
-            used_mem_kib = total_mem_kib - meminfo["SwapFree:"]
+            total_mem_kib = meminfo["SwapTotal"]
+            used_mem_kib = total_mem_kib - meminfo["SwapFree"]
 
         if total_mem_kib == 0:
             used_percent = 0
@@ -338,10 +331,8 @@ class Py3status:
         (used, used_unit) = self.py3.format_units(used_mem_kib * 1024, unit)
         return total, total_unit, used, used_unit, used_percent
 
-    def _get_meminfo(self, head=24):
-        with open("/proc/meminfo") as f:
-            info = [line.split() for line in (next(f) for x in range(head))]
-            return {fields[0]: float(fields[1]) for fields in info}
+    def _get_meminfo(self):
+        return self.py3.proc_sample("meminfo")
 
     def _calc_cpu_percent(self, cpu):
         name, idle, total = cpu
@@ -369,11 +360,11 @@ class Py3status:
         command = ["sensors"]
         if zone:
             try:
-                sensors = self.py3.command_output(command + [zone])
+                sensors = self.py3.command_output(command + [zone], cache_timeout=1)
             except self.py3.CommandError:
                 pass
         if not sensors:
-            sensors = self.py3.command_output(command)
+            sensors = self.py3.command_output(command, cache_timeout=1)
         m = re.search(r"(Core 0|CPU Temp).+\+(.+).+\(.+", sensors)
         if m:
             cpu_temp = float(m.groups()[1].strip()[:-2])
@@ -91,9 +91,8 @@ class Py3status:
                 self.seconds, self.interval = None, second
 
     def uptime(self):
-        with open("/proc/uptime") as f:
-            up = int(float(f.readline().split()[0]))
-            offset = time() - up
+        up = int(self.py3.proc_sample("uptime")[0])
+        offset = time() - up
 
         uptime = {}
         for unit, interval in self.time_periods.items():
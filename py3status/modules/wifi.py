@@ -103,7 +103,7 @@ class Py3status:
 
         # get wireless interface
         try:
-            data = self.py3.command_output([iw, "dev"])
+            data = self.py3.command_output([iw, "dev"], cache_timeout=1)
         except self.py3.CommandError as ce:
             raise Exception(ce.error.strip())
         last_device = None
@@ -1,11 +1,15 @@
 import codecs
+import hmac
 import imp
+import json
 import os
 import re
 
 from collections import OrderedDict
+from hashlib import sha256
 from string import Template
 from subprocess import check_output, CalledProcessError
+from tempfile import NamedTemporaryFile
 
 from py3status.constants import (
     CONFIG_FILE_SPECIAL_SECTIONS,
@@ -21,6 +25,12 @@ from py3status.constants import (
 )
 
 from py3status.private import PrivateHide, PrivateBase64
+from py3status.version import version
+
+CONFIG_CACHE_VERSION = 2
+
+# bytes in the random key used for the config cache digests
+CONFIG_CACHE_KEY_SIZE = 32
 
 
 class ParseException(Exception):
@@ -161,6 +171,10 @@ class ConfigParser:
         self.raw = config.split("\n")
         self.container_modules = []
         self.anon_count = 0
+        # values from env() and shell() as (function, param, value_type, value)
+        self.inputs = []
+        # set if hide() or base64() are used
+        self.private = False
 
     def notify_user(self, error):
         if self.py3_wrapper:
@@ -362,7 +376,12 @@ class ConfigParser:
             "shell": self.make_value_from_shell,
         }
 
-        return CONFIG_FUNCTIONS[function](param, value_type, function)
+        value = CONFIG_FUNCTIONS[function](param, value_type, function)
+        if function in ["env", "shell"]:
+            self.inputs.append((function, param, value_type, value))
+        else:
+            self.private = True
+        return value
 
     def value_convert(self, value, value_type):
         """
@@ -588,6 +607,7 @@ class ConfigParser:
                 self.error("Only strings can be obfuscated")
 
             (name, scheme) = name.split(":")
+            self.private = True
             if scheme == "base64":
                 value = PrivateBase64(value, module_name)
             elif scheme == "hide":
@@ -679,6 +699,209 @@ class ConfigParser:
                 name = []
 
 
+# the dict types in a parsed config
+CONFIG_CACHE_DICTS = {x.__name__: x for x in (dict, OrderedDict, ModuleDefinition)}
+
+
+def value_digest(key, value):
+    """
+    Digest of a value from env() or shell().  The digest is keyed so that
+    the values, which may be secrets, cannot be guessed from the cache.
+    """
+    value = repr((type(value).__name__, value)).encode("utf-8")
+    return hmac.new(key, value, sha256).hexdigest()
+
+
+def config_cache_key(cache_dir):
+    """
+    Return the random key used for the config cache digests, creating it
+    if needed, or None if it is not available.
+    """
+    path = os.path.join(cache_dir, "py3status_config_key")
+    try:
+        with open(path, "rb") as f:
+            key = f.read()
+        if len(key) == CONFIG_CACHE_KEY_SIZE:
+            return key
+        os.remove(path)
+    except OSError:
+        pass
+    key = os.urandom(CONFIG_CACHE_KEY_SIZE)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(key)
+    except OSError:
+        return None
+    return key
+
+
+class ConfigCache:
+    """
+    Keeps the parsed config on disk so that it does not need parsing again
+    while the config file and the results of any env() or shell() used in it
+    are unchanged.
+
+    The cache is stored as json.  Dicts, tuples and the values from env() or
+    shell() are stored as tagged json objects, the values themselves are not
+    written to disk.
+    """
+
+    def __init__(self, config_path):
+        self.cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(
+            "~/.cache"
+        )
+        name = sha256(os.path.abspath(config_path).encode("utf-8")).hexdigest()
+        self.path = os.path.join(
+            self.cache_dir, "py3status_config_{}".format(name[:16])
+        )
+        try:
+            with open(config_path, "rb") as f:
+                content = f.read()
+        except OSError:
+            self.digest = None
+        else:
+            self.digest = sha256(version.encode("utf-8") + content).hexdigest()
+
+    def load(self, py3_wrapper):
+        """
+        Return the cached parsed config or None if there is not a valid one.
+        """
+        if not self.digest:
+            return None
+        try:
+            with open(self.path) as f:
+                cached = json.load(f)
+            if cached["version"] != CONFIG_CACHE_VERSION:
+                return None
+        except Exception:
+            return None
+        if cached["digest"] != self.digest:
+            return None
+
+        # get the current values of any env() or shell() used
+        values = []
+        if cached["inputs"]:
+            key = config_cache_key(self.cache_dir)
+            if not key:
+                return None
+            parser = ConfigParser("", py3_wrapper)
+            for function, param, value_type, digest in cached["inputs"]:
+                if function == "env":
+                    value = parser.make_value_from_env(param, value_type, function)
+                else:
+                    value = parser.make_value_from_shell(param, value_type, function)
+                if not hmac.compare_digest(value_digest(key, value), digest):
+                    return None
+                values.append(value)
+
+        def restore(item):
+            if isinstance(item, list):
+                return [restore(x) for x in item]
+            if not isinstance(item, dict):
+                return item
+            if "value" in item:
+                return values[item["value"]]
+            if "tuple" in item:
+                return tuple(restore(x) for x in item["tuple"])
+            restored = CONFIG_CACHE_DICTS[item["dict"]]()
+            for key, value in item["items"]:
+                restored[restore(key)] = restore(value)
+            return restored
+
+        try:
+            return restore(cached["config"])
+        except Exception:
+            return None
+
+    def save(self, parser):
+        """
+        Save the config from the parser.
+        """
+        if not self.digest or parser.private:
+            return
+        key = None
+        if parser.inputs:
+            key = config_cache_key(self.cache_dir)
+            if not key:
+                return
+        # values from env() or shell() are replaced, they may be secrets
+        lookup = {}
+        for index, (function, param, value_type, value) in enumerate(parser.inputs):
+            if value not in (None, True, False):
+                lookup[id(value)] = index
+        found = set()
+
+        def replace(item):
+            if id(item) in lookup:
+                found.add(id(item))
+                return {"value": lookup[id(item)]}
+            if isinstance(item, dict):
+                return {
+                    "dict": item.__class__.__name__,
+                    "items": [[replace(k), replace(v)] for k, v in item.items()],
+                }
+            if isinstance(item, list):
+                return [replace(x) for x in item]
+            if isinstance(item, tuple):
+                return {"tuple": [replace(x) for x in item]}
+            if item is None or isinstance(item, (str, int, float)):
+                return item
+            raise TypeError("cannot cache {}".format(type(item).__name__))
+
+        try:
+            config = replace(parser.config)
+        except TypeError:
+            return
+        if len(found) != len(lookup):
+            # a value has been changed eg `+=` so we cannot replace it
+            return
+        cached = {
+            "config": config,
+            "digest": self.digest,
+            "inputs": [
+                (function, param, value_type, value_digest(key, value))
+                for function, param, value_type, value in parser.inputs
+            ],
+            "version": CONFIG_CACHE_VERSION,
+        }
+        try:
+            with NamedTemporaryFile(
+                "w", dir=self.cache_dir, delete=False, encoding="utf-8"
+            ) as f:
+                json.dump(cached, f)
+            os.rename(f.name, self.path)
+        except (OSError, ValueError):
+            pass
+
+
+def read_config(config_path, parse_config, parse_config_error):
+    """
+    Read and parse the config file.
+    """
+    # get the file encoding this is important with multi-byte unicode chars
+    try:
+        encoding = check_output(
+            ["file", "-b", "--mime-encoding", "--dereference", config_path]
+        )
+        encoding = encoding.strip().decode("utf-8")
+    except CalledProcessError:
+        # bsd does not have the --mime-encoding so assume utf-8
+        encoding = "utf-8"
+    try:
+        with codecs.open(config_path, "r", encoding) as f:
+            try:
+                return parse_config(f)
+            except ParseException as e:
+                return parse_config_error(e, config_path)
+    except LookupError:
+        with codecs.open(config_path) as f:
+            try:
+                return parse_config(f)
+            except ParseException as e:
+                return parse_config_error(e, config_path)
+
+
 def process_config(config_path, py3_wrapper=None):
     """
     Parse i3status.conf so we can adapt our code to the i3status config.
@@ -699,6 +922,7 @@ def process_config(config_path, py3_wrapper=None):
             config = "".join(config.readlines())
         parser = ConfigParser(config, py3_wrapper)
         parser.parse()
+        cache.save(parser)
         parsed = parser.config
         del parser
         return parsed
@@ -711,31 +935,20 @@ def process_config(config_path, py3_wrapper=None):
         for char in ['"', "{", "|"]:
             error = error.replace(char, "\\" + char)
         error_config = Template(ERROR_CONFIG).substitute(error=error)
-        return parse_config(error_config)
+        parser = ConfigParser(error_config, py3_wrapper)
+        parser.parse()
+        return parser.config
 
     config = {}
 
-    # get the file encoding this is important with multi-byte unicode chars
-    try:
-        encoding = check_output(
-            ["file", "-b", "--mime-encoding", "--dereference", config_path]
-        )
-        encoding = encoding.strip().decode("utf-8")
-    except CalledProcessError:
-        # bsd does not have the --mime-encoding so assume utf-8
-        encoding = "utf-8"
-    try:
-        with codecs.open(config_path, "r", encoding) as f:
-            try:
-                config_info = parse_config(f)
-            except ParseException as e:
-                config_info = parse_config_error(e, config_path)
-    except LookupError:
-        with codecs.open(config_path) as f:
-            try:
-                config_info = parse_config(f)
-            except ParseException as e:
-                config_info = parse_config_error(e, config_path)
+    # use the cached config if the config is unchanged
+    cache = ConfigCache(config_path)
+    config_info = cache.load(py3_wrapper)
+    if config_info is not None:
+        if py3_wrapper:
+            py3_wrapper.log("using cached config")
+    else:
+        config_info = read_config(config_path, parse_config, parse_config_error)
 
     # update general section with defaults
     general_defaults = GENERAL_DEFAULTS.copy()
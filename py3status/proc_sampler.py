@@ -0,0 +1,202 @@
+import os
+
+from threading import Lock
+from time import time
+
+# how long a sample is shared for by default
+SAMPLE_INTERVAL = 1
+
+READ_SIZE = 65536
+
+
+def parse_stat(text):
+    """
+    /proc/stat as a dict eg {"cpu": [user, nice, system, idle, ...], ...}
+    lines with a single value have an int value.
+    """
+    data = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 2:
+            continue
+        try:
+            values = [int(x) for x in fields[1:]]
+        except ValueError:
+            continue
+        data[fields[0]] = values if len(values) > 1 else values[0]
+    return data
+
+
+def parse_meminfo(text):
+    """
+    /proc/meminfo as a dict of values in kB eg {"MemTotal": 16303712, ...}
+    """
+    data = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) >= 2:
+            data[fields[0].rstrip(":")] = int(fields[1])
+    return data
+
+
+def parse_net_dev(text):
+    """
+    /proc/net/dev as a dict of interface name to a list of its 16 counters.
+    """
+    data = {}
+    for line in text.splitlines()[2:]:
+        name, _, values = line.partition(":")
+        data[name.strip()] = [int(x) for x in values.split()]
+    return data
+
+
+def parse_diskstats(text):
+    """
+    /proc/diskstats as a dict of device name to a list of the major and
+    minor numbers followed by its counters.
+    """
+    data = {}
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) > 3:
+            data[fields[2]] = [int(x) for x in fields[:2] + fields[3:]]
+    return data
+
+
+def parse_floats(text):
+    """
+    Files like /proc/uptime and /proc/loadavg as a list of their leading
+    numbers.
+    """
+    data = []
+    for value in text.split():
+        try:
+            data.append(float(value))
+        except ValueError:
+            break
+    return data
+
+
+def parse_uevent(text):
+    """
+    uevent files as a dict, numbers are converted to int.
+    """
+    data = {}
+    for line in text.splitlines():
+        key, _, value = line.partition("=")
+        try:
+            data[key] = int(value)
+        except ValueError:
+            data[key] = value
+    return data
+
+
+SOURCES = {
+    "diskstats": ("/proc/diskstats", parse_diskstats),
+    "loadavg": ("/proc/loadavg", parse_floats),
+    "meminfo": ("/proc/meminfo", parse_meminfo),
+    "net_dev": ("/proc/net/dev", parse_net_dev),
+    "stat": ("/proc/stat", parse_stat),
+    "uptime": ("/proc/uptime", parse_floats),
+}
+
+
+def delta(current, previous):
+    """
+    The difference of all numbers between two samples.  Entries that are not
+    in the previous sample are left out.
+    """
+    if isinstance(current, dict):
+        return {
+            key: delta(value, previous[key])
+            for key, value in current.items()
+            if key in previous
+        }
+    if isinstance(current, list):
+        return [delta(a, b) for a, b in zip(current, previous)]
+    if isinstance(current, (int, float)):
+        return current - previous
+    return current
+
+
+class ProcSampler:
+    """
+    Shared reading of /proc and /sys files for modules.
+
+    Each file is only read once per interval however many modules want it.
+    Files are kept open and re-read from the start with pread and the parsed
+    data is shared between all modules so it must not be modified.
+    """
+
+    def __init__(self):
+        self.files = {}
+        self.lock = Lock()
+        self.samples = {}
+        self.source_locks = {}
+
+    def _read(self, path):
+        """
+        Read the whole of the file reusing its file descriptor.
+        """
+        fd = self.files.get(path)
+        for attempt in range(2):
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY)
+                self.files[path] = fd
+            try:
+                chunks = []
+                offset = 0
+                while True:
+                    chunk = os.pread(fd, READ_SIZE, offset)
+                    chunks.append(chunk)
+                    offset += len(chunk)
+                    if len(chunk) < READ_SIZE:
+                        break
+                return b"".join(chunks).decode("utf-8", "replace")
+            except OSError:
+                # the file may have been removed and recreated eg batteries
+                del self.files[path]
+                os.close(fd)
+                fd = None
+                if attempt:
+                    raise
+
+    def sample(self, source, max_age=SAMPLE_INTERVAL):
+        """
+        Return (timestamp, data) for the source.  The source is either one of
+        the named sources or the path of a file in /proc or /sys.  If the last
+        sample is not older than max_age it is returned without rereading.
+        """
+        with self.lock:
+            cached = self.samples.get(source)
+            if cached and time() - cached[0] <= max_age:
+                return cached
+            lock = self.source_locks.setdefault(source, Lock())
+
+        # only one thread reads a source at a time, others use its result
+        with lock:
+            cached = self.samples.get(source)
+            if cached and time() - cached[0] <= max_age:
+                return cached
+            if source in SOURCES:
+                path, parser = SOURCES[source]
+            elif source.startswith(("/proc/", "/sys/")):
+                path = source
+                if os.path.basename(path) == "uevent":
+                    parser = parse_uevent
+                else:
+                    parser = str.strip
+            else:
+                raise ValueError("Unknown source `{}`".format(source))
+            sample = (time(), parser(self._read(path)))
+            self.samples[source] = sample
+            return sample
+
+    def close(self):
+        """
+        Close all open files.
+        """
+        with self.lock:
+            for fd in self.files.values():
+                os.close(fd)
+            self.files = {}
@@ -1,8 +1,16 @@
 import cProfile
+import os
+import sys
+
+from collections import Counter
+from threading import Event, Thread, enumerate as enumerate_threads
 
 # Used in development
 enable_profiling = False
 
+# seconds between the stack samples taken by the SamplingProfiler
+SAMPLE_INTERVAL = 0.01
+
 
 def profile(thread_run_fn):
     if not enable_profiling:
@@ -19,3 +27,74 @@ def profile(thread_run_fn):
             profiler.dump_stats("py3status-%s.profile" % thread_id)
 
     return wrapper_run
+
+
+class SamplingProfiler(Thread):
+    """
+    A low overhead profiler that can be started and stopped while py3status
+    is running.  The stacks of all threads are sampled at an interval and
+    counted by the module or task that each thread is running.  The counts are
+    written as collapsed stacks that flamegraph tools can use.
+    """
+
+    def __init__(self, thread_labels, modules=None, interval=SAMPLE_INTERVAL):
+        """
+        thread_labels is a function returning a dict of thread ident to the
+        label for what the thread is doing, threads labeled None are idle and
+        are not sampled.  If modules are given only threads running those
+        modules are sampled.
+        """
+        Thread.__init__(self)
+        self.daemon = True
+        self.counts = Counter()
+        self.interval = interval
+        self.modules = modules
+        self.samples = 0
+        self.stopped = Event()
+        self.thread_labels = thread_labels
+
+    def wanted(self, label):
+        """
+        Check if the label is for one of the modules we are profiling.
+        """
+        for module in self.modules:
+            if label == module or label.split(" ")[0] == module:
+                return True
+        return False
+
+    def sample(self):
+        """
+        Record the current stack of each thread.
+        """
+        labels = self.thread_labels()
+        names = {thread.ident: thread.name for thread in enumerate_threads()}
+        for ident, frame in sys._current_frames().items():
+            if ident == self.ident:
+                continue
+            label = labels.get(ident, names.get(ident))
+            if label is None or (self.modules and not self.wanted(label)):
+                continue
+            stack = []
+            while frame:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append("{}:{}".format(filename, code.co_name))
+                frame = frame.f_back
+            stack.append(label)
+            self.counts[";".join(reversed(stack))] += 1
+        self.samples += 1
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def stop(self, f):
+        """
+        Stop sampling and write the collapsed stacks to the file f.
+        Returns the number of samples taken.
+        """
+        self.stopped.set()
+        self.join()
+        for stack, count in sorted(self.counts.items()):
+            f.write("{} {}\n".format(stack, count))
+        return self.samples
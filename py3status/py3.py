@@ -12,13 +12,19 @@ from time import time
 from uuid import uuid4
 
 from py3status import exceptions
-from py3status.formatter import Formatter, Composite, expand_color
-from py3status.request import HttpResponse
+from py3status.command_cache import CommandCache
+from py3status.formatter import FORMAT_CACHE_SIZE, Formatter, Composite, expand_color
+from py3status.proc_sampler import ProcSampler, SAMPLE_INTERVAL, delta
+from py3status.request import HttpClient, HttpResponse
 from py3status.storage import Storage
-from py3status.util import Gradients
+from py3status.util import Gradients, LRUCache, Metrics
 from py3status.version import version
 
 
+# number of format strings per module kept by the render cache
+RENDER_CACHE_SIZE = 16
+
+
 class ModuleErrorException(Exception):
     """
     This exception is used to indicate that a module has returned an error
@@ -77,9 +83,16 @@ class Py3:
     """Show as Warning"""
 
     # Shared by all Py3 Instances
+    _command_cache = CommandCache()
+    _format_color_names = LRUCache(FORMAT_CACHE_SIZE)
+    _format_placeholders = LRUCache(FORMAT_CACHE_SIZE)
+    _format_render_names = LRUCache(FORMAT_CACHE_SIZE)
+    _format_placeholders_cache = LRUCache(FORMAT_CACHE_SIZE)
     _formatter = None
     _gradients = Gradients()
+    _http_client = HttpClient()
     _none_color = NoneColor()
+    _proc_sampler = ProcSampler()
     _storage = Storage()
 
     # Exceptions
@@ -96,10 +109,10 @@ class Py3:
         self._english_env = dict(os.environ)
         self._english_env["LC_ALL"] = "C"
         self._english_env["LANGUAGE"] = "C"
-        self._format_color_names = {}
-        self._format_placeholders = {}
-        self._format_placeholders_cache = {}
         self._module = module
+        self._proc_samples = {}
+        self._render_cache = LRUCache(RENDER_CACHE_SIZE)
+        self._render_calls = []
         self._report_exception_cache = set()
         self._thresholds = None
         self._threshold_gradients = {}
@@ -657,27 +670,23 @@ class Py3:
         else:
             key = names
             names = [names]
-        try:
-            return self._format_placeholders_cache[format_string][key]
-        except KeyError:
-            pass
+        result = self._format_placeholders_cache.get((format_string, key))
+        if result is not None:
+            return result
 
-        if format_string not in self._format_placeholders:
+        placeholders = self._format_placeholders.get(format_string)
+        if placeholders is None:
             placeholders = self._formatter.get_placeholders(format_string)
             self._format_placeholders[format_string] = placeholders
-        else:
-            placeholders = self._format_placeholders[format_string]
-
-        if format_string not in self._format_placeholders_cache:
-            self._format_placeholders_cache[format_string] = {}
 
+        result = False
         for name in names:
             for placeholder in placeholders:
                 if fnmatch(placeholder, name):
-                    self._format_placeholders_cache[format_string][key] = True
-                    return True
-        self._format_placeholders_cache[format_string][key] = False
-        return False
+                    result = True
+                    break
+        self._format_placeholders_cache[(format_string, key)] = result
+        return result
 
     def get_color_names_list(self, format_string, matches=None):
         """
@@ -701,11 +710,10 @@ class Py3:
         elif not format_string:
             return []
 
-        if format_string not in self._format_color_names:
+        names = self._format_color_names.get(format_string)
+        if names is None:
             names = self._formatter.get_color_names(format_string)
             self._format_color_names[format_string] = names
-        else:
-            names = self._format_color_names[format_string]
 
         if not matches:
             return list(names)
@@ -738,11 +746,10 @@ class Py3:
         formatting that may be applied to them
         eg ``'{placeholder:.2f}'`` will give ``['{placeholder}']``
         """
-        if format_string not in self._format_placeholders:
+        placeholders = self._format_placeholders.get(format_string)
+        if placeholders is None:
             placeholders = self._formatter.get_placeholders(format_string)
             self._format_placeholders[format_string] = placeholders
-        else:
-            placeholders = self._format_placeholders[format_string]
 
         if not matches:
             return list(placeholders)
@@ -832,9 +839,28 @@ class Py3:
 
         attr_getter is a function that will when called with an attribute name
         as a parameter will return a value.
-        """
+
+        If the module sets ``render_cache = True`` the output is reused while
+        the values of the placeholders in the format are unchanged.  Only
+        strings, numbers, booleans and None values can be cached.
+        """
+        key = None
+        if attr_getter is None and getattr(
+            self._py3status_module, "render_cache", False
+        ):
+            key = self._render_cache_key(format_string, param_dict, force_composite)
+            if key is None:
+                self._render_calls.append(None)
+            else:
+                cached = self._render_cache.get(format_string)
+                if cached and cached[0] == key:
+                    output = cached[1]
+                    if isinstance(output, Composite):
+                        output = output.copy()
+                    self._render_calls.append((format_string, key, output))
+                    return output
         try:
-            return self._formatter.format(
+            output = self._formatter.format(
                 format_string,
                 self._py3status_module,
                 param_dict,
@@ -844,6 +870,52 @@ class Py3:
         except Exception:
             self._report_exception("Invalid format `{}`".format(format_string))
             return "invalid format"
+        if key is not None:
+            if isinstance(output, Composite):
+                # keep a copy as the module will alter the one we return
+                self._render_cache[format_string] = (key, output.copy())
+            else:
+                self._render_cache[format_string] = (key, output)
+            self._render_calls.append((format_string, key, None))
+        return output
+
+    def _render_cache_key(self, format_string, param_dict, force_composite):
+        """
+        Get the values of the placeholders and the colors used by the format
+        so that we can tell if its output will be the same as last time.
+        Returns None if the values cannot be safely compared.
+        """
+        names = self._format_render_names.get(format_string)
+        if names is None:
+            try:
+                names = (
+                    self._formatter.get_placeholders(format_string),
+                    self._formatter.get_color_commands(format_string),
+                )
+            except Exception:
+                return None
+            self._format_render_names[format_string] = names
+        placeholders, colors = names
+        if param_dict is None:
+            param_dict = {}
+        key = [force_composite]
+        # colors can be set by the module eg by threshold_get_color()
+        for color in colors:
+            for name in ("color_" + color, "color_threshold_" + color):
+                value = getattr(self._py3status_module, name, None)
+                if value is not None and not isinstance(value, str):
+                    return None
+                key.append((name, value))
+        for name in placeholders:
+            if name in param_dict:
+                value = param_dict[name]
+            else:
+                value = getattr(self._py3status_module, name, None)
+            if value is not None and not isinstance(value, (str, int, float)):
+                return None
+            # keep type as 1 == 1.0 == True but they are formatted differently
+            key.append((name, type(value), value))
+        return key
 
     def build_composite(
         self, format_string, param_dict=None, composites=None, attr_getter=None
@@ -951,7 +1023,13 @@ class Py3:
         if isinstance(command, str):
             command = shlex.split(command)
         try:
-            return Popen(command, stdout=PIPE, stderr=PIPE, close_fds=True).wait()
+            with self._metrics().timed("command_run"):
+                return self._command_cache.run(
+                    command,
+                    lambda: Popen(
+                        command, stdout=PIPE, stderr=PIPE, close_fds=True
+                    ).wait(),
+                )
         except Exception as e:
             # make a pretty command for error loggings and...
             if isinstance(command, str):
@@ -962,7 +1040,12 @@ class Py3:
             raise exceptions.CommandError(msg, error_code=e.errno)
 
     def command_output(
-        self, command, shell=False, capture_stderr=False, localized=False
+        self,
+        command,
+        shell=False,
+        capture_stderr=False,
+        localized=False,
+        cache_timeout=None,
     ):
         """
         Run a command and return its output as unicode.
@@ -972,6 +1055,10 @@ class Py3:
         :param shell: if `True` then command is run through the shell
         :param capture_stderr: if `True` then STDERR is piped to STDOUT
         :param localized: if `False` then command is forced to use its default (English) locale
+        :param cache_timeout: if set the output is shared with any module
+            running the same command for this many seconds and identical
+            commands running at the same time share one process.  Only use
+            this for commands that just read information.
 
         A CommandError is raised if an error occurs
         """
@@ -987,7 +1074,7 @@ class Py3:
         stderr = STDOUT if capture_stderr else PIPE
         env = self._english_env if not localized else None
 
-        try:
+        def run():
             process = Popen(
                 command,
                 stdout=PIPE,
@@ -997,13 +1084,25 @@ class Py3:
                 shell=shell,
                 env=env,
             )
+            output, error = process.communicate()
+            return output, error, process.poll()
+
+        key = None
+        if cache_timeout is not None:
+            if not isinstance(command, str):
+                command = tuple(command)
+            key = (command, shell, capture_stderr, localized)
+
+        try:
+            with self._metrics().timed("command_output"):
+                output, error, retcode = self._command_cache.run(
+                    command, run, key=key, cache_timeout=cache_timeout
+                )
         except Exception as e:
             msg = "Command `{cmd}` {error}".format(cmd=pretty_cmd, error=e)
             self.log(msg)
-            raise exceptions.CommandError(msg, error_code=e.errno)
+            raise exceptions.CommandError(msg, error_code=getattr(e, "errno", None))
 
-        output, error = process.communicate()
-        retcode = process.poll()
         if retcode:
             # under certain conditions a successfully run command may get a
             # return code of -15 even though correct output was returned see
@@ -1023,6 +1122,14 @@ class Py3:
                 )
         return output
 
+    def _metrics(self):
+        """
+        The Metrics of our module that runtime statistics are recorded in.
+        """
+        if self._module:
+            return self._module.metrics
+        return Metrics()
+
     def _storage_init(self):
         """
         Ensure that storage is initialized.
@@ -1093,6 +1200,43 @@ class Py3:
             items.add((key, value))
         return items
 
+    def proc_sample(self, source, max_age=SAMPLE_INTERVAL):
+        """
+        Return the parsed contents of a /proc or /sys file.  The data is
+        shared with other modules so it must not be modified.
+
+        Files are read at most once every ``max_age`` seconds however many
+        modules use them.
+
+        ``source`` can be one of
+
+        - ``diskstats``: dict of device name to a list of major, minor and the
+          disk counters.
+        - ``loadavg``: list of the 1, 5 and 15 minute load averages and more.
+        - ``meminfo``: dict of name to value in kB eg ``{'MemTotal': 2048}``
+        - ``net_dev``: dict of interface name to a list of its 16 counters.
+        - ``stat``: dict eg ``{'cpu': [user, nice, system, idle, ...]}``
+        - ``uptime``: list of uptime and idle time in seconds.
+        - the path of a /proc or /sys file, uevent files are returned as a
+          dict other files as a string.
+        """
+        return self._proc_sampler.sample(source, max_age)[1]
+
+    def proc_delta(self, source, max_age=SAMPLE_INTERVAL):
+        """
+        Return a tuple of the change of all the numbers in the data for
+        ``source`` since this was last called by the module and the time in
+        seconds between the samples.  See ``proc_sample()`` for the sources.
+
+        On the first call the change is ``None``.
+        """
+        sample = self._proc_sampler.sample(source, max_age)
+        previous = self._proc_samples.get(source)
+        self._proc_samples[source] = sample
+        if previous is None:
+            return None, 0
+        return delta(sample[1], previous[1]), sample[0] - previous[0]
+
     def play_sound(self, sound_file):
         """
         Plays sound_file if possible.
@@ -1226,6 +1370,7 @@ class Py3:
         cookiejar=None,
         retry_times=None,
         retry_wait=None,
+        cache_timeout=None,
     ):
         """
         Make a request to a url and retrieve the results.
@@ -1244,6 +1389,9 @@ class Py3:
         :param cookiejar: an object of a CookieJar subclass
         :param retry_times: how many times to retry the request
         :param retry_wait: how long to wait between retries in seconds
+        :param cache_timeout: how long in seconds a GET response is shared
+            between modules.  By default this is the time allowed by the
+            response Cache-Control or Expires headers, `0` disables caching.
 
         :returns: HttpResponse
         """
@@ -1269,19 +1417,35 @@ class Py3:
         if retry_wait is None:
             retry_wait = getattr(self._py3status_module, "request_retry_wait", 2)
 
+        if cache_timeout is None:
+            cache_timeout = getattr(
+                self._py3status_module, "request_cache_timeout", None
+            )
+
+        if self._module and self._http_client.storage is None:
+            py3status_config = self._py3_wrapper.config["py3_config"].get(
+                "py3status", {}
+            )
+            if py3status_config.get("request_cache_storage"):
+                self._storage_init()
+                self._http_client.use_storage(self._storage)
+
         if "User-Agent" not in headers:
             headers["User-Agent"] = "py3status/{} {}".format(version, self._uid)
 
         def get_http_response():
-            return HttpResponse(
-                url,
-                params=params,
-                data=data,
-                headers=headers,
-                timeout=timeout,
-                auth=auth,
-                cookiejar=cookiejar,
-            )
+            with self._metrics().timed("request"):
+                return HttpResponse(
+                    url,
+                    params=params,
+                    data=data,
+                    headers=headers,
+                    timeout=timeout,
+                    auth=auth,
+                    cookiejar=cookiejar,
+                    client=self._http_client,
+                    cache_timeout=cache_timeout,
+                )
 
         for n in range(1, retry_times):
             try:
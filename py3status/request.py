@@ -1,20 +1,360 @@
 import base64
 import json
 import socket
+import zlib
 
+from collections import OrderedDict
+from email.utils import mktime_tz, parsedate_tz
+from hashlib import sha256
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from threading import Event, Lock
+from time import time
 from urllib.error import URLError, HTTPError
-from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
 from urllib.request import (
-    urlopen,
     Request,
     build_opener,
-    install_opener,
+    getproxies,
+    proxy_bypass,
     HTTPCookieProcessor,
 )
 
 
 from py3status.exceptions import RequestTimeout, RequestURLError, RequestInvalidJSON
 
+# how many idle connections are kept for each host
+MAX_IDLE_CONNECTIONS = 4
+# how many responses are kept for revalidation and the largest kept
+MAX_VALIDATED_RESPONSES = 64
+MAX_VALIDATED_SIZE = 1024 * 1024
+MAX_REDIRECTS = 10
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+# requests that can safely be sent again if a kept connection fails
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE")
+# most responses kept in the response cache
+MAX_CACHED_RESPONSES = 128
+# the response cache is saved to storage at most this often in seconds
+CACHE_SAVE_INTERVAL = 60
+
+
+def cache_time(headers):
+    """
+    How long in seconds the response can be cached for based on its
+    Cache-Control or Expires header.
+    """
+    directives = {}
+    for directive in headers.get("Cache-Control", "").lower().split(","):
+        name, _, value = directive.partition("=")
+        directives[name.strip()] = value.strip().strip('"')
+    if "no-store" in directives or "no-cache" in directives:
+        return 0
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    if "max-age" in directives:
+        try:
+            return max(int(directives["max-age"]) - age, 0)
+        except ValueError:
+            return 0
+    expires = parsedate_tz(headers.get("Expires", ""))
+    if expires:
+        date = parsedate_tz(headers.get("Date", ""))
+        now = mktime_tz(date) if date else time()
+        return max(mktime_tz(expires) - now, 0)
+    return 0
+
+
+def cache_key(method, url, headers):
+    """
+    The response cache key for a request.  The headers are used as any of
+    them may hold credentials eg PRIVATE-TOKEN, the key is hashed so that
+    they are not stored.  The User-Agent is left out as py3status makes it
+    unique to each module and it would stop modules sharing responses.
+    """
+    headers = sorted(
+        (name.lower(), value)
+        for name, value in headers.items()
+        if name.lower() != "user-agent"
+    )
+    return sha256(repr((method, url, headers)).encode("utf-8")).hexdigest()
+
+
+class HttpClient:
+    """
+    A thread safe http client shared by all modules.
+
+    Connections are kept open and reused for each host.  Responses are
+    decompressed if needed and GET responses with an ETag or Last-Modified
+    header are kept so that they can be revalidated rather than downloaded
+    again.
+
+    GET responses are cached for as long as their headers allow or for the
+    cache timeout given and identical requests made at the same time share
+    one request.
+    """
+
+    def __init__(self):
+        self.cache = OrderedDict()
+        self.cache_changed = False
+        self.cache_saved = 0
+        self.in_flight = {}
+        self.lock = Lock()
+        self.pools = {}
+        self.storage = None
+        self.validated = OrderedDict()
+
+    def use_storage(self, storage):
+        """
+        Keep the response cache in storage so that it survives restarts.
+        """
+        self.storage = storage
+        stored = storage.storage_get("py3status", "request_cache") or {}
+        now = time()
+        self.cache_saved = now
+        with self.lock:
+            for key, value in stored.items():
+                if value[0] > now and key not in self.cache:
+                    self.cache[key] = value
+
+    def save_cache(self):
+        """
+        Save the unexpired responses to storage if the cache has changed.
+        """
+        if not self.storage or not self.cache_changed:
+            return
+        now = time()
+        with self.lock:
+            cache = {k: v for k, v in self.cache.items() if v[0] > now}
+            self.cache_changed = False
+            self.cache_saved = now
+        self.storage.storage_set("py3status", "request_cache", cache)
+
+    def open(
+        self,
+        url,
+        data=None,
+        headers=None,
+        timeout=None,
+        cookiejar=None,
+        cache_timeout=None,
+    ):
+        """
+        Make a request and return (status, reason, headers, body).
+        Redirects are followed.
+
+        GET requests without a cookiejar use the response cache.  If
+        cache_timeout is given it is used instead of the time allowed by the
+        response headers, 0 disables the cache.
+        """
+        if data is not None or cookiejar is not None or cache_timeout == 0:
+            return self._open(url, data, headers, timeout, cookiejar)
+
+        headers = headers or {}
+        key = cache_key("GET", url, headers)
+
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached[0] > time():
+                return cached[1]
+            waiting = self.in_flight.get(key)
+            if waiting is None:
+                # we make the request others wait for us
+                self.in_flight[key] = [Event(), None, None]
+        if waiting:
+            waiting[0].wait()
+            if waiting[2]:
+                raise waiting[2]
+            return waiting[1]
+
+        result = exception = None
+        try:
+            result = self._open(url, data, headers, timeout, cookiejar)
+        except Exception as e:
+            exception = e
+        with self.lock:
+            waiting = self.in_flight.pop(key)
+        waiting[1] = result
+        waiting[2] = exception
+        waiting[0].set()
+        if exception:
+            raise exception
+
+        if result[0] < 400:
+            if cache_timeout is None:
+                cache_timeout = cache_time(result[2])
+            if cache_timeout > 0:
+                with self.lock:
+                    self.cache[key] = (time() + cache_timeout, result)
+                    self.cache.move_to_end(key)
+                    if len(self.cache) > MAX_CACHED_RESPONSES:
+                        self.cache.popitem(last=False)
+                    self.cache_changed = True
+                # changes are saved together, any left are saved on exit
+                if time() >= self.cache_saved + CACHE_SAVE_INTERVAL:
+                    self.save_cache()
+        return result
+
+    def _get_connection(self, scheme, netloc, timeout):
+        with self.lock:
+            pool = self.pools.get((scheme, netloc))
+            if pool:
+                connection = pool.pop()
+                connection.timeout = timeout
+                if connection.sock:
+                    connection.sock.settimeout(timeout)
+                return connection, True
+        if scheme == "https":
+            connection = HTTPSConnection(netloc, timeout=timeout)
+        else:
+            connection = HTTPConnection(netloc, timeout=timeout)
+        return connection, False
+
+    def _release_connection(self, scheme, netloc, connection):
+        with self.lock:
+            pool = self.pools.setdefault((scheme, netloc), [])
+            if len(pool) < MAX_IDLE_CONNECTIONS:
+                pool.append(connection)
+                return
+        connection.close()
+
+    def _send(self, method, url, body, headers, timeout):
+        """
+        Make a single request and return (status, reason, headers, body).
+        """
+        parts = urlsplit(url)
+        path = urlunsplit(("", "", parts.path or "/", parts.query, ""))
+        connection, reused = self._get_connection(parts.scheme, parts.netloc, timeout)
+        while True:
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (ConnectionError, HTTPException):
+                connection.close()
+                # the kept connection may have been closed by the server so
+                # try again with a new one, unless the server may have acted
+                # on the request
+                if not reused or method not in IDEMPOTENT_METHODS:
+                    raise
+                reused = False
+            except Exception:
+                connection.close()
+                raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release_connection(parts.scheme, parts.netloc, connection)
+
+        encoding = response.headers.get("Content-Encoding", "").lower()
+        if encoding == "gzip":
+            data = zlib.decompress(data, 16 + zlib.MAX_WBITS)
+        elif encoding == "deflate":
+            try:
+                data = zlib.decompress(data)
+            except zlib.error:
+                # raw deflate data
+                data = zlib.decompress(data, -zlib.MAX_WBITS)
+        return response.status, response.reason, response.headers, data
+
+    def _open_proxy(self, request, timeout, cookiejar):
+        """
+        Proxies are left to urllib.
+        """
+        handlers = []
+        if cookiejar is not None:
+            handlers.append(HTTPCookieProcessor(cookiejar))
+        try:
+            response = build_opener(*handlers).open(request, timeout=timeout)
+        except HTTPError as e:
+            return e.code, e.reason, e.headers, b""
+        return response.getcode(), response.reason, response.headers, response.read()
+
+    def _open(self, url, data=None, headers=None, timeout=None, cookiejar=None):
+        """
+        Make a request and return (status, reason, headers, body).
+        Redirects are followed.
+        """
+        headers = dict(headers or {})
+        method = "POST" if data is not None else "GET"
+        if data is not None:
+            headers.setdefault("Content-Type", "application/x-www-form-urlencoded")
+
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https"):
+            raise URLError("unknown url type: {}".format(parts.scheme))
+        if parts.scheme in getproxies() and not proxy_bypass(parts.hostname or ""):
+            return self._open_proxy(
+                Request(url, data=data, headers=headers), timeout, cookiejar
+            )
+
+        if not any(k.lower() == "accept-encoding" for k in headers):
+            headers["Accept-Encoding"] = "gzip, deflate"
+
+        for redirect in range(MAX_REDIRECTS):
+            request = Request(url, data=data, headers=headers)
+            if cookiejar is not None:
+                cookiejar.add_cookie_header(request)
+            request_headers = dict(request.header_items())
+
+            # revalidate a previous response if we can
+            key = None
+            cached = None
+            if method == "GET":
+                key = (url, tuple(sorted(request_headers.items())))
+                with self.lock:
+                    cached = self.validated.get(key)
+                if cached:
+                    if cached[0]:
+                        request_headers["If-None-Match"] = cached[0]
+                    if cached[1]:
+                        request_headers["If-Modified-Since"] = cached[1]
+
+            status, reason, response_headers, body = self._send(
+                method, url, data, request_headers, timeout
+            )
+            if cookiejar is not None:
+                cookiejar.extract_cookies(_CookieResponse(response_headers), request)
+
+            if status == 304 and cached:
+                return 200, "OK", cached[2], cached[3]
+
+            if status in REDIRECT_CODES and "Location" in response_headers:
+                url = urljoin(url, response_headers["Location"])
+                if status not in (307, 308):
+                    method = "GET"
+                    data = None
+                    headers.pop("Content-Type", None)
+                continue
+
+            if key and status == 200:
+                etag = response_headers.get("ETag")
+                modified = response_headers.get("Last-Modified")
+                with self.lock:
+                    if (etag or modified) and len(body) <= MAX_VALIDATED_SIZE:
+                        self.validated[key] = (etag, modified, response_headers, body)
+                        self.validated.move_to_end(key)
+                        if len(self.validated) > MAX_VALIDATED_RESPONSES:
+                            self.validated.popitem(last=False)
+                    else:
+                        self.validated.pop(key, None)
+            return status, reason, response_headers, body
+        raise URLError("too many redirects")
+
+
+class _CookieResponse:
+    """
+    The interface CookieJar.extract_cookies() needs from a response.
+    """
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def info(self):
+        return self.headers
+
 
 class HttpResponse:
     """
@@ -23,7 +363,18 @@ class HttpResponse:
     The aim is to support both python 2 and 3 and be a simple as possible
     """
 
-    def __init__(self, url, params, data, headers, timeout, auth, cookiejar):
+    def __init__(
+        self,
+        url,
+        params,
+        data,
+        headers,
+        timeout,
+        auth,
+        cookiejar,
+        client=None,
+        cache_timeout=None,
+    ):
         # fix the url if needed
         url_parts = urlsplit(url)
         if url_parts.query or params:
@@ -45,41 +396,47 @@ class HttpResponse:
             data = urlencode(data).encode()
         if cookiejar is not None:
             self._cookiejar = cookiejar
-            opener = build_opener(HTTPCookieProcessor(cookiejar))
-            install_opener(opener)
-
-        request = Request(url, headers=headers)
+        if client is None:
+            client = HttpClient()
 
         try:
-            self._response = urlopen(request, data=data, timeout=timeout)
-            self._error_message = None
+            status, reason, response_headers, body = client.open(
+                url,
+                data=data or None,
+                headers=headers,
+                timeout=timeout,
+                cookiejar=cookiejar,
+                cache_timeout=cache_timeout,
+            )
         except URLError as e:
             reason = e.reason
             if isinstance(reason, socket.timeout):
                 raise RequestTimeout("request timed out")
-            elif isinstance(e, HTTPError):
-                self._status_code = e.code
-                self._error_message = reason
-                # we return an HttpResponse but have no response
-                # so create some 'fake' response data.
-                self._text = ""
-                self._json = None
-                self._headers = []
-            else:
-                # unknown exception, so just raise it
-                raise RequestURLError(reason)
+            # unknown exception, so just raise it
+            raise RequestURLError(reason)
         except socket.timeout:
             raise RequestTimeout("request timed out")
+        except (HTTPException, OSError, zlib.error) as e:
+            raise RequestURLError(e)
+
+        self._status_code = status
+        if status >= 400:
+            self._error_message = reason
+            # we return an HttpResponse but have no response
+            # so create some 'fake' response data.
+            self._text = ""
+            self._json = None
+            self._headers = []
+        else:
+            self._error_message = None
+            self._body = body
+            self._headers = response_headers
 
     @property
     def status_code(self):
         """
         Get the http status code for the response
         """
-        try:
-            return self._status_code
-        except AttributeError:
-            self._status_code = self._response.getcode()
         return self._status_code
 
     @property
@@ -90,8 +447,8 @@ class HttpResponse:
         try:
             return self._text
         except AttributeError:
-            encoding = self._response.headers.get_content_charset("utf-8")
-            self._text = self._response.read().decode(encoding or "utf-8")
+            encoding = self._headers.get_content_charset("utf-8")
+            self._text = self._body.decode(encoding or "utf-8")
         return self._text
 
     def json(self):
@@ -112,11 +469,7 @@ class HttpResponse:
         """
         Get the headers from the response.
         """
-        try:
-            return self._headers
-        except AttributeError:
-            self._headers = self._response.headers
-            return self._headers
+        return self._headers
 
     @property
     def cookiejar(self):
@@ -1,25 +1,135 @@
 import os
+import sqlite3
 
-from pickle import dump, load
+from pickle import dumps, load, loads
 from tempfile import NamedTemporaryFile
+from threading import Lock
 from time import time
 
+# changes are written to disk at most this many seconds after they are made
+STORAGE_FLUSH_INTERVAL = 5
+
+# marks a key that has been deleted in the changes to be written
+DELETED = object()
+
+
+class PickleBackend:
+    """
+    Keeps the data of all modules in a single pickle file.  The whole file is
+    rewritten when anything changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = {}
+        try:
+            with open(path, "rb") as f:
+                self.data = load(f, encoding="bytes")
+        except OSError:
+            pass
+
+    def load(self, module_name):
+        return dict(self.data.get(module_name, {}))
+
+    def write(self, changes):
+        for module_name, items in changes.items():
+            data = self.data.setdefault(module_name, {})
+            for key, value in items.items():
+                if value is DELETED:
+                    data.pop(key, None)
+                else:
+                    data[key] = value
+        # we want to always have a valid file
+        with NamedTemporaryFile(dir=os.path.dirname(self.path), delete=False) as f:
+            # we use protocol=2 for python 2/3 compatibility
+            f.write(dumps(self.data, protocol=2))
+            f.flush()
+            os.fsync(f.fileno())
+            tmppath = f.name
+        os.rename(tmppath, self.path)
+
+
+class SqliteBackend:
+    """
+    Keeps each value in its own row of an SQLite database in WAL mode.  Only
+    the values that have changed are written and modules are loaded when
+    they first use storage.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.lock = Lock()
+        self.path = path
+        new = not os.path.exists(path)
+        if new:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS storage "
+            "(module TEXT, key TEXT, value BLOB, PRIMARY KEY (module, key))"
+        )
+        self.migrated = None
+        if new and legacy_path and os.path.exists(legacy_path):
+            # copy the data from the storage used by older versions
+            self.write(PickleBackend(legacy_path).data)
+            self.migrated = legacy_path
+
+    def load(self, module_name):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key, value FROM storage WHERE module = ?", (module_name,)
+            ).fetchall()
+        return {key: loads(value) for key, value in rows}
+
+    def write(self, changes):
+        rows = []
+        deleted = []
+        for module_name, items in changes.items():
+            for key, value in items.items():
+                if value is DELETED:
+                    deleted.append((module_name, key))
+                else:
+                    rows.append((module_name, key, dumps(value, protocol=2)))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM storage WHERE module = ? AND key = ?", deleted
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO storage VALUES (?, ?, ?)", rows
+            )
+
 
 class Storage:
 
+    backend = None
+    changes = {}
     data = {}
+    dirty = False
+    flush_due = None
+    flush_interval = 0
     initialized = False
+    lock = Lock()
+    write_lock = Lock()
 
     def init(self, py3_wrapper):
+        with self.lock:
+            if self.initialized:
+                return
+            self._init(py3_wrapper)
+            self.initialized = True
+
+    def _init(self, py3_wrapper):
         self.py3_wrapper = py3_wrapper
         self.config = py3_wrapper.config
         py3_config = self.config.get("py3_config", {})
+        options = py3_config.get("py3status", {})
 
         # check for legacy storage cache
         legacy_storage_path = self.get_legacy_storage_path()
 
         # cutting edge storage cache
-        storage_config = py3_config.get("py3status", {}).get("storage")
+        storage_config = options.get("storage")
         if storage_config:
             storage_file = os.path.expandvars(os.path.expanduser(storage_config))
             if "/" in storage_file:
@@ -34,6 +144,15 @@ class Storage:
             storage_dir = os.path.expanduser("~/.cache")
         self.storage_path = os.path.join(storage_dir, storage_file)
 
+        # changes are batched and written by the flush interval, 0 writes
+        # every change immediately
+        if self.config.get("testing"):
+            self.flush_interval = 0
+        else:
+            self.flush_interval = options.get(
+                "storage_flush_interval", STORAGE_FLUSH_INTERVAL
+            )
+
         # move legacy storage cache to new desired / default location
         if legacy_storage_path:
             self.py3_wrapper.log(
@@ -43,16 +162,23 @@ class Storage:
             )
             os.rename(legacy_storage_path, self.storage_path)
 
-        try:
-            with open(self.storage_path, "rb") as f:
-                self.data = load(f, encoding="bytes")
-        except OSError:
-            pass
+        self.changes = {}
+        self.data = {}
+        if options.get("storage_backend") == "pickle":
+            self.backend = PickleBackend(self.storage_path)
+        else:
+            # the pickle file is kept so that older versions can still use it
+            self.backend = SqliteBackend(
+                os.path.splitext(self.storage_path)[0] + ".sqlite",
+                legacy_path=self.storage_path,
+            )
+            if self.backend.migrated:
+                self.py3_wrapper.log(
+                    "storage migrated from {}".format(self.backend.migrated)
+                )
+            self.storage_path = self.backend.path
 
         self.py3_wrapper.log("storage_path: {}".format(self.storage_path))
-        if self.data:
-            self.py3_wrapper.log("storage_data: {}".format(self.data))
-        self.initialized = True
 
     def get_legacy_storage_path(self):
         """
@@ -67,43 +193,87 @@ class Storage:
         else:
             return None
 
+    def module_data(self, module_name):
+        """
+        Return the data of the module, loading it if needed.  The lock must be
+        held.
+        """
+        data = self.data.get(module_name)
+        if data is None:
+            data = self.data[module_name] = self.backend.load(module_name)
+        return data
+
     def save(self):
         """
-        Save our data to disk. We want to always have a valid file.
+        Write the changes to disk.
         """
-        with NamedTemporaryFile(
-            dir=os.path.dirname(self.storage_path), delete=False
-        ) as f:
-            # we use protocol=2 for python 2/3 compatibility
-            dump(self.data, f, protocol=2)
-            f.flush()
-            os.fsync(f.fileno())
-            tmppath = f.name
-        os.rename(tmppath, self.storage_path)
+        with self.write_lock:
+            with self.lock:
+                changes = self.changes
+                self.changes = {}
+                self.dirty = False
+            if changes:
+                self.backend.write(changes)
+
+    def changed(self, module_name, items):
+        """
+        Record changed items of a module.  Unless they are saved immediately
+        a flush is scheduled for when the flush interval has passed, further
+        changes before then are saved together.  The lock must be held.
+        """
+        self.changes.setdefault(module_name, {}).update(items)
+        self.dirty = True
+        if not self.flush_interval or self.flush_due:
+            return
+        self.flush_due = time() + self.flush_interval
+        self.py3_wrapper.timeout_queue_add(self, self.flush_due)
+
+    def run(self):
+        """
+        Called by the timeout queue when a flush is due.
+        """
+        with self.lock:
+            self.flush_due = None
+        self.flush()
+
+    def flush(self):
+        """
+        Save any changes that have not yet been written to disk.
+        """
+        if self.dirty:
+            self.save()
 
     def storage_set(self, module_name, key, value):
         if key.startswith("_"):
             raise ValueError('cannot set keys starting with an underscore "_"')
 
-        if self.data.get(module_name, {}).get(key) == value:
-            return
+        with self.lock:
+            data = self.module_data(module_name)
+            if data.get(key) == value:
+                return
 
-        if module_name not in self.data:
-            self.data[module_name] = {}
-        self.data[module_name][key] = value
-        ts = time()
-        if "_ctime" not in self.data[module_name]:
-            self.data[module_name]["_ctime"] = ts
-        self.data[module_name]["_mtime"] = ts
-        self.save()
+            items = {key: value, "_mtime": time()}
+            if "_ctime" not in data:
+                items["_ctime"] = items["_mtime"]
+            data.update(items)
+            self.changed(module_name, items)
+        if not self.flush_interval:
+            self.save()
 
     def storage_get(self, module_name, key):
-        return self.data.get(module_name, {}).get(key, None)
+        with self.lock:
+            return self.module_data(module_name).get(key, None)
 
     def storage_del(self, module_name, key=None):
-        if module_name in self.data and key in self.data[module_name]:
-            del self.data[module_name][key]
+        with self.lock:
+            data = self.module_data(module_name)
+            if key not in data:
+                return
+            del data[key]
+            self.changed(module_name, {key: DELETED})
+        if not self.flush_interval:
             self.save()
 
     def storage_keys(self, module_name):
-        return self.data.get(module_name, {}).keys()
+        with self.lock:
+            return list(self.module_data(module_name))
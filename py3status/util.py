@@ -1,6 +1,166 @@
 import re
+from bisect import bisect_left
+from collections import OrderedDict
 from colorsys import rgb_to_hsv, hsv_to_rgb
+from contextlib import contextmanager
 from math import modf
+from threading import Lock
+from time import perf_counter
+
+# upper limits in seconds of the duration histogram buckets used by Metrics
+METRICS_BUCKETS = [0.001, 0.01, 0.1, 1, 10]
+
+
+class LRUCache:
+    """
+    A thread safe dict like cache holding at most size items.  When full the
+    least recently used item is removed.
+    """
+
+    def __init__(self, size):
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                raise
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove items over the size limit, the lock must be held.
+        """
+        while len(self._data) > self.size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def resize(self, size):
+        """
+        Change the maximum number of items held.
+        """
+        with self._lock:
+            self.size = size
+            self._evict()
+
+    def stats(self):
+        """
+        Return the cache size and counters.
+        """
+        with self._lock:
+            return {
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "items": len(self._data),
+                "misses": self.misses,
+                "size": self.size,
+            }
+
+
+class Metrics:
+    """
+    Thread safe runtime statistics for the things a module does eg running
+    its methods or handling clicks.  Each is recorded by name with how many
+    times it was run, how long it took and how many times it failed.
+    """
+
+    def __init__(self):
+        self._items = {}
+        self._lock = Lock()
+
+    def record(self, name, duration, error=False, changed=None):
+        """
+        Record a run of name that took duration seconds.  changed is if the
+        run changed the output, None if that does not apply.
+        """
+        with self._lock:
+            item = self._items.get(name)
+            if item is None:
+                item = self._items[name] = {
+                    "changed": None if changed is None else 0,
+                    "errors": 0,
+                    "histogram": [0] * (len(METRICS_BUCKETS) + 1),
+                    "runs": 0,
+                    "time_last": 0,
+                    "time_max": 0,
+                    "time_total": 0,
+                }
+            item["runs"] += 1
+            item["time_last"] = duration
+            item["time_total"] += duration
+            if duration > item["time_max"]:
+                item["time_max"] = duration
+            item["histogram"][bisect_left(METRICS_BUCKETS, duration)] += 1
+            if error:
+                item["errors"] += 1
+            if changed:
+                item["changed"] += 1
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Context manager that records how long the code it holds took to run.
+        """
+        start = perf_counter()
+        error = True
+        try:
+            yield
+            error = False
+        finally:
+            self.record(name, perf_counter() - start, error=error)
+
+    def stats(self):
+        """
+        Return the statistics of each name.  The histogram maps the upper
+        limit of each bucket in seconds to the number of runs in it.
+        """
+        labels = ["<={}".format(x) for x in METRICS_BUCKETS]
+        labels.append(">{}".format(METRICS_BUCKETS[-1]))
+        stats = {}
+        with self._lock:
+            for name, item in self._items.items():
+                item = dict(item)
+                runs = item["runs"]
+                item["histogram"] = dict(zip(labels, item["histogram"]))
+                item["time_avg"] = item["time_total"] / runs
+                if item["changed"] is None:
+                    del item["changed"]
+                else:
+                    item["changed_ratio"] = item["changed"] / runs
+                stats[name] = item
+        return stats
 
 
 class Gradients:
@@ -0,0 +1,94 @@
+import threading
+import time
+
+import py3status.command_cache
+from py3status.command_cache import CommandCache
+
+
+class Command:
+    """
+    A command that blocks until it is released and counts its runs.
+    """
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return "output {}".format(self.calls)
+
+
+def run_together(cache, command, count=5):
+    """
+    Run the command from several threads at once, the first is running the
+    command when the others start.  Returns the results or exceptions.
+    """
+    results = [None] * count
+
+    def run(index):
+        try:
+            results[index] = cache.run("cmd --arg", command, key="cmd")
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(x,)) for x in range(count)]
+    threads[0].start()
+    while "cmd" not in cache.running:
+        time.sleep(0.001)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    command.release.set()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_command_cache_shared():
+    cache = CommandCache()
+    command = Command()
+    results = run_together(cache, command)
+    assert command.calls == 1
+    assert results == ["output 1"] * 5
+    stats = cache.stats()["cmd"]
+    assert stats["runs"] == 1
+    assert stats["cached"] == 4
+    # without a cache timeout the command is run again
+    assert cache.run("cmd", command, key="cmd") == "output 2"
+
+
+def test_command_cache_exception():
+    cache = CommandCache()
+    error = ValueError("failed")
+    command = Command(error)
+    results = run_together(cache, command)
+    assert command.calls == 1
+    assert all(result is error for result in results)
+    assert cache.stats()["cmd"]["errors"] == 1
+    assert cache.running == {}
+
+
+def test_command_cache_timeout(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(py3status.command_cache, "time", lambda: now[0])
+    cache = CommandCache()
+    command = Command()
+    command.release.set()
+    assert cache.run(["cmd"], command, key="cmd", cache_timeout=10) == "output 1"
+    now[0] += 9
+    assert cache.run(["cmd"], command, key="cmd", cache_timeout=10) == "output 1"
+    # expired
+    now[0] += 1
+    assert cache.run(["cmd"], command, key="cmd", cache_timeout=10) == "output 2"
+    # other keys are run separately and expired results are removed
+    now[0] += 20
+    assert cache.run(["cmd"], command, key="other", cache_timeout=10) == "output 3"
+    assert list(cache.cache) == ["other"]
+    # commands without a key are always run
+    assert cache.run(["cmd"], command) == "output 4"
+    assert cache.stats()["cmd"]["cached"] == 1
@@ -0,0 +1,537 @@
+import json
+import os
+import stat
+import sys
+import threading
+import time
+
+import py3status.core
+from py3status.command import command_parser
+from py3status.core import OutputLine, Py3statusWrapper, RunnerPool
+
+
+class Options:
+    log_file = None
+
+
+class FakeModule:
+    def __init__(self, name, kills):
+        self.module_full_name = name
+        self.terminated = False
+        self.kills = kills
+
+    def kill(self):
+        self.kills.append(self)
+
+
+class FakeI3status:
+    i3modules = {}
+
+
+class FakeEvents:
+    on_click = {}
+
+
+class FakeRunnerPool:
+    def __init__(self):
+        self.added = []
+
+    def add(self, module, module_name):
+        self.added.append(module)
+
+
+def make_config(modules):
+    config = {
+        "general": {},
+        "py3status": {},
+        ".module_groups": {},
+        "i3s_modules": [],
+        "py3_modules": list(modules),
+        "on_click": {},
+        "order": list(modules),
+    }
+    config.update(modules)
+    return config
+
+
+def make_wrapper(modules):
+    py3_wrapper = Py3statusWrapper(Options())
+    py3_wrapper.log = lambda *args, **kw: None
+    py3_wrapper.config["i3status_config_path"] = "i3status.conf"
+    py3_wrapper.config["py3_config"] = make_config(modules)
+    py3_wrapper.py3_modules = list(modules)
+    py3_wrapper.events_thread = FakeEvents()
+    py3_wrapper.i3status_thread = FakeI3status()
+    py3_wrapper.runner_pool = FakeRunnerPool()
+    py3_wrapper.kills = []
+
+    def load_modules(modules_list, user_modules):
+        for name in modules_list:
+            py3_wrapper.modules[name] = FakeModule(name, py3_wrapper.kills)
+
+    py3_wrapper.load_modules = load_modules
+    py3_wrapper.get_user_configured_modules = lambda: {}
+    py3_wrapper.load_modules(modules, {})
+    py3_wrapper.create_mappings(py3_wrapper.config["py3_config"])
+    py3_wrapper.create_output_modules()
+    return py3_wrapper
+
+
+def reload(monkeypatch, py3_wrapper, modules):
+    new_config = make_config(modules)
+    monkeypatch.setattr(
+        py3status.core, "process_config", lambda path, wrapper: new_config
+    )
+    py3_wrapper.reload_config()
+
+
+def test_reload_removed_module(monkeypatch):
+    py3_wrapper = make_wrapper({"a": {}, "b": {}})
+    b = py3_wrapper.modules["b"]
+    py3_wrapper.timeout_queue_add(b, time.time() + 100)
+    py3_wrapper.timeout_queue_process()
+
+    reload(monkeypatch, py3_wrapper, {"a": {}})
+    assert "b" not in py3_wrapper.modules
+    assert "b" not in py3_wrapper.output_modules
+    assert b.terminated
+    assert b not in py3_wrapper.timeout_queue_lookup
+    assert py3_wrapper.kills == [b]
+
+
+def test_reload_running_module(monkeypatch):
+    py3_wrapper = make_wrapper({"a": {}, "b": {}})
+    b = py3_wrapper.modules["b"]
+    # b is running and another update is waiting for it to finish
+    py3_wrapper.timeout_queue_add(b)
+    py3_wrapper.timeout_queue_process()
+    py3_wrapper.timeout_queue_add(b)
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.runner_pool.added == [b]
+    assert py3_wrapper.timeout_missed["b"] is b
+
+    reload(monkeypatch, py3_wrapper, {"a": {}})
+    # not killed while it is running and the waiting update is cancelled
+    assert py3_wrapper.kills == []
+    assert "b" not in py3_wrapper.timeout_missed
+
+    # the module schedules itself again as it finishes
+    py3_wrapper.timeout_queue_add(b)
+    py3_wrapper.timeout_finished.append("b")
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.kills == [b]
+    assert py3_wrapper.runner_pool.added == [b]
+    assert "b" not in py3_wrapper.timeout_running
+
+
+def test_reload_changed_running_module(monkeypatch):
+    py3_wrapper = make_wrapper({"a": {}})
+    old = py3_wrapper.modules["a"]
+    py3_wrapper.timeout_queue_add(old)
+    py3_wrapper.timeout_queue_process()
+
+    reload(monkeypatch, py3_wrapper, {"a": {"format": "changed"}})
+    new = py3_wrapper.modules["a"]
+    assert new is not old
+    assert py3_wrapper.kills == []
+
+    # the new module waits for the old one to finish and be killed
+    py3_wrapper.timeout_queue_add(new)
+    py3_wrapper.timeout_queue_process()
+    assert new not in py3_wrapper.runner_pool.added
+    py3_wrapper.timeout_finished.append("a")
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.kills == [old]
+    assert py3_wrapper.runner_pool.added[-1] is new
+
+
+def test_reload_command(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["py3-cmd", "reload"])
+    options = command_parser()
+    assert options.command == "reload"
+    assert options.module == []
+
+
+def test_run_profiler(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    py3_wrapper = Py3statusWrapper(Options())
+    py3_wrapper.log = lambda *args, **kw: None
+    py3_wrapper.thread_labels = lambda: {}
+    assert py3_wrapper.run_profiler("stop") == {"error": "profiler not running"}
+    assert py3_wrapper.run_profiler("start") == {"profiler": "started"}
+
+    result = py3_wrapper.run_profiler("stop")
+    path = result["file"]
+    assert os.path.dirname(path) == str(tmp_path)
+    assert os.path.basename(path).startswith("py3status_{}_".format(os.getpid()))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert py3_wrapper.profiler is None
+
+
+def make_scheduler(slack=0):
+    py3_wrapper = Py3statusWrapper(Options())
+    py3_wrapper.runner_pool = FakeRunnerPool()
+    py3_wrapper.timeout_slack = slack
+    return py3_wrapper
+
+
+def test_timeout_queue_order():
+    py3_wrapper = make_scheduler()
+    modules = [FakeModule(name, []) for name in "abcd"]
+    now = time.time()
+    py3_wrapper.timeout_queue_add(modules[0], now - 1)
+    py3_wrapper.timeout_queue_add(modules[1], now - 3)
+    py3_wrapper.timeout_queue_add(modules[2], now + 100)
+    py3_wrapper.timeout_queue_add(modules[3], now - 2)
+    wait = py3_wrapper.timeout_queue_process()
+    # due modules are run in the order they were due
+    assert py3_wrapper.runner_pool.added == [modules[1], modules[3], modules[0]]
+    assert py3_wrapper.timeout_due == now + 100
+    assert 99 < wait <= 100
+    assert list(py3_wrapper.timeout_queue_lookup) == [modules[2]]
+
+
+def test_timeout_queue_cancel():
+    py3_wrapper = make_scheduler()
+    module = FakeModule("a", [])
+    now = time.time()
+    py3_wrapper.timeout_queue_add(module, now + 200)
+    py3_wrapper.timeout_queue_process()
+    # adding again cancels the earlier entry which is left in the heap
+    py3_wrapper.timeout_queue_add(module, now + 100)
+    py3_wrapper.timeout_queue_process()
+    assert len(py3_wrapper.timeout_queue) == 2
+    assert py3_wrapper.timeout_cancelled == 1
+    assert py3_wrapper.timeout_queue_lookup[module][0] == now + 100
+    assert py3_wrapper.timeout_due == now + 100
+
+    # the module runs once and the cancelled entry is then discarded
+    py3_wrapper.timeout_queue[0][0] = now - 1
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.runner_pool.added == [module]
+    assert py3_wrapper.timeout_queue == []
+    assert py3_wrapper.timeout_cancelled == 0
+    assert py3_wrapper.timeout_due is None
+
+    # a module due now replaces its scheduled entry
+    py3_wrapper.timeout_queue_add(module, now + 100)
+    py3_wrapper.timeout_queue_process()
+    py3_wrapper.timeout_finished.append("a")
+    py3_wrapper.timeout_queue_add(module)
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.runner_pool.added == [module, module]
+    assert py3_wrapper.timeout_queue_lookup == {}
+    assert py3_wrapper.timeout_due is None
+
+
+def test_timeout_queue_rebuild():
+    py3_wrapper = make_scheduler()
+    modules = [FakeModule(name, []) for name in "abcd"]
+    now = time.time()
+    for module in modules:
+        py3_wrapper.timeout_queue_add(module, now + 200)
+    py3_wrapper.timeout_queue_process()
+    # each earlier time leaves a cancelled entry below the top of the heap
+    for index in range(4):
+        py3_wrapper.timeout_queue_add(modules[0], now + 100 - index)
+        py3_wrapper.timeout_queue_process()
+    assert len(py3_wrapper.timeout_queue) == 8
+    assert py3_wrapper.timeout_cancelled == 4
+    # more than half the heap is cancelled entries so it is rebuilt
+    py3_wrapper.timeout_queue_add(modules[0], now + 50)
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.timeout_cancelled == 0
+    assert len(py3_wrapper.timeout_queue) == 4
+    assert all(entry[2] for entry in py3_wrapper.timeout_queue)
+    assert py3_wrapper.timeout_queue[0][2] is modules[0]
+    assert py3_wrapper.timeout_due == now + 50
+
+
+def test_timeout_queue_slack():
+    py3_wrapper = make_scheduler(slack=0.5)
+    a = FakeModule("a", [])
+    b = FakeModule("b", [])
+    now = int(time.time()) + 100
+    py3_wrapper.timeout_queue_add(a, now + 0.1)
+    py3_wrapper.timeout_queue_add(b, now + 0.4)
+    py3_wrapper.timeout_queue_process()
+    # times are rounded up so both are updated together
+    assert py3_wrapper.timeout_queue_lookup[a][0] == now + 0.5
+    assert py3_wrapper.timeout_queue_lookup[b][0] == now + 0.5
+    assert py3_wrapper.timeout_due == now + 0.5
+
+    py3_wrapper.timeout_slack = 0
+    py3_wrapper.timeout_queue_add(a, now + 0.1)
+    py3_wrapper.timeout_queue_process()
+    assert py3_wrapper.timeout_queue_lookup[a][0] == now + 0.1
+
+
+class PoolModule:
+    """
+    Records how many runners are running the module at once.
+    """
+
+    def __init__(self, name, error=False):
+        self.module_full_name = name
+        self.active = 0
+        self.error = error
+        self.lock = threading.Lock()
+        self.max_active = 0
+        self.runs = 0
+
+    def run(self):
+        with self.lock:
+            self.active += 1
+            self.runs += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.005)
+        with self.lock:
+            self.active -= 1
+        if self.error:
+            raise Exception("module failed")
+
+
+def make_pool(size=4):
+    py3_wrapper = Py3statusWrapper(Options())
+    py3_wrapper.errors = []
+    py3_wrapper.report_exception = lambda msg, **kw: py3_wrapper.errors.append(msg)
+    py3_wrapper.runner_pool = RunnerPool(py3_wrapper, size)
+    return py3_wrapper
+
+
+def wait_finished(py3_wrapper):
+    end = time.time() + 5
+    while py3_wrapper.timeout_running and time.time() < end:
+        py3_wrapper.timeout_queue_process()
+        time.sleep(0.001)
+    assert not py3_wrapper.timeout_running
+
+
+def test_runner_pool_module_not_concurrent():
+    py3_wrapper = make_pool()
+    module = PoolModule("a")
+    other = PoolModule("b")
+    for _ in range(50):
+        py3_wrapper.timeout_queue_add(module)
+        py3_wrapper.timeout_queue_add(other)
+        py3_wrapper.timeout_queue_process()
+        time.sleep(0.001)
+    wait_finished(py3_wrapper)
+    # updates requested while running are run once it has finished
+    assert module.max_active == 1
+    assert 1 < module.runs <= 50
+    assert other.max_active == 1
+    py3_wrapper.runner_pool.stop()
+
+
+def test_runner_pool_exception():
+    py3_wrapper = make_pool(size=1)
+    failing = PoolModule("a", error=True)
+    module = PoolModule("b")
+    for _ in range(3):
+        py3_wrapper.timeout_queue_add(failing)
+        py3_wrapper.timeout_queue_add(module)
+        py3_wrapper.timeout_queue_process()
+        wait_finished(py3_wrapper)
+    # the runner carries on after reporting the exception
+    assert failing.runs == 3
+    assert module.runs == 3
+    assert py3_wrapper.errors == ["Runner"] * 3
+    assert len(py3_wrapper.runner_pool.runners) == 1
+    py3_wrapper.runner_pool.stop()
+
+
+def test_runner_pool_stop():
+    py3_wrapper = make_pool()
+    modules = [PoolModule(str(index)) for index in range(8)]
+    for module in modules:
+        py3_wrapper.timeout_queue_add(module)
+    py3_wrapper.timeout_queue_process()
+    runners = list(py3_wrapper.runner_pool.runners)
+    assert runners
+    py3_wrapper.runner_pool.stop()
+    # what was queued is run and the runners have finished
+    assert [module.runs for module in modules] == [1] * 8
+    assert not any(runner.is_alive() for runner in runners)
+    assert py3_wrapper.errors == []
+
+
+def old_line(outputs):
+    """
+    The line as it was built before OutputLine.
+    """
+    output = [",".join([json.dumps(x) for x in item]) for item in outputs]
+    return ",[{}]\n".format(",".join([x for x in output if x])).encode()
+
+
+def test_output_line():
+    outputs = [
+        [{"full_text": "a", "name": "a"}],
+        [],
+        [{"full_text": "b", "color": "#FF0000"}, {"full_text": "ü"}],
+        [{"full_text": 'quote " and \\ slash', "markup": "none"}],
+    ]
+    line = OutputLine(len(outputs))
+    for index, output in enumerate(outputs):
+        line.update([index], output)
+    assert bytes(line.build()) == old_line(outputs)
+
+    # a module shown in more than one position
+    outputs[1] = outputs[3]
+    assert line.update([1, 3], outputs[3])
+    assert bytes(line.build()) == old_line(outputs)
+
+    # all empty
+    line = OutputLine(2)
+    assert bytes(line.build()) == old_line([[], []]) == b",[]\n"
+
+
+def test_output_line_update(monkeypatch):
+    outputs = [[{"full_text": str(index)}] for index in range(10)]
+    line = OutputLine(len(outputs))
+    for index, output in enumerate(outputs):
+        line.update([index], output)
+    fragments = list(line.fragments)
+
+    encoded = []
+
+    def counting_dumps(item):
+        encoded.append(item)
+        return json.dumps(item)
+
+    monkeypatch.setattr(py3status.core, "dumps", counting_dumps)
+    outputs[4] = [{"full_text": "changed"}]
+    assert line.update([4], outputs[4])
+    # only the updated output is encoded and the others are reused
+    assert encoded == outputs[4]
+    for index, fragment in enumerate(line.fragments):
+        if index != 4:
+            assert fragment is fragments[index]
+    assert bytes(line.build()) == old_line(outputs)
+
+    # the same output does not change the line
+    assert not line.update([4], [{"full_text": "changed"}])
+
+
+class OutputModule:
+    def __init__(self):
+        self.count = 0
+
+    def get_latest(self):
+        return [{"full_text": str(self.count)}]
+
+
+def make_frames(frame_interval):
+    py3_wrapper = make_wrapper({})
+    py3_wrapper.frame_interval = frame_interval
+    py3_wrapper.output_line = OutputLine(2)
+    modules = []
+    for index, name in enumerate(["a", "b"]):
+        module = OutputModule()
+        modules.append(module)
+        py3_wrapper.output_modules[name] = {
+            "color": None,
+            "module": module,
+            "position": [index],
+            "type": "py3status",
+        }
+    return py3_wrapper, modules
+
+
+def test_output_frames():
+    py3_wrapper, modules = make_frames(0.05)
+    stop = threading.Event()
+
+    def updates():
+        # a burst of updates from both modules
+        while not stop.wait(0.002):
+            for name, module in zip(["a", "b"], modules):
+                module.count += 1
+                py3_wrapper.notify_update(name)
+
+    thread = threading.Thread(target=updates)
+    thread.start()
+    frames = []
+    last_frame = 0
+    start = time.time()
+    while time.time() - start < 0.3:
+        py3_wrapper.update_request.wait(1)
+        py3_wrapper.update_request.clear()
+        if py3_wrapper.update_queue:
+            line = py3_wrapper.output_updates(last_frame)
+            if line is not None:
+                last_frame = time.time()
+                frames.append(last_frame)
+    stop.set()
+    thread.join()
+
+    # one line per frame interval however many updates there are
+    assert 3 <= len(frames) <= 8
+    for previous, frame in zip(frames, frames[1:]):
+        assert frame - previous >= 0.045
+
+
+def test_output_frames_urgent():
+    py3_wrapper, modules = make_frames(10)
+    py3_wrapper.notify_update("a")
+    # the first line is output without waiting
+    assert py3_wrapper.output_updates(0) is not None
+    last_frame = start = time.time()
+
+    # later updates wait for the next frame unless one is urgent
+    modules[0].count += 1
+    py3_wrapper.notify_update("a")
+    timer = threading.Timer(0.05, py3_wrapper.notify_update, ["b"], {"urgent": True})
+    timer.start()
+    line = py3_wrapper.output_updates(last_frame)
+    timer.join()
+    assert time.time() - start < 5
+    assert json.loads(bytes(line)[1:])[0] == {"full_text": "1"}
+    assert not py3_wrapper.update_urgent.is_set()
+
+
+def test_load_modules_order(monkeypatch):
+    py3_wrapper = Py3statusWrapper(Options())
+    py3_wrapper.log = lambda *args, **kw: None
+    py3_wrapper.config["debug"] = False
+    names = ["slow", "medium a", "fast", "medium b", "failing", "no_methods"]
+    finished = []
+    errors = []
+
+    class SlowModule:
+        def __init__(self, name, user_modules, py3_wrapper, instance=None):
+            # the first configured modules take the longest to load
+            delay = {"slow": 0.1, "medium": 0.05}.get(name.split(" ")[0], 0)
+            time.sleep(delay)
+            if name == "failing":
+                raise ImportError("no module")
+            self.methods = {} if name == "no_methods" else {"method": {}}
+            finished.append(name)
+
+    monkeypatch.setattr(py3status.core, "Module", SlowModule)
+    py3_wrapper.report_exception = lambda msg, **kw: errors.append((msg, kw))
+    py3_wrapper.load_modules(names + ["fast"], {})
+    # loaded out of order but kept in the configured order
+    assert finished.index("slow") > finished.index("fast")
+    assert list(py3_wrapper.modules) == ["slow", "medium a", "fast", "medium b"]
+    # a failed module is reported and the others are still loaded
+    assert errors == [
+        ('Loading module "failing" failed (no module).', {"level": "warning"})
+    ]
+
+
+def test_reload_worker_threads(monkeypatch):
+    py3_wrapper = make_wrapper({"a": {}})
+    logged = []
+    py3_wrapper.log = lambda msg, *args: logged.append(msg)
+    module = py3_wrapper.modules["a"]
+    new_config = make_config({"a": {}})
+    new_config["py3status"]["worker_threads"] = 8
+    monkeypatch.setattr(
+        py3status.core, "process_config", lambda path, wrapper: new_config
+    )
+    py3_wrapper.reload_config()
+    # the modules are not restarted
+    assert py3_wrapper.modules["a"] is module
+    assert py3_wrapper.kills == []
+    assert "worker_threads needs a restart to be changed" in logged
@@ -1436,6 +1436,35 @@ def test_get_color_names_4():
     )
 
 
+def test_compiled_format_1():
+    # simple formats are compiled, blocks and commands are not
+    f.format("{name} is {number}")
+    assert f.block_cache["{name} is {number}"].compiled
+    f.format("[{name}]")
+    assert not f.block_cache["[{name}]"].compiled
+    f.format(r"\?color=#FF0000 {name}")
+    assert not f.block_cache[r"\?color=#FF0000 {name}"].compiled
+
+
+def test_compiled_format_2():
+    # composites with text are rendered by the block
+    run_formatter({"format": "{simple} x", "expected": "NY 12:34 x"})
+    run_formatter({"format": "{empty_composite} x", "expected": " x"})
+
+
+def test_compiled_format():
+    format_string = "CPU: {cpu:.2f}% MEM: {mem:.1f}/{total:.1f} GiB ({percent}%)"
+    params = {"cpu": 12.345, "mem": 3.21, "total": 15.6, "percent": 20}
+    f.format(format_string, param_dict=params)
+    block = f.block_cache[format_string]
+    assert block.compiled
+
+    # the compiled format gives the same output as rendering the block tree
+    expected = [{"full_text": "CPU: 12.35% MEM: 3.2/15.6 GiB (20%)"}]
+    assert block.compiled(params) == expected
+    assert Composite(f._render(block, None, params, None)).get_content() == expected
+
+
 if __name__ == "__main__":
     # run tests
     import sys
@@ -0,0 +1,100 @@
+from json import dumps
+
+from py3status.i3status import I3status
+
+from test_module import MockWrapper
+
+I3S_MODULES = ["load", "disk /"]
+
+
+def make_i3status():
+    py3_config = {
+        "general": {"interval": 5},
+        "py3status": {},
+        ".module_groups": {},
+        "i3s_modules": I3S_MODULES,
+    }
+    for name in I3S_MODULES:
+        py3_config[name] = {}
+    py3_wrapper = MockWrapper(py3_config)
+    py3_wrapper.config["i3status_path"] = "i3status"
+    py3_wrapper.config["standalone"] = False
+    return I3status(py3_wrapper), py3_wrapper
+
+
+def make_line(load, disk, extra=None):
+    load = dict({"name": "load", "full_text": load}, **(extra or {}))
+    return dumps([load, {"name": "disk", "instance": "/", "full_text": disk}])
+
+
+def test_process_line():
+    i3status, py3_wrapper = make_i3status()
+    i3status.process_line(make_line("0.10", "1.0 GiB"))
+    assert py3_wrapper.updates == [["load", "disk /"]]
+    assert i3status.i3modules["load"].item == {
+        "name": "load",
+        "instance": "",
+        "full_text": "0.10",
+    }
+    assert i3status.i3modules["disk /"].item["full_text"] == "1.0 GiB"
+
+
+def test_process_line_unchanged(monkeypatch):
+    i3status, py3_wrapper = make_i3status()
+    i3status.process_line(make_line("0.10", "1.0 GiB"))
+    decoded = []
+    disk = i3status.i3modules["disk /"]
+    update_from_item = disk.update_from_item
+
+    def record(item):
+        decoded.append(item)
+        return update_from_item(item)
+
+    monkeypatch.setattr(disk, "update_from_item", record)
+    monkeypatch.setattr(i3status.i3modules["load"], "update_from_item", record)
+
+    # unchanged items are not decoded or updated
+    i3status.process_line(make_line("0.10", "1.0 GiB"))
+    assert decoded == []
+    assert py3_wrapper.updates == [["load", "disk /"]]
+
+    i3status.process_line(make_line("0.10", "2.0 GiB"))
+    assert [x["full_text"] for x in decoded] == ["2.0 GiB"]
+    assert py3_wrapper.updates == [["load", "disk /"], ["disk /"]]
+
+
+def test_process_line_fallback():
+    i3status, py3_wrapper = make_i3status()
+    # nested objects are not matched by the regex so the line is decoded
+    extra = {"a": {"b": 1}, "c": {"d": "}"}}
+    line = make_line("0.10", "1.0 GiB", extra)
+    i3status.process_line(line)
+    assert i3status.i3modules["load"].item == {
+        "name": "load",
+        "instance": "",
+        "full_text": "0.10",
+        "a": {"b": 1},
+        "c": {"d": "}"},
+    }
+    assert i3status.i3modules["disk /"].item["full_text"] == "1.0 GiB"
+
+    # leading comma and whitespace as sent by i3status
+    i3status.process_line(", " + make_line("0.20", "1.0 GiB"))
+    assert i3status.i3modules["load"].item["full_text"] == "0.20"
+
+
+def test_json_list():
+    i3status, py3_wrapper = make_i3status()
+    assert i3status.json_list is None
+    i3status.process_line(make_line("0.10", "1.0 GiB"))
+    json_list = i3status.json_list
+    assert [x["full_text"] for x in json_list] == ["0.10", "1.0 GiB"]
+    # the list is kept until there is new output
+    assert i3status.json_list is json_list
+    # and changes to it do not alter the modules
+    json_list[0]["full_text"] = "changed"
+    assert i3status.i3modules["load"].item["full_text"] == "0.10"
+
+    i3status.process_line(make_line("0.20", "1.0 GiB"))
+    assert i3status.json_list is not json_list
+    assert [x["full_text"] for x in i3status.json_list] == ["0.20", "1.0 GiB"]
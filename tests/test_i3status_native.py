@@ -0,0 +1,181 @@
+import os
+
+from collections import namedtuple
+
+import pytest
+
+from py3status import i3status_native
+from py3status.i3status_native import (
+    Battery,
+    CpuUsage,
+    Disk,
+    Ethernet,
+    Load,
+    NativeModule,
+    Wireless,
+    format_bytes,
+    i3s_format,
+)
+
+GENERAL = {
+    "colors": True,
+    "color_bad": "#FF0000",
+    "color_degraded": "#FFFF00",
+    "color_good": "#00FF00",
+}
+
+STAT = """cpu  {} 0 {} {} 0 0 0 0 0 0
+cpu0 {} 0 {} {} 0 0 0 0 0 0
+intr 12345
+"""
+
+BATTERY = """POWER_SUPPLY_NAME=BAT0
+POWER_SUPPLY_STATUS={}
+POWER_SUPPLY_ENERGY_FULL_DESIGN=50000000
+POWER_SUPPLY_ENERGY_FULL=40000000
+POWER_SUPPLY_ENERGY_NOW=10000000
+POWER_SUPPLY_POWER_NOW=5000000
+POWER_SUPPLY_VOLTAGE_NOW=12000000
+"""
+
+WIRELESS = """Inter-| sta-|   Quality        |   Discarded packets
+ face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22
+ wlan0: 0000   35.  -60.  -256        0      0      0      0      0        0
+"""
+
+StatVfs = namedtuple("StatVfs", "f_bsize f_blocks f_bfree f_bavail")
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def test_native_module_abstract():
+    with pytest.raises(TypeError):
+        NativeModule("", {}, GENERAL)
+
+
+def test_i3s_format():
+    values = {"usage": "10%", "cpu0": "5%"}
+    assert i3s_format("%usage %cpu0 %cpu1 %usage_x", values) == "10% 5% %cpu1 10%_x"
+    assert format_bytes(1536) == "1.5 KiB"
+    assert format_bytes(1500, "decimal") == "1.5 kB"
+
+
+def test_load(monkeypatch):
+    monkeypatch.setattr(os, "getloadavg", lambda: (0.5, 1.25, 2.0))
+    module = Load("", {}, GENERAL)
+    assert module.update() == {"full_text": "0.50 1.25 2.00"}
+
+    monkeypatch.setattr(os, "getloadavg", lambda: (6.0, 1.25, 2.0))
+    module = Load("", {"format_above_threshold": "high %1min"}, GENERAL)
+    assert module.update() == {"full_text": "high 6.00", "color": "#FF0000"}
+
+
+def test_cpu_usage(tmp_path, monkeypatch):
+    stat = tmp_path / "stat"
+    monkeypatch.setattr(i3status_native, "PROC_STAT", str(stat))
+    module = CpuUsage("", {"format": "%usage %cpu0"}, GENERAL)
+    write(stat, STAT.format(100, 100, 800, 100, 100, 800))
+    module.update()
+    # 80 busy of 100
+    write(stat, STAT.format(150, 130, 820, 150, 130, 820))
+    assert module.update() == {"full_text": "80% 80%"}
+    # 97 busy of 100
+    write(stat, STAT.format(247, 130, 823, 247, 130, 823))
+    assert module.update() == {"full_text": "97% 97%", "color": "#FF0000"}
+
+    stat.unlink()
+    assert module.update() == {"full_text": "cpu: ?"}
+
+
+def test_disk(monkeypatch):
+    stat = StatVfs(4096, 1000000, 250000, 200000)
+    monkeypatch.setattr(os, "statvfs", lambda path: stat)
+    config = {"format": "%avail %percentage_used", "low_threshold": 10}
+    module = Disk("/", config, GENERAL)
+    assert module.update() == {"full_text": "781.2 MiB 75.0%"}
+
+    module = Disk("/", dict(config, low_threshold=25), GENERAL)
+    assert module.update() == {"full_text": "781.2 MiB 75.0%", "color": "#FF0000"}
+
+
+def test_battery(tmp_path):
+    path = tmp_path / "BAT0" / "uevent"
+    config = {"path": str(tmp_path / "BAT%d" / "uevent")}
+    module = Battery("0", config, GENERAL)
+    assert module.update() == {"full_text": "No battery", "color": "#FF0000"}
+
+    write(path, BATTERY.format("Discharging"))
+    # 10Wh of 50Wh at 5W
+    assert module.update() == {"full_text": "BAT 20.00% 02:00:00"}
+
+    config["last_full_capacity"] = True
+    config["format"] = "%status %percentage %consumption"
+    config["low_threshold"] = 30
+    config["threshold_type"] = "percentage"
+    module = Battery("all", config, GENERAL)
+    assert module.update() == {"full_text": "BAT 25.00% 5.00W", "color": "#FF0000"}
+
+    write(path, BATTERY.format("Charging"))
+    config["format"] = "%status %remaining"
+    module = Battery("all", config, GENERAL)
+    # 30Wh to full at 5W
+    assert module.update() == {"full_text": "CHR 06:00:00"}
+
+
+def make_network(module_class, tmp_path, monkeypatch, config=None, ip="10.0.0.2"):
+    monkeypatch.setattr(i3status_native, "SYS_CLASS_NET", str(tmp_path / "net"))
+    write(tmp_path / "net" / "lo" / "speed", "")
+    write(tmp_path / "net" / "eth0" / "speed", "1000")
+    write(tmp_path / "net" / "wlan0" / "wireless" / "status", "")
+    module = module_class("_first_", config or {}, GENERAL)
+    module.ip_address = lambda interface: ip
+    return module
+
+
+def test_ethernet(tmp_path, monkeypatch):
+    module = make_network(Ethernet, tmp_path, monkeypatch)
+    assert module.interface() == "eth0"
+    assert module.update() == {
+        "full_text": "E: 10.0.0.2 (1000 Mbit/s)",
+        "color": "#00FF00",
+    }
+
+    module.ip_address = lambda interface: "no IP"
+    write(tmp_path / "net" / "eth0" / "speed", "-1")
+    assert module.update() == {"full_text": "E: no IP (?)", "color": "#FFFF00"}
+
+    module.ip_address = lambda interface: None
+    assert module.update() == {"full_text": "E: down", "color": "#FF0000"}
+
+
+def test_wireless(tmp_path, monkeypatch):
+    wireless = tmp_path / "wireless"
+    write(wireless, WIRELESS)
+    monkeypatch.setattr(i3status_native, "PROC_NET_WIRELESS", str(wireless))
+    config = {"format_up": "W: (%quality at %essid, %bitrate) %ip %signal"}
+    module = make_network(Wireless, tmp_path, monkeypatch, config)
+    module.essid = lambda interface: "HomeNet"
+    module.bitrate = lambda interface: "72.2 Mb/s"
+    module.frequency = lambda interface: "2.4 GHz"
+    assert module.interface() == "wlan0"
+
+    # the quality is a percentage of the max quality of the driver
+    module.max_qualities["wlan0"] = 70
+    assert module.update() == {
+        "full_text": "W: (050% at HomeNet, 72.2 Mb/s) 10.0.0.2 -60 dBm",
+        "color": "#00FF00",
+    }
+    module.max_qualities["wlan0"] = 100
+    assert module.update()["full_text"].startswith("W: (035% at HomeNet")
+
+    # no driver information
+    module = make_network(Wireless, tmp_path, monkeypatch, config)
+
+    def ioctl(*args):
+        raise OSError()
+
+    module.ioctl = ioctl
+    assert module.max_quality("wlan0") == 70
@@ -0,0 +1,79 @@
+import os
+import time
+
+from py3status.log_writer import LogWriter
+
+
+def test_log_writer(tmp_path):
+    path = str(tmp_path / "log")
+    writer = LogWriter(path)
+    writer.start()
+    writer.log("started", "info")
+    writer.log({"a": 1}, "warning")
+    writer.stop()
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines[0].endswith(" INFO started")
+    assert lines[1].endswith(" WARNING {'a': 1}")
+
+
+def test_log_writer_drop_and_rotate(tmp_path):
+    path = str(tmp_path / "log")
+    writer = LogWriter(path, max_size=100, backups=1, size=2)
+    # the writer is not running so the queue fills up
+    for index in range(5):
+        writer.log("message {}".format(index), "info")
+    writer.start()
+    writer.stop()
+    with open(path + ".1") as f:
+        lines = f.read().splitlines()
+    assert lines[0].endswith(" INFO message 0")
+    assert lines[1].endswith(" INFO message 1")
+    assert lines[2].endswith(" WARNING 3 log messages dropped")
+    assert not (tmp_path / "log").exists()
+
+
+def test_log_writer_rotate_age(tmp_path):
+    path = str(tmp_path / "log")
+    with open(path, "w") as f:
+        f.write("old message\n")
+    old = time.time() - 120
+    os.utime(path, (old, old))
+
+    writer = LogWriter(path, max_age=60, backups=1)
+    writer.start()
+    writer.log("new message", "info")
+    writer.stop()
+    with open(path + ".1") as f:
+        assert f.read() == "old message\n"
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith(" INFO new message")
+    assert writer.rotate_at > time.time()
+
+
+def test_log_writer_error(tmp_path, capsys):
+    log_dir = tmp_path / "logs"
+    path = str(log_dir / "log")
+    writer = LogWriter(path)
+
+    def write(msg):
+        # run the writer in this thread until it has written the message
+        writer.log(msg, "info")
+        writer.queue.put(None)
+        writer.run()
+
+    # the directory does not exist so the log cannot be written
+    write("first")
+    write("second")
+    errors = capsys.readouterr().err.splitlines()
+    assert len(errors) == 1
+    assert errors[0].startswith("py3status: cannot write log file {}".format(path))
+
+    log_dir.mkdir()
+    write("third")
+    with open(path) as f:
+        assert f.read().endswith(" INFO third\n")
+    assert not writer.failed
+    assert capsys.readouterr().err == ""
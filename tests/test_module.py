@@ -0,0 +1,70 @@
+from py3status.module import Module
+from py3status.module_test import MockPy3statusWrapper
+
+
+class MockWrapper(MockPy3statusWrapper):
+    def __init__(self, config):
+        MockPy3statusWrapper.__init__(self, config)
+        self.config["testing"] = False
+        self.updates = []
+
+    def notify_update(self, update, urgent=False):
+        self.updates.append(update)
+
+    def log(self, *arg, **kw):
+        pass
+
+
+def make_module(name, instance=None):
+    py3_config = {
+        "general": {},
+        "py3status": {},
+        ".module_groups": {},
+        name: {},
+    }
+    py3_wrapper = MockWrapper(py3_config)
+    module = Module(name, {}, py3_wrapper, instance)
+    return module, py3_wrapper
+
+
+def test_module_import_error():
+    module, py3_wrapper = make_module("nonexistent_mod")
+    assert module.disabled
+    assert module.get_latest()[0]["full_text"] == "nonexistent_mod"
+    assert py3_wrapper.updates == ["nonexistent_mod"]
+
+
+def test_module_unchanged_output():
+    class Py3status:
+        text = "a"
+
+        def test_module(self):
+            return {"full_text": self.text, "cached_until": 0}
+
+    instance = Py3status()
+    module, py3_wrapper = make_module("test_module", instance)
+    module.prepare_module()
+    method = module.methods["test_module"]
+
+    module.run()
+    assert py3_wrapper.updates == ["test_module"]
+    version = method["version"]
+
+    # the same output does not change the version or notify an update
+    method["cached_until"] = 0
+    module.run()
+    assert method["version"] == version
+    assert py3_wrapper.updates == ["test_module"]
+
+    method["cached_until"] = 0
+    instance.text = "b"
+    module.run()
+    assert method["version"] == version + 1
+    assert module.get_latest()[0]["full_text"] == "b"
+    assert py3_wrapper.updates == ["test_module", "test_module"]
+
+    # errors replace the output
+    module.error_output("oops")
+    assert method["version"] == version + 2
+    assert module.get_latest()[0]["full_text"] == "oops"
+    assert len(py3_wrapper.updates) == 3
@@ -0,0 +1,96 @@
+import json
+import os
+import stat
+
+from hashlib import sha256
+
+from py3status.parse_config import ConfigCache, process_config
+
+CONFIG = """
+order += "static_string"
+static_string {
+    format = env(PY3_TEST_FORMAT)
+}
+"""
+
+
+def test_config_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("PY3_TEST_FORMAT", "secret")
+    config_path = tmp_path / "config"
+    config_path.write_text(CONFIG)
+
+    config = process_config(str(config_path))
+    assert config["static_string"]["format"] == "secret"
+    cache = ConfigCache(str(config_path))
+    with open(cache.path, "rb") as f:
+        assert b"secret" not in f.read()
+    assert cache.load(None) == {
+        "order": ["static_string"],
+        "static_string": {"format": "secret"},
+    }
+
+    # a changed env() value means the config is parsed again
+    monkeypatch.setenv("PY3_TEST_FORMAT", "changed")
+    assert cache.load(None) is None
+    assert process_config(str(config_path))["static_string"]["format"] == "changed"
+
+    # as does a changed config
+    config_path.write_text(CONFIG.replace("static_string", "uptime"))
+    assert ConfigCache(str(config_path)).load(None) is None
+
+
+RICH_CONFIG = """
+general {
+    colors = true
+    interval = 5
+}
+order += "group things"
+order += "static_string"
+group things {
+    button_next = 1
+    static_string first {
+        format = "first"
+    }
+}
+static_string {
+    format = env(PY3_TEST_FORMAT)
+    on_click 1 = "exec true"
+    thresholds = [(0, "bad"), (50, "good")]
+}
+"""
+
+
+def types(item):
+    """
+    The structure of the config with the types of the values.
+    """
+    if isinstance(item, dict):
+        return (type(item), [(k, types(v)) for k, v in item.items()])
+    if isinstance(item, (list, tuple)):
+        return (type(item), [types(x) for x in item])
+    return (type(item), item)
+
+
+def test_config_cache_json(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("PY3_TEST_FORMAT", "secret")
+    config_path = tmp_path / "config"
+    config_path.write_text(RICH_CONFIG)
+
+    config = process_config(str(config_path))
+    cache = ConfigCache(str(config_path))
+    with open(cache.path) as f:
+        cached = json.load(f)
+    # the digest is keyed so a guessed value cannot be checked
+    digest = sha256(repr(("str", "secret")).encode("utf-8")).hexdigest()
+    assert digest not in json.dumps(cached)
+    key_path = tmp_path / "py3status_config_key"
+    assert stat.S_IMODE(os.stat(str(key_path)).st_mode) == 0o600
+
+    assert cache.load(None) is not None
+    assert types(process_config(str(config_path))) == types(config)
+
+    # the cache cannot be used with another key
+    key_path.write_bytes(b"x" * 32)
+    assert cache.load(None) is None
@@ -0,0 +1,145 @@
+from py3status.modules import diskdata, net_rate
+from py3status.proc_sampler import (
+    ProcSampler,
+    delta,
+    parse_diskstats,
+    parse_net_dev,
+    parse_stat,
+)
+from py3status.py3 import Py3
+
+from test_module import make_module
+
+
+STAT = """cpu  100 0 50 1000 5 0 1 0 0 0
+cpu0 100 0 50 1000 5 0 1 0 0 0
+intr 12345 1 2
+ctxt 6789
+btime 1600000000
+"""
+
+NET_DEV = """Inter-|   Receive                       |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes
+    lo:    1000      10    0    0    0     0          0         0     1000      10    0    0    0     0       0          0
+  eth0:    5000      50    0    0    0     0          0         0     2000      20    0    0    0     0       0          0
+"""
+
+
+def test_parse_stat():
+    result = parse_stat(STAT)
+    assert result["cpu"] == [100, 0, 50, 1000, 5, 0, 1, 0, 0, 0]
+    assert result["intr"] == [12345, 1, 2]
+    assert result["ctxt"] == 6789
+
+
+def test_parse_net_dev():
+    result = parse_net_dev(NET_DEV)
+    assert list(result) == ["lo", "eth0"]
+    assert result["eth0"][0] == 5000
+    assert result["eth0"][8] == 2000
+
+
+def test_delta():
+    previous = parse_stat(STAT)
+    current = parse_stat(STAT.replace("1000", "1100").replace("6789", "6800"))
+    result = delta(current, previous)
+    assert result["cpu"][3] == 100
+    assert result["cpu"][0] == 0
+    assert result["ctxt"] == 11
+
+
+def test_sample_cached(tmp_path):
+    path = tmp_path / "uptime"
+    path.write_text("1.00 2.00\n")
+    sampler = ProcSampler()
+    source = "/proc/../" + str(path)
+    timestamp, data = sampler.sample(source)
+    assert data == "1.00 2.00"
+    path.write_text("3.00 4.00\n")
+    # cached
+    assert sampler.sample(source) == (timestamp, data)
+    # the open file is reread
+    assert sampler.sample(source, max_age=0)[1] == "3.00 4.00"
+    sampler.close()
+
+
+class MockSampler:
+    """
+    Returns the given samples in turn, a sample is reused until the next.
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+
+    def sample(self, source, max_age=1):
+        return self.samples[0]
+
+    def next(self):
+        self.samples.pop(0)
+
+
+def test_net_rate_sample_time():
+    previous = parse_net_dev(NET_DEV)
+    current = parse_net_dev(NET_DEV.replace("5000", "9000"))
+    py3 = Py3()
+    # the samples were taken 2 seconds apart whenever the module runs
+    py3._proc_sampler = sampler = MockSampler([(100, previous), (102, current)])
+    module = net_rate.Py3status()
+    module.py3 = py3
+    module.interfaces_blacklist = ["lo"]
+    module.last_deltas = None
+    py3.proc_delta("net_dev")
+    sampler.next()
+    deltas = module._get_deltas()
+    assert deltas == {"eth0:": {"down": 2000.0, "total": 2000.0, "up": 0.0}}
+    # the same sample again keeps the rates
+    assert module._get_deltas() == deltas
+
+
+def test_diskdata_sample_time():
+    diskstats = "   8       0 sda 100 0 1000 0 50 0 2000 0 0 0 0\n"
+    previous = parse_diskstats(diskstats)
+    current = parse_diskstats(diskstats.replace("1000", "1400"))
+    py3 = Py3()
+    py3._proc_sampler = sampler = MockSampler([(100, previous), (104, current)])
+    module = diskdata.Py3status()
+    module.py3 = py3
+    module.disk = "sda"
+    module.last_diskstats = (0, 0, 0)
+    py3.proc_delta("diskstats")
+    sampler.next()
+    # 400 sectors read over the 4 seconds between the samples
+    assert module._calc_diskstats() == (51200.0, 0.0, 51200.0)
+
+
+def test_net_rate_first_run():
+    # post_config_hook takes the first sample and the module then runs
+    # before there is a new one
+    sample = parse_net_dev(NET_DEV)
+    module = net_rate.Py3status()
+    module.py3 = Py3()
+    module.py3._proc_sampler = MockSampler([(100, sample)])
+    module.interfaces_blacklist = ["lo"]
+    module.last_deltas = None
+    module.py3.proc_delta("net_dev")
+    zero = {"eth0:": {"down": 0, "total": 0, "up": 0}}
+    assert module._get_deltas() == zero
+
+    # or without the first sample
+    module.py3._proc_samples = {}
+    assert module._get_deltas() == zero
+
+
+def test_net_rate_module_first_run(monkeypatch):
+    sample = parse_net_dev(NET_DEV)
+    monkeypatch.setattr(Py3, "_proc_sampler", MockSampler([(100, sample)]))
+    for sum_values in (False, True):
+        module = net_rate.Py3status()
+        module.sum_values = sum_values
+        module.format_no_connection = "no connection"
+        module, py3_wrapper = make_module("net_rate", module)
+        module.prepare_module()
+        module.run()
+        assert module.get_latest() == [
+            {"full_text": "no connection", "instance": "", "name": "net_rate"}
+        ]
@@ -0,0 +1,37 @@
+import threading
+import time
+
+from py3status.profiling import SamplingProfiler
+
+
+def busy_module(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler(tmp_path):
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_module, args=(stop,))
+    thread.start()
+
+    def thread_labels():
+        return {thread.ident: "busy_module", threading.main_thread().ident: None}
+
+    profiler = SamplingProfiler(thread_labels, modules=["busy_module"], interval=0.001)
+    profiler.start()
+    time.sleep(0.1)
+    path = str(tmp_path / "profile.folded")
+    with open(path, "w") as f:
+        samples = profiler.stop(f)
+    stop.set()
+    thread.join()
+
+    assert samples
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("busy_module;")
+        assert int(count) > 0
+    assert any("test_profiling.py:busy_module" in line for line in lines)
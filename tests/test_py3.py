@@ -1,5 +1,6 @@
 from pprint import pformat
 
+from py3status.formatter import Formatter
 from py3status.py3 import Py3
 
 
@@ -218,3 +219,63 @@ def test_flatten_dict_parent_key():
     print("returned data")
     print(pformat(returned))
     assert returned == expected
+
+
+def test_safe_format_render_cache():
+    class Module:
+        render_cache = True
+        unit = "%"
+
+    py3 = Py3()
+    py3._formatter = Formatter()
+    py3._py3status_module = Module()
+    format_string = r"[\?color=#FF0000 {percent}]{unit}"
+
+    first = py3.safe_format(format_string, {"percent": 50})
+    assert py3._render_calls[-1][2] is None
+    second = py3.safe_format(format_string, {"percent": 50, "other": 1})
+    assert second.get_content() == first.get_content()
+    assert py3._render_calls[-1][2] is second
+    # composites are copied so changes to them are not cached
+    second[0]["full_text"] = "changed"
+    assert py3.safe_format(format_string, {"percent": 50})[0]["full_text"] == "50"
+
+    # a change in value or type renders again
+    py3.safe_format(format_string, {"percent": 51})
+    assert py3._render_calls[-1][2] is None
+    py3.safe_format(format_string, {"percent": 51.0})
+    assert py3._render_calls[-1][2] is None
+    # values that cannot be compared safely are not cached
+    py3.safe_format(format_string, {"percent": [51]})
+    assert py3._render_calls[-1] is None
+
+
+def test_safe_format_render_cache_threshold_color():
+    class Module:
+        render_cache = True
+
+    module = Module()
+    py3 = Py3()
+    py3._formatter = Formatter()
+    py3._py3status_module = module
+    module.py3 = py3
+    module.color_threshold = "#FFFFFF"
+    format_string = r"[\?color=load {text}][\?color=threshold {text}]"
+
+    # threshold_get_color() sets the colors from values that need not be
+    # placeholders
+    module.color_threshold_load = "#00FF00"
+    first = py3.safe_format(format_string, {"text": "load"})
+    assert first[0]["color"] == "#00FF00"
+    module.color_threshold_load = "#FF0000"
+    second = py3.safe_format(format_string, {"text": "load"})
+    assert py3._render_calls[-1][2] is None
+    assert second[0]["color"] == "#FF0000"
+    py3.safe_format(format_string, {"text": "load"})
+    assert py3._render_calls[-1][2] is not None
+
+    # an unnamed threshold color
+    module.color_threshold = "#0000FF"
+    third = py3.safe_format(format_string, {"text": "load"})
+    assert py3._render_calls[-1][2] is None
+    assert third[1]["color"] == "#0000FF"
@@ -0,0 +1,109 @@
+from py3status import request
+from py3status.request import HttpClient
+
+
+class MockStorage:
+    def __init__(self):
+        self.saved = []
+
+    def storage_get(self, module_name, key):
+        return None
+
+    def storage_set(self, module_name, key, value):
+        self.saved.append(value)
+
+
+def make_client():
+    client = HttpClient()
+    client.requests = []
+
+    def _open(url, data=None, headers=None, timeout=None, cookiejar=None):
+        client.requests.append((url, headers))
+        return 200, "OK", {"Cache-Control": "max-age=60"}, b"data"
+
+    client._open = _open
+    return client
+
+
+def test_request_cache_headers():
+    client = make_client()
+    url = "https://gitlab.com/api/v4/projects"
+    client.open(url, headers={"PRIVATE-TOKEN": "a", "User-Agent": "py3status 1"})
+    client.open(url, headers={"private-token": "a", "User-Agent": "py3status 2"})
+    assert len(client.requests) == 1
+
+    # requests with different credentials do not share responses
+    client.open(url, headers={"PRIVATE-TOKEN": "b"})
+    client.open(url, headers={"Authorization": "token"})
+    assert len(client.requests) == 3
+
+
+def test_request_cache_save(monkeypatch):
+    client = make_client()
+    storage = MockStorage()
+    client.use_storage(storage)
+    client.open("http://example.com/a")
+    client.open("http://example.com/b")
+    # the cache is not saved until the save interval has passed
+    assert storage.saved == []
+    client.save_cache()
+    assert len(storage.saved) == 1
+    assert len(storage.saved[0]) == 2
+    # nothing has changed so nothing is saved
+    client.save_cache()
+    assert len(storage.saved) == 1
+
+    monkeypatch.setattr(request, "CACHE_SAVE_INTERVAL", 0)
+    client.open("http://example.com/c")
+    assert len(storage.saved) == 2
+
+
+class MockResponse:
+    headers = {}
+    reason = "OK"
+    status = 200
+    will_close = True
+
+    def read(self):
+        return b"data"
+
+
+class MockConnection:
+    sent = []
+
+    def __init__(self, netloc, timeout=None, closed=False):
+        self.closed = closed
+        self.sock = None
+
+    def request(self, method, path, body=None, headers=None):
+        if self.closed:
+            raise ConnectionResetError()
+        self.sent.append(method)
+
+    def getresponse(self):
+        return MockResponse()
+
+    def close(self):
+        # http.client connections reconnect when next used
+        self.closed = False
+
+
+def test_request_retry_kept_connection(monkeypatch):
+    monkeypatch.setattr(request, "HTTPConnection", MockConnection)
+    client = HttpClient()
+    key = ("http", "example.com")
+
+    # a kept connection closed by the server is replaced for a GET
+    client.pools[key] = [MockConnection("example.com", closed=True)]
+    assert client._send("GET", "http://example.com/", None, {}, 1)[3] == b"data"
+    assert MockConnection.sent == ["GET"]
+
+    # but a POST is not sent again
+    client.pools[key] = [MockConnection("example.com", closed=True)]
+    try:
+        client._send("POST", "http://example.com/", b"x", {}, 1)
+    except ConnectionResetError:
+        pass
+    else:
+        assert False, "POST was retried"
+    assert MockConnection.sent == ["GET"]
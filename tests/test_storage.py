@@ -0,0 +1,77 @@
+from pickle import dump, load
+
+from py3status.storage import Storage
+
+
+class MockPy3statusWrapper:
+    def __init__(self, py3_config):
+        self.config = {"py3_config": py3_config, "i3status_config_path": "/x/config"}
+        self.queued = []
+
+    def log(self, *arg, **kw):
+        pass
+
+    def timeout_queue_add(self, item, cache_time=0):
+        self.queued.append(item)
+
+
+def make_storage(tmp_path, **options):
+    options["storage"] = str(tmp_path / "storage.data")
+    py3_wrapper = MockPy3statusWrapper({"py3status": options})
+    storage = Storage()
+    storage.init(py3_wrapper)
+    return storage, py3_wrapper
+
+
+def stored(tmp_path):
+    with open(str(tmp_path / "storage.data"), "rb") as f:
+        return load(f)
+
+
+def test_storage_write_behind(tmp_path):
+    storage, py3_wrapper = make_storage(tmp_path, storage_backend="pickle")
+    storage.storage_set("module", "a", 1)
+    storage.storage_set("module", "b", 2)
+    storage.storage_del("module", "a")
+    # the changes are only written once the flush is due
+    assert py3_wrapper.queued == [storage]
+    assert not (tmp_path / "storage.data").exists()
+    storage.run()
+    assert stored(tmp_path)["module"]["b"] == 2
+    assert "a" not in stored(tmp_path)["module"]
+
+    # a flush is scheduled again for new changes
+    storage.storage_set("module", "c", 3)
+    assert py3_wrapper.queued == [storage, storage]
+    storage.flush()
+    assert stored(tmp_path)["module"]["c"] == 3
+
+
+def test_storage_no_flush_interval(tmp_path):
+    storage, py3_wrapper = make_storage(
+        tmp_path, storage_backend="pickle", storage_flush_interval=0
+    )
+    storage.storage_set("module", "a", 1)
+    assert py3_wrapper.queued == []
+    assert stored(tmp_path)["module"]["a"] == 1
+
+
+def test_storage_sqlite(tmp_path):
+    # the legacy pickle storage is migrated
+    with open(str(tmp_path / "storage.data"), "wb") as f:
+        dump({"old": {"a": [1, 2], "_ctime": 1, "_mtime": 2}}, f, protocol=2)
+
+    storage, py3_wrapper = make_storage(tmp_path)
+    assert storage.storage_path == str(tmp_path / "storage.sqlite")
+    assert storage.storage_get("old", "a") == [1, 2]
+    storage.storage_set("new", "b", {"x": 1})
+    storage.storage_set("old", "c", 3)
+    storage.storage_del("old", "a")
+    storage.flush()
+
+    # modules are loaded from the database when first used
+    storage, py3_wrapper = make_storage(tmp_path)
+    assert storage.data == {}
+    assert storage.storage_get("new", "b") == {"x": 1}
+    assert sorted(storage.storage_keys("old")) == ["_ctime", "_mtime", "c"]
+    assert list(storage.data) == ["new", "old"]
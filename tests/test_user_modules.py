@@ -1,10 +1,10 @@
 import argparse
 import os
 
-import pkg_resources
 import pytest
 
 import py3status
+from py3status import module_index
 from py3status.core import Py3statusWrapper, ENTRY_POINT_KEY
 
 
@@ -29,27 +29,43 @@ def test__get_path_based_modules(status_wrapper):
 
 def test__get_entry_point_based_modules(status_wrapper, monkeypatch):
     def return_fake_entry_points(*_):
-        class FakePy3status:
-            Py3status = "I am a fake class"
+        return [
+            ("spam", "py3status.modules.air_quality"),
+            # not a py3status module
+            ("eggs", "py3status.constants"),
+        ]
 
-            def __init__(self, name):
-                self.name = name
-                self.module_name = "module_name_" + self.name
+    monkeypatch.setattr(module_index, "iter_entry_points", return_fake_entry_points)
 
-            @staticmethod
-            def load():
-                from py3status.modules import air_quality
+    user_modules = status_wrapper._get_entry_point_based_modules()
+    assert len(user_modules) == 1
+    kind, klass = user_modules["air_quality"]
+    assert kind == ENTRY_POINT_KEY
+    assert klass.__name__ == "Py3status"
 
-                return air_quality
+    # only the modules asked for are imported
+    user_modules = status_wrapper._get_entry_point_based_modules({"clock"})
+    assert user_modules == {}
 
-        return [FakePy3status("spam"), FakePy3status("eggs")]
 
-    monkeypatch.setattr(pkg_resources, "iter_entry_points", return_fake_entry_points)
+def test_module_index(tmp_path, monkeypatch):
+    found = [("spam", "py3status.modules.air_quality")]
+    monkeypatch.setattr(module_index, "iter_entry_points", lambda group: found)
+    modules_path = tmp_path / "modules"
+    modules_path.mkdir()
+    (modules_path / "my_module.py").write_text("")
+    (modules_path / "README").write_text("")
 
-    user_modules = status_wrapper._get_entry_point_based_modules()
-    assert len(user_modules) == 2
-    for name, info in user_modules.items():
-        assert any(n in name for n in ["spam", "eggs"])
-        kind, klass = info
-        assert kind == ENTRY_POINT_KEY
-        assert klass.__name__ == "Py3status"
+    index = module_index.ModuleIndex(str(tmp_path / "index.json"))
+    assert index.entry_point_modules("py3status") == {
+        "air_quality": "py3status.modules.air_quality"
+    }
+    assert index.path_modules(str(modules_path)) == ["my_module.py"]
+    index.save()
+
+    # the saved index is used while nothing has been installed
+    found = []
+    index = module_index.ModuleIndex(str(tmp_path / "index.json"))
+    assert not index.changed
+    assert "air_quality" in index.entry_point_modules("py3status")
+    assert index.path_modules(str(modules_path)) == ["my_module.py"]
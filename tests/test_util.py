@@ -0,0 +1,45 @@
+import pytest
+
+from py3status.util import LRUCache, Metrics
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+    # b is the least recently used
+    cache["c"] = 3
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats() == {
+        "evictions": 1,
+        "hits": 2,
+        "items": 2,
+        "misses": 1,
+        "size": 2,
+    }
+    cache.resize(1)
+    assert "c" not in cache
+    assert len(cache) == 1
+
+
+def test_metrics():
+    metrics = Metrics()
+    metrics.record("method", 0.0005, changed=True)
+    metrics.record("method", 0.05, error=True, changed=False)
+    with pytest.raises(ValueError):
+        with metrics.timed("on_click"):
+            raise ValueError
+    stats = metrics.stats()
+    method = stats["method"]
+    assert method["runs"] == 2
+    assert method["errors"] == 1
+    assert method["changed_ratio"] == 0.5
+    assert method["time_last"] == 0.05
+    assert method["time_max"] == 0.05
+    assert method["histogram"]["<=0.001"] == 1
+    assert method["histogram"]["<=0.1"] == 1
+    assert stats["on_click"]["errors"] == 1
+    assert "changed" not in stats["on_click"]